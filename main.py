@@ -2,12 +2,32 @@ import time
 
 from modules.load_data import (
     # load_restaurants_from_geojson,
-    load_restaurants_from_parquet,
+    load_queries,
 )
 
-from modules.load_data_spark import load_restaurants_from_parquet_spark
-from modules.find_restaurants import find_nearby_restaurants
-from modules.find_restaurants_spark import find_nearby_restaurants_spark
+from modules.load_data_spark import (
+    load_restaurants_from_parquet_spark,
+    apply_deltas_spark,
+)
+from modules.find_restaurants import find_nearby_restaurants_multi
+from modules.find_restaurants_spark import find_nearby_restaurants_batch_spark
+from modules.backends import (
+    load_restaurants_pandas,
+    create_backend,
+    backend_timings,
+)
+from modules.config import BACKEND, N_JOBS
+from modules.result_cache import query_result_cache
+from modules.popular_places import (
+    load_popular_neighbourhoods,
+    find_precomputed_restaurants,
+)
+from modules.deltas import (
+    load_deltas,
+    apply_deltas,
+    apply_deltas_multi,
+    dataset_version,
+)
 from logger.logger import execution_logger
 
 from dotenv import dotenv_values
@@ -23,6 +43,10 @@ def main(
     use_spark: bool = False,
     big_data: bool = False,
     verbose: bool = False,
+    place: str = None,
+    backend: str = None,
+    n_jobs: int = N_JOBS,
+    display: bool = True,
 ):
     """
     Main function to find nearby restaurants based on location and search radius.
@@ -33,89 +57,166 @@ def main(
     :param use_spark: Flag to use Apache Spark for processing (default: False).
     :param big_data: Flag to handle big data sets (default: False).
     :param verbose: Flag for verbose output (default: False).
-    :return: A dictionary with monitoring data and a DataFrame/Spark DataFrame of nearby restaurants.
+    :param place: Name of the selected popular place, if any (default: None). When
+        the location is this place, the precomputed neighbourhood is used instead of
+        searching.
+    :param backend: Name of the search backend, "auto" to select the fastest one
+        (default: "spark" with `use_spark`, the configured BACKEND otherwise).
+    :param n_jobs: Number of threads scanning the data in-process, -1 for one per CPU
+        (default: the configured N_JOBS).
+    :param display: Flag to print the results to the console (default: True). The
+        search server turns it off, since its searches run in request threads.
+    :return: A dictionary with monitoring data and a DataFrame of nearby restaurants.
+        Spark results are also returned as a pandas DataFrame.
     """
-    if verbose:
-        print(f"\nUse Spark: {use_spark}\nBig Data: {big_data}\nVerbose: {verbose}\n")
+    if backend is None:
+        backend = "spark" if use_spark else BACKEND
+    if display and verbose:
+        print(f"\nBackend: {backend}\nBig Data: {big_data}\nVerbose: {verbose}\n")
 
     # Data loading time measurement
     start_time = time.time()
     filepath = (
         config["PARQUET_FILE_PATH_15M"] if big_data else config["PARQUET_FILE_PATH"]
     )
-    if use_spark:
-        spark_session, restaurants = load_restaurants_from_parquet_spark(filepath)
-    else:
-        restaurants = load_restaurants_from_parquet(filepath)
+    search_backend = create_backend(backend, filepath, big_data, n_jobs)
+    neighbourhoods = load_popular_neighbourhoods(filepath)
     end_time = time.time()
     load_data_time = (end_time - start_time) * 1000  # Converting to milliseconds
     execution_logger.info(f"Data loading time: {round(load_data_time)} ms")
 
-    # Finding nearby restaurants
+    # Finding nearby restaurants, reusing precomputed or previous results if possible
     start_time = time.time()
-    nearby_restaurants = (
-        find_nearby_restaurants_spark(restaurants, latitude, longitude, radius)
-        if use_spark
-        else find_nearby_restaurants(restaurants, latitude, longitude, radius)
+    deltas = search_backend.deltas
+    version = dataset_version(filepath, deltas)
+    nearby_restaurants = apply_deltas(
+        find_precomputed_restaurants(
+            neighbourhoods, place, latitude, longitude, radius
+        ),
+        deltas,
+        latitude,
+        longitude,
+        radius,
     )
+    if nearby_restaurants is None:
+        nearby_restaurants = query_result_cache.get(
+            version, latitude, longitude, radius
+        )
+    if nearby_restaurants is None:
+        nearby_restaurants = search_backend.to_pandas(
+            search_backend.search(latitude, longitude, radius)
+        )
+        backend_timings.record(
+            filepath, search_backend.name, (time.time() - start_time) * 1000
+        )
+        query_result_cache.put(version, latitude, longitude, radius, nearby_restaurants)
     end_time = time.time()
     search_time = (end_time - start_time) * 1000  # Converting to milliseconds
     execution_logger.info(f"Search time: {round(search_time)} ms")
 
     # Displaying results
-    if not use_spark:
+    if display:
         _display_results_pandas(
             nearby_restaurants, radius, load_data_time, search_time, verbose
         )
-        n_restaurants = len(restaurants)
-    else:
-        _display_results_spark(
-            nearby_restaurants, radius, load_data_time, search_time, verbose
-        )
-        n_restaurants = restaurants.count()
 
     monitoring = {
         "load_data_time": load_data_time,
         "search_time": search_time,
-        "n_restaurants": n_restaurants,
+        "n_restaurants": search_backend.count(),
+        "backend": search_backend.name,
     }
 
-    # Stop Spark session
-    # if use_spark:
-    #     spark_session.stop()
-
     return monitoring, nearby_restaurants
 
 
-def _display_results_pandas(
-    nearby_restaurants: object,
-    radius: int,
-    load_data_time: float,
-    search_time: float,
-    verbose: bool,
+def main_batch(
+    queries_file_path: str,
+    output_file_path: str,
+    radius: float = None,
+    use_spark: bool = False,
+    big_data: bool = False,
+    verbose: bool = False,
 ):
     """
-    Display results for non-Spark execution path.
+    Find nearby restaurants for every query of a CSV or Parquet file in one pass.
 
-    :param nearby_restaurants: DataFrame of nearby restaurants.
-    :param radius: Search radius in meters.
-    :param load_data_time: Time taken to load data in milliseconds.
-    :param search_time: Time taken for the search in milliseconds.
-    :param verbose: Flag for verbose output.
+    :param queries_file_path: Path to the queries, with 'latitude', 'longitude' and
+        optionally 'radius' and 'query_id' columns.
+    :param output_file_path: Path of the Parquet output, in long format with one row
+        per (query, restaurant) pair and a 'query_id' column.
+    :param radius: Default search radius in meters for queries without a radius.
+    :param use_spark: Flag to use Apache Spark for processing (default: False).
+    :param big_data: Flag to handle big data sets (default: False).
+    :param verbose: Flag for verbose output (default: False).
+    :return: A dictionary with monitoring data and a DataFrame/Spark DataFrame of results.
     """
-    if not nearby_restaurants.empty:
-        print(f"Restaurants found within a radius of {radius} meters:")
-        if verbose:
-            for index, row in nearby_restaurants.iterrows():
-                print(f"{row['name']}, Distance: {row['distance']} meters")
-        print(
-            f"\nData loading time: {round(load_data_time)} ms\nSearch time: {round(search_time)} ms"
+    if verbose:
+        print(f"\nUse Spark: {use_spark}\nBig Data: {big_data}\nVerbose: {verbose}\n")
+
+    queries = load_queries(queries_file_path, radius)
+
+    # Data loading time measurement
+    start_time = time.time()
+    filepath = (
+        config["PARQUET_FILE_PATH_15M"] if big_data else config["PARQUET_FILE_PATH"]
+    )
+    deltas = load_deltas(filepath)
+    if use_spark:
+        spark_session, restaurants = load_restaurants_from_parquet_spark(filepath)
+        restaurants = apply_deltas_spark(restaurants, deltas, spark_session)
+    else:
+        restaurants, spatial_index = load_restaurants_pandas(filepath, big_data)
+    end_time = time.time()
+    load_data_time = (end_time - start_time) * 1000  # Converting to milliseconds
+    execution_logger.info(f"Data loading time: {round(load_data_time)} ms")
+
+    # Finding nearby restaurants for all queries and writing the results
+    start_time = time.time()
+    if use_spark:
+        results = find_nearby_restaurants_batch_spark(
+            restaurants, queries, spark_session
         )
+        results.write.mode("overwrite").parquet(output_file_path)
+        n_results = spark_session.read.parquet(output_file_path).count()
     else:
-        print("No restaurants found within the specified radius.")
+        results = apply_deltas_multi(
+            find_nearby_restaurants_multi(
+                restaurants,
+                queries["latitude"],
+                queries["longitude"],
+                queries["radius"],
+                spatial_index,
+            ),
+            deltas,
+            queries["latitude"],
+            queries["longitude"],
+            queries["radius"],
+        )
+        results["query_id"] = queries["query_id"].to_numpy()[results["query_id"]]
+        results.to_parquet(output_file_path, index=False)
+        n_results = len(results)
+    end_time = time.time()
+    search_time = (end_time - start_time) * 1000  # Converting to milliseconds
+    execution_logger.info(f"Batch search time: {round(search_time)} ms")
+
+    print(
+        f"{n_results} results for {len(queries)} queries written to {output_file_path}"
+        f"\n\nData loading time: {round(load_data_time)} ms"
+        f"\nSearch time: {round(search_time)} ms"
+    )
+
+    monitoring = {
+        "load_data_time": load_data_time,
+        "search_time": search_time,
+        "n_queries": len(queries),
+        "n_results": n_results,
+    }
+
+    return monitoring, results
 
 
-def _display_results_spark(
+def _display_results_pandas(
     nearby_restaurants: object,
     radius: int,
     load_data_time: float,
@@ -123,18 +224,18 @@ def _display_results_spark(
     verbose: bool,
 ):
     """
-    Display results for Spark execution path.
+    Display results of the pandas and Spark execution paths.
 
-    :param nearby_restaurants: Spark DataFrame of nearby restaurants.
+    :param nearby_restaurants: DataFrame of nearby restaurants.
     :param radius: Search radius in meters.
     :param load_data_time: Time taken to load data in milliseconds.
     :param search_time: Time taken for the search in milliseconds.
     :param verbose: Flag for verbose output.
     """
-    if nearby_restaurants.count() > 0:
+    if not nearby_restaurants.empty:
         print(f"Restaurants found within a radius of {radius} meters:")
         if verbose:
-            for row in nearby_restaurants.collect():
+            for index, row in nearby_restaurants.iterrows():
                 print(f"{row['name']}, Distance: {row['distance']} meters")
         print(
             f"\nData loading time: {round(load_data_time)} ms\nSearch time: {round(search_time)} ms"
@@ -1,11 +1,21 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import streamlit_folium
 import folium
-from folium.plugins import MarkerCluster, MiniMap
+from folium.plugins import FastMarkerCluster, MarkerCluster, MiniMap
 
-from main import main
+from main import config, main
+from modules.backends import BACKENDS
+from modules.deltas import dataset_version, load_deltas
+from modules.result_pages import DistanceCursor
+from modules.viewport import ViewportLoader, viewport_bounds
 from modules.config import (
+    BACKEND,
+    MAP_MAX_MARKERS,
+    MAP_ZOOM_START,
+    MAP_WIDTH,
+    MAP_HEIGHT,
     get_popular_places_paris,
     initial_configuration,
     default_parameters,
@@ -14,6 +24,18 @@ from modules.config import (
 # Retrieving popular places in Paris
 POPULAR_PLACES = get_popular_places_paris()
 
+# JavaScript marker factory of the fast map layer, called in the browser for each
+# [latitude, longitude, name, distance] row
+FAST_MARKER_CALLBACK = """
+var callback = function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 6, color: "green", fillColor: "green", fillOpacity: 0.7, weight: 1
+    });
+    marker.bindPopup("<b>" + row[2] + "</b><br>Distance: " + row[3] + " m");
+    return marker;
+};
+"""
+
 # Streamlit page configuration
 st.set_page_config(
     page_title="Let's Dine!",
@@ -80,11 +102,13 @@ class App:
             st.write("# Let's Dine")
 
         # Sidebar welcome message
-        st.caption("""Welcome to Let's Dine! A prototype to find a restaurant near you or a popular place.\n
+        st.caption(
+            """Welcome to Let's Dine! A prototype to find a restaurant near you or a popular place.\n
                    \nTo use the application, simply choose a location. 
                    \nIf you are curious, you can also use latitude and longitude.
                    \n Logo: DALL.E
-                   """)
+                   """
+        )
 
         st.divider()
 
@@ -117,43 +141,81 @@ class App:
 
         self.radius = st.number_input("Radius (in meters)", value=self.radius, step=100)
 
-        self.use_spark = st.sidebar.checkbox(
-            "Use Apache Spark for processing", value=self.use_spark
+        backends = ["auto", *BACKENDS]
+        self.backend = st.sidebar.selectbox(
+            "Search engine",
+            options=backends,
+            index=backends.index("spark" if self.use_spark else BACKEND),
+            help="'auto' picks an engine from the size of the dataset.",
+        )
+
+    @property
+    def search_key(self) -> str:
+        """
+        Identifier of the current search, under which its widgets keep their state.
+
+        It includes the version of the dataset and its delta segments, so a search
+        runs again once the data was updated, compacted or ingested again.
+        """
+        filepath = (
+            config["PARQUET_FILE_PATH_15M"]
+            if self.big_data
+            else config["PARQUET_FILE_PATH"]
+        )
+        version = dataset_version(filepath, load_deltas(filepath))
+        return (
+            f"{self.central_lat}_{self.central_lon}_{self.radius}_{self.backend}"
+            f"_{self.big_data}_{self.verbose}_{version}"
         )
 
+    def search_state(self) -> dict:
+        """
+        State of the current search, kept in the session between reruns.
+
+        The search runs only when its inputs change. Its results, and the objects
+        built from them by the map and the table, are then reused by the reruns
+        triggered by other widgets.
+
+        :return: Dictionary with the 'monitoring' and 'results' of the search, where
+            the map and the table keep their own objects.
+        """
+        state = st.session_state.get("search")
+        if state is None or state["key"] != self.search_key:
+            monitoring, nearby_restaurants = main(
+                latitude=self.central_lat,
+                longitude=self.central_lon,
+                radius=self.radius,
+                big_data=self.big_data,
+                verbose=self.verbose,
+                place=self.selected_place,
+                backend=self.backend,
+            )
+            state = {
+                "key": self.search_key,
+                "monitoring": monitoring,
+                "results": nearby_restaurants,
+            }
+            st.session_state["search"] = state
+        return state
+
     def get_nearby_restaurants(self):
         """
         Fetch nearby restaurants based on user input and display results.
         """
-        monitoring, nearby_restaurants = main(
-            latitude=self.central_lat,
-            longitude=self.central_lon,
-            radius=self.radius,
-            use_spark=self.use_spark,
-            big_data=self.big_data,
-            verbose=self.verbose,
-        )
+        state = self.search_state()
+        monitoring, nearby_restaurants = state["monitoring"], state["results"]
 
         # Displaying monitoring information
         st.write("### Monitoring")
         st.write("The monitoring section exists for development purposes only.")
 
-        col1, col2, col3 = st.columns([1, 0.5, 0.5])
+        col1, col2 = st.columns([1, 1])
 
         with col1:
             st.info(f"Number of restaurants: {monitoring['n_restaurants']}")
 
         with col2:
-            if self.use_spark:
-                st.error("Pandas: False")
-            else:
-                st.success("Pandas: True")
-
-        with col3:
-            if self.use_spark:
-                st.success("Spark: True")
-            else:
-                st.error("Spark: False")
+            st.success(f"Search engine: {monitoring['backend']}")
 
         col1, col2 = st.columns([1, 1])
 
@@ -164,46 +226,36 @@ class App:
 
         st.divider()
 
-        # Checking if the DataFrame is empty
-        if self.use_spark:
-            # Displaying restaurants if any are found
+        # Checking if the DataFrame is empty. Spark results are already materialized
+        # as a pandas DataFrame, so the map and the table share them without new jobs.
+        if not nearby_restaurants.empty:
             st.write(
                 f"### Restaurants found within a radius of :green[{self.radius}] meters around :green[{self.selected_place}]"
             )
             st.write(f"Your position is marked in :red[red], enjoy your meal!")
-            self.plot_map_spark(nearby_restaurants)
+            self.plot_map(nearby_restaurants)
             st.divider()
             st.write(
-                f"### List of :green[{nearby_restaurants.count()}] restaurants found on the map"
+                f"### List of :green[{len(nearby_restaurants)}] restaurants found on the map"
             )
-            self.plot_table_spark(nearby_restaurants)
-        elif not self.use_spark:
-            if not nearby_restaurants.empty:
-                st.write(
-                    f"### Restaurants found within a radius of :green[{self.radius}] meters around :green[{self.selected_place}]"
-                )
-                st.write(f"Your position is marked in :red[red], enjoy your meal!")
-                self.plot_map(nearby_restaurants)
-                st.divider()
-                st.write(
-                    f"### List of :green[{len(nearby_restaurants)}] restaurants found on the map"
-                )
-                self.plot_table(nearby_restaurants)
-            else:
-                st.write("No restaurants found within the specified radius.")
+            self.plot_table(nearby_restaurants)
+        else:
+            st.write("No restaurants found within the specified radius.")
 
-    def plot_map(self, nearby_restaurants: pd.DataFrame):
+    def base_map(self) -> folium.Map:
         """
-        Plot a map with markers for nearby restaurants using Folium.
+        Create the map of a search, without the restaurants layer.
 
-        :param nearby_restaurants: DataFrame containing restaurant data.
+        :return: Folium map centered on the search location.
         """
         # Custom map style
         tileset = "CartoDB positron"
 
         # Initializing the map
         map = folium.Map(
-            location=[self.central_lat, self.central_lon], tiles=tileset, zoom_start=12
+            location=[self.central_lat, self.central_lon],
+            tiles=tileset,
+            zoom_start=MAP_ZOOM_START,
         )
 
         # Marker for the reference point
@@ -213,94 +265,166 @@ class App:
             icon=folium.Icon(color="red"),
         ).add_to(map)
 
-        # Cluster for markers
-        marker_cluster = MarkerCluster().add_to(map)
-
-        # Adding markers for each restaurant
-        for index, row in nearby_restaurants.iterrows():
-            folium.Marker(
-                [row["latitude"], row["longitude"]],
-                popup=f"<b>{row['name']}</b><br>Distance: {row['distance']} m",
-                icon=folium.Icon(color="green", icon="cutlery", prefix="fa"),
-            ).add_to(marker_cluster)
-
         # Adding a MiniMap
         minimap = MiniMap(tileset=tileset)
         map.add_child(minimap)
 
-        # Displaying the map in Streamlit
-        streamlit_folium.st_folium(map, width=700, height=500)
+        return map
 
-    def plot_map_spark(self, nearby_restaurants: pd.DataFrame):
+    @st.fragment
+    def plot_map(self, nearby_restaurants: pd.DataFrame):
         """
-        Plot a map with markers for nearby restaurants, specifically for Spark dataframes.
+        Plot a map with markers for the nearby restaurants in view using Folium.
 
-        :param nearby_restaurants: Spark DataFrame containing restaurant data.
+        Only the restaurants of the map tiles in view are sent to the browser, as
+        clusters at low zoom levels, and they are updated as the user pans and zooms.
+        The map is a fragment: panning and zooming rerun it alone, with the map of
+        the search and its tiles kept in the session.
+
+        :param nearby_restaurants: DataFrame containing restaurant data.
         """
-        tileset = "CartoDB positron"
-        map = folium.Map(
-            location=[self.central_lat, self.central_lon], tiles=tileset, zoom_start=12
+        state = self.search_state()
+        if "map" not in state:
+            state["map"] = self.base_map()
+            state["viewport_loader"] = ViewportLoader(nearby_restaurants)
+
+        # Loading the restaurants of the viewport reported by the previous render, or of
+        # the initial view. Each search has its own map key, so a new search starts over.
+        map_key = f"map_{self.search_key}"
+        view = st.session_state.get(map_key) or {}
+        bounds = view.get("bounds") or {}
+        if bounds.get("_southWest", {}).get("lat") is not None:
+            zoom = view["zoom"]
+            box = (
+                bounds["_southWest"]["lat"],
+                bounds["_northEast"]["lat"],
+                bounds["_southWest"]["lng"],
+                bounds["_northEast"]["lng"],
+            )
+        else:
+            zoom = MAP_ZOOM_START
+            box = viewport_bounds(
+                self.central_lat, self.central_lon, zoom, MAP_WIDTH, MAP_HEIGHT
+            )
+        viewport, clustered = state["viewport_loader"].load(box, zoom)
+
+        # Adding the restaurants, in a single data-driven layer for large results
+        layer = folium.FeatureGroup(name="Restaurants")
+        if clustered:
+            self.add_clusters(layer, viewport)
+        elif len(viewport) > MAP_MAX_MARKERS:
+            self.add_fast_markers(layer, viewport)
+        else:
+            self.add_markers(layer, viewport)
+
+        # Displaying the map in Streamlit. Only the restaurants layer is updated when
+        # the viewport changes, and only the bounds and zoom are sent back.
+        streamlit_folium.st_folium(
+            state["map"],
+            key=map_key,
+            width=MAP_WIDTH,
+            height=MAP_HEIGHT,
+            feature_group_to_add=layer,
+            returned_objects=["bounds", "zoom"],
         )
 
-        folium.Marker(
-            [self.central_lat, self.central_lon],
-            popup="<b>You are here</b>",
-            icon=folium.Icon(color="red"),
-        ).add_to(map)
-
-        marker_cluster = MarkerCluster().add_to(map)
-
-        # Collect necessary data
-        rows = nearby_restaurants.select(
-            "latitude", "longitude", "name", "distance"
-        ).collect()
+    def add_markers(self, layer: folium.FeatureGroup, nearby_restaurants: pd.DataFrame):
+        """
+        Add a clustered marker with an icon and a popup for each restaurant.
 
-        for row in rows:
+        :param layer: Folium map or layer to add the markers to.
+        :param nearby_restaurants: DataFrame containing restaurant data.
+        """
+        marker_cluster = MarkerCluster().add_to(layer)
+
+        for latitude, longitude, name, distance in zip(
+            nearby_restaurants["latitude"].to_numpy(),
+            nearby_restaurants["longitude"].to_numpy(),
+            nearby_restaurants["name"].to_numpy(),
+            nearby_restaurants["distance"].to_numpy(),
+        ):
             folium.Marker(
-                [row["latitude"], row["longitude"]],
-                popup=f"<b>{row['name']}</b><br>Distance: {row['distance']} m",
+                [latitude, longitude],
+                popup=f"<b>{name}</b><br>Distance: {distance} m",
                 icon=folium.Icon(color="green", icon="cutlery", prefix="fa"),
             ).add_to(marker_cluster)
 
-        minimap = MiniMap(tileset=tileset)
-        map.add_child(minimap)
+    def add_fast_markers(
+        self, layer: folium.FeatureGroup, nearby_restaurants: pd.DataFrame
+    ):
+        """
+        Add the restaurants as a single cluster layer whose markers are created in the browser.
 
-        streamlit_folium.st_folium(map, width=700, height=500)
+        The rows are serialized once as a JSON array, instead of one Python object
+        and HTML popup per restaurant, which keeps large results fast to render.
 
+        :param layer: Folium map or layer to add the cluster layer to.
+        :param nearby_restaurants: DataFrame containing restaurant data.
+        """
+        data = (
+            nearby_restaurants[["latitude", "longitude", "name", "distance"]]
+            .to_numpy()
+            .tolist()
+        )
+        FastMarkerCluster(data, callback=FAST_MARKER_CALLBACK).add_to(layer)
+
+    def add_clusters(self, layer: folium.FeatureGroup, clusters: pd.DataFrame):
+        """
+        Add a circle sized by its number of restaurants for each cluster.
+
+        :param layer: Folium map or layer to add the circles to.
+        :param clusters: DataFrame with 'latitude', 'longitude' and 'count' columns.
+        """
+        for latitude, longitude, count in zip(
+            clusters["latitude"].to_numpy(),
+            clusters["longitude"].to_numpy(),
+            clusters["count"].to_numpy(),
+        ):
+            folium.CircleMarker(
+                [latitude, longitude],
+                radius=6 + 4 * np.log10(count),
+                color="green",
+                fill=True,
+                fill_opacity=0.6,
+                weight=1,
+                tooltip=f"{count} restaurants",
+            ).add_to(layer)
+
+    @st.fragment
     def plot_table(self, nearby_restaurants: pd.DataFrame):
         """
-        Display a sorted table of nearby restaurants.
+        Display a table of nearby restaurants by distance, one page at a time.
+
+        Only the visible page is sorted and sent to the browser (see
+        modules.result_pages). The table is a fragment: changing the page reruns it alone.
 
         :param nearby_restaurants: DataFrame containing restaurant data.
         """
-        # Sorting the DataFrame by distance in ascending order
-        sorted_nearby_restaurants = nearby_restaurants.sort_values(by="distance")
+        # Reusing the cursor of the search, so that its sorted rows are kept between pages
+        state = self.search_state()
+        if "cursor" not in state:
+            state["cursor"] = DistanceCursor(nearby_restaurants)
+        cursor = state["cursor"]
+
+        page_number = st.number_input(
+            f"Page (of {cursor.n_pages})",
+            min_value=1,
+            max_value=cursor.n_pages,
+            value=1,
+            key=f"page_{self.search_key}",
+        )
+        page = cursor.page(page_number - 1)
 
         # Defining the height for the DataFrame
-        height = 400 if len(sorted_nearby_restaurants) > 10 else None
+        height = 400 if len(page) > 10 else None
 
-        # Displaying the sorted DataFrame with style and defined height
+        # Displaying the visible page only, with style and defined height
         st.dataframe(
-            sorted_nearby_restaurants[["name", "distance", "latitude", "longitude"]],
+            page[["name", "distance", "latitude", "longitude"]],
             height=height,
             use_container_width=True,
         )
 
-    def plot_table_spark(self, nearby_restaurants: pd.DataFrame):
-        # Sort the DataFrame by distance in ascending order
-        sorted_nearby_restaurants = nearby_restaurants.orderBy("distance")
-
-        # Collect necessary data
-        sorted_nearby_restaurants = sorted_nearby_restaurants.select(
-            "name", "distance", "latitude", "longitude"
-        ).toPandas()
-
-        # Defining the height for the DataFrame
-        height = 400 if len(sorted_nearby_restaurants) > 10 else None
-
-        # Displaying the sorted DataFrame with style and defined height
-        st.dataframe(sorted_nearby_restaurants, height=height, use_container_width=True)
-
 
 # Exécution du script principal si ce fichier est exécuté directement
 if __name__ == "__main__":
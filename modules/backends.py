@@ -0,0 +1,331 @@
+import threading
+import pandas as pd
+import pyarrow.dataset as ds
+
+from modules.cache_data_fun import create_cache_decorator
+from modules.config import AUTO_PANDAS_MAX_ROWS, N_JOBS
+from modules.coordinate_store import load_coordinate_store
+from modules.deltas import apply_deltas, count_restaurants, load_deltas
+from modules.find_restaurants import find_nearby_restaurants
+from modules.find_restaurants_arrow import (
+    find_nearby_restaurants_arrow,
+    open_arrow_dataset,
+)
+from modules.find_restaurants_spark import find_nearby_restaurants_spark
+from modules.load_data import load_restaurants_from_parquet
+from modules.load_data_spark import (
+    apply_deltas_spark,
+    load_restaurants_from_parquet_spark,
+    spark_backend,
+)
+from modules.spatial_index import load_spatial_index
+from logger.logger import execution_logger
+
+# Create a caching decorator to keep dataset sizes between searches
+cache_decorator = create_cache_decorator()
+
+
+def load_restaurants_pandas(filepath: str, big_data: bool = False) -> tuple:
+    """
+    Load the restaurants and their spatial index for the non-Spark execution path.
+
+    The big data set is opened as a memory-mapped coordinate store, so it is shared
+    between processes through the OS page cache instead of being copied in each of them.
+    Both are loaded from the base file only: delta segments (see modules.deltas) are
+    applied to the search results, so updates never rebuild the table or its index.
+
+    :param filepath: Path to the Parquet file.
+    :param big_data: Flag to handle big data sets (default: False).
+    :return: Tuple (DataFrame or CoordinateStore of restaurants, spatial index).
+    """
+    if big_data:
+        restaurants = load_coordinate_store(filepath)
+    else:
+        restaurants = load_restaurants_from_parquet(filepath)
+    spatial_index = load_spatial_index(filepath)
+
+    return restaurants, spatial_index
+
+
+class SearchBackend:
+    """
+    Interface of the search engines.
+
+    A backend loads a dataset with its delta segments, searches it and counts its
+    restaurants. `search` returns results in the engine's own format, and `to_pandas`
+    converts them once for display.
+    """
+
+    name = None
+
+    def __init__(self, big_data: bool = False, n_jobs: int = N_JOBS):
+        """
+        Create a backend; no data is loaded until `load` is called.
+
+        :param big_data: Flag to handle big data sets.
+        :param n_jobs: Number of threads of in-process scans, -1 for one per CPU.
+        """
+        self.big_data = big_data
+        self.n_jobs = n_jobs
+        self.data_path = None
+        self.deltas = None
+
+    def load(self, data_path: str):
+        """
+        Load a dataset and its delta segments.
+
+        :param data_path: Path to the Parquet file or dataset directory.
+        """
+        raise NotImplementedError
+
+    def search(self, latitude: float, longitude: float, radius: float) -> object:
+        """
+        Find the restaurants within a radius, deltas included.
+
+        :param latitude: Latitude of the search location.
+        :param longitude: Longitude of the search location.
+        :param radius: Search radius in meters.
+        :return: Restaurants with a 'distance' column, in the engine's format.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """
+        Count the restaurants of the loaded dataset, deltas included.
+        """
+        raise NotImplementedError
+
+    def to_pandas(self, result: object) -> pd.DataFrame:
+        """
+        Convert a search result to a pandas DataFrame.
+        """
+        return result
+
+
+class PandasBackend(SearchBackend):
+    """
+    Vectorized scan of a pandas DataFrame, without any index to build or load,
+    split in chunks over `n_jobs` threads on large datasets.
+    """
+
+    name = "pandas"
+
+    def load(self, data_path: str):
+        self.data_path = data_path
+        self.deltas = load_deltas(data_path)
+        self.restaurants = load_restaurants_from_parquet(data_path)
+
+    def search(self, latitude: float, longitude: float, radius: float) -> object:
+        nearby_restaurants = find_nearby_restaurants(
+            self.restaurants, latitude, longitude, radius, n_jobs=self.n_jobs
+        )
+        return apply_deltas(
+            nearby_restaurants, self.deltas, latitude, longitude, radius
+        )
+
+    def count(self) -> int:
+        return count_restaurants(self.data_path, self.deltas, self.restaurants)
+
+
+class IndexBackend(PandasBackend):
+    """
+    Grid index lookups over a DataFrame, or over a memory-mapped coordinate store
+    for big data sets.
+    """
+
+    name = "numpy-index"
+
+    def load(self, data_path: str):
+        self.data_path = data_path
+        self.deltas = load_deltas(data_path)
+        self.restaurants, self.spatial_index = load_restaurants_pandas(
+            data_path, self.big_data
+        )
+
+    def search(self, latitude: float, longitude: float, radius: float) -> object:
+        nearby_restaurants = find_nearby_restaurants(
+            self.restaurants, latitude, longitude, radius, self.spatial_index
+        )
+        return apply_deltas(
+            nearby_restaurants, self.deltas, latitude, longitude, radius
+        )
+
+
+class SparkSearchBackend(SearchBackend):
+    """
+    Apache Spark search over the DataFrame persisted by the shared `spark_backend`.
+    """
+
+    name = "spark"
+
+    def load(self, data_path: str):
+        self.data_path = data_path
+        self.deltas = load_deltas(data_path)
+        spark_session, restaurants = load_restaurants_from_parquet_spark(data_path)
+        self.restaurants = apply_deltas_spark(restaurants, self.deltas, spark_session)
+
+    def search(self, latitude: float, longitude: float, radius: float) -> object:
+        return find_nearby_restaurants_spark(
+            self.restaurants, latitude, longitude, radius
+        )
+
+    def count(self) -> int:
+        return spark_backend.count(self.data_path, self.deltas)
+
+    def to_pandas(self, result: object) -> pd.DataFrame:
+        # Materialized once through Arrow, so displays share a single Spark job
+        return result.toPandas()
+
+
+class ArrowBackend(SearchBackend):
+    """
+    Multithreaded Arrow scans of the Parquet data with bounding-box pushdown,
+    nothing being held in memory between searches.
+    """
+
+    name = "arrow"
+
+    def load(self, data_path: str):
+        self.data_path = data_path
+        self.deltas = load_deltas(data_path)
+        self.dataset = open_arrow_dataset(data_path)
+
+    def search(self, latitude: float, longitude: float, radius: float) -> object:
+        nearby_restaurants = find_nearby_restaurants_arrow(
+            self.dataset, latitude, longitude, radius
+        )
+        return apply_deltas(
+            nearby_restaurants, self.deltas, latitude, longitude, radius
+        )
+
+    def count(self) -> int:
+        return count_restaurants(self.data_path, self.deltas)
+
+
+# Search backends by name
+BACKENDS = {
+    backend.name: backend
+    for backend in (PandasBackend, IndexBackend, ArrowBackend, SparkSearchBackend)
+}
+
+
+class BackendTimings:
+    """
+    Search times measured for each dataset and backend.
+
+    Times are kept as exponential moving averages, so that the choice of backend
+    follows changes of load on the machine.
+    """
+
+    def __init__(self, smoothing: float = 0.3):
+        """
+        Create an empty record of timings.
+
+        :param smoothing: Weight of the latest measure in the moving average.
+        """
+        self.smoothing = smoothing
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def record(self, data_path: str, backend: str, search_time: float):
+        """
+        Record the time of a search.
+
+        :param data_path: Path of the searched dataset.
+        :param backend: Name of the backend.
+        :param search_time: Search time in milliseconds.
+        """
+        with self._lock:
+            key = (data_path, backend)
+            previous = self._timings.get(key)
+            if previous is None:
+                self._timings[key] = search_time
+            else:
+                self._timings[key] = (
+                    self.smoothing * search_time + (1 - self.smoothing) * previous
+                )
+
+    def fastest(self, data_path: str, backends: list) -> str:
+        """
+        Find the fastest of some backends on a dataset.
+
+        :param data_path: Path of the searched dataset.
+        :param backends: Names of the candidate backends.
+        :return: Name of the fastest backend, or None unless at least two were measured.
+        """
+        with self._lock:
+            measured = {
+                backend: self._timings[(data_path, backend)]
+                for backend in backends
+                if (data_path, backend) in self._timings
+            }
+        if len(measured) < 2:
+            return None
+        return min(measured, key=measured.get)
+
+
+# Timings shared by the searches of the process
+backend_timings = BackendTimings()
+
+
+@cache_decorator
+def count_dataset_rows(data_path: str) -> int:
+    """
+    Count the rows of a Parquet file or dataset from its metadata.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :return: Number of rows.
+    """
+    return ds.dataset(data_path, format="parquet", partitioning="hive").count_rows()
+
+
+def select_backend(data_path: str) -> str:
+    """
+    Choose a backend for a dataset.
+
+    Datasets of at most AUTO_PANDAS_MAX_ROWS restaurants are scanned with pandas,
+    which has nothing to build, and larger ones use the grid index. Automatic
+    selection only runs the backend it picks, so the search times recorded in
+    `backend_timings` only override this rule once searches were run in the same
+    process with at least two explicit `backend=` choices on the dataset. Spark is only considered once its session is running, so the
+    automatic choice never pays the JVM startup.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :return: Name of the backend.
+    """
+    candidates = [PandasBackend.name, IndexBackend.name, ArrowBackend.name]
+    if spark_backend.started:
+        candidates.append(SparkSearchBackend.name)
+
+    backend = backend_timings.fastest(data_path, candidates)
+    if backend is None:
+        if count_dataset_rows(data_path) <= AUTO_PANDAS_MAX_ROWS:
+            backend = PandasBackend.name
+        else:
+            backend = IndexBackend.name
+    execution_logger.info(f"Backend selected: {backend}")
+    return backend
+
+
+def create_backend(
+    name: str, data_path: str, big_data: bool = False, n_jobs: int = N_JOBS
+) -> SearchBackend:
+    """
+    Create and load a search backend.
+
+    :param name: Name of the backend, or "auto" to select it with `select_backend`.
+    :param data_path: Path to the Parquet file or dataset directory.
+    :param big_data: Flag to handle big data sets.
+    :param n_jobs: Number of threads of in-process scans, -1 for one per CPU.
+    :return: Loaded backend.
+    """
+    if name == "auto":
+        name = select_backend(data_path)
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend: {name}, expected 'auto' or one of {list(BACKENDS)}."
+        )
+
+    backend = BACKENDS[name](big_data, n_jobs)
+    backend.load(data_path)
+    return backend
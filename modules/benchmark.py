@@ -0,0 +1,351 @@
+import csv
+import json
+import os
+import platform
+import shutil
+import statistics
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules.backends import SparkSearchBackend, create_backend
+from modules.cache_data_fun import data_cache
+from modules.config import (
+    AUTO_PANDAS_MAX_ROWS,
+    BENCHMARK_BACKENDS,
+    BENCHMARK_DATA_DIR,
+    BENCHMARK_MIN_REGRESSION_MS,
+    BENCHMARK_RADII,
+    BENCHMARK_REPEATS,
+    BENCHMARK_SIZES,
+    BENCHMARK_TOLERANCE,
+    MAP_HEIGHT,
+    MAP_WIDTH,
+    MAP_ZOOM_START,
+    get_popular_places_paris,
+)
+from modules.coordinate_store import get_store_path
+from modules.load_data_spark import spark_backend
+from modules.result_pages import DistanceCursor
+from modules.spatial_index import get_index_file_path
+from modules.viewport import ViewportLoader, viewport_bounds
+from logger.logger import execution_logger
+
+# Bounding box of Paris, (min_lat, max_lat, min_lon, max_lon), for the background restaurants
+PARIS_BOX = (48.815, 48.902, 2.225, 2.470)
+# Share of the restaurants spread around popular places, the others being uniform over Paris
+HOTSPOT_SHARE = 0.7
+# Standard deviation of the restaurant positions around a popular place, in degrees (~1.5 km)
+HOTSPOT_SPREAD = 0.0135
+# Number of restaurants generated and written at once
+GENERATION_CHUNK_SIZE = 1_000_000
+# Phases timed by the benchmark, as result fields
+PHASES = ("load_ms", "search_ms", "display_ms")
+
+
+def generate_restaurants(n_rows: int, seed: int = 0, start: int = 0) -> pa.Table:
+    """
+    Generate simulated restaurants with a Paris-like spatial distribution.
+
+    Most restaurants are spread around the popular places of Paris, denser in the
+    center like the real data, and the others uniformly over the city.
+
+    :param n_rows: Number of restaurants.
+    :param seed: Seed of the random generator.
+    :param start: Number of the first restaurant, used in the names.
+    :return: Arrow table with 'name', 'latitude' and 'longitude' columns.
+    """
+    rng = np.random.default_rng(seed)
+    hotspots = np.array(list(get_popular_places_paris().values()))
+    min_lat, max_lat, min_lon, max_lon = PARIS_BOX
+
+    n_hotspot = int(n_rows * HOTSPOT_SHARE)
+    centers = hotspots[rng.integers(0, len(hotspots), n_hotspot)]
+    latitudes = np.concatenate(
+        [
+            rng.normal(centers[:, 0], HOTSPOT_SPREAD),
+            rng.uniform(min_lat, max_lat, n_rows - n_hotspot),
+        ]
+    )
+    longitudes = np.concatenate(
+        [
+            rng.normal(centers[:, 1], HOTSPOT_SPREAD),
+            rng.uniform(min_lon, max_lon, n_rows - n_hotspot),
+        ]
+    )
+    order = rng.permutation(n_rows)
+
+    return pa.table(
+        {
+            "name": [f"Restaurant_{i}" for i in range(start, start + n_rows)],
+            "latitude": latitudes[order],
+            "longitude": longitudes[order],
+        }
+    )
+
+
+def write_benchmark_dataset(n_rows: int, data_dir: str = BENCHMARK_DATA_DIR) -> str:
+    """
+    Write a simulated dataset to Parquet, unless it already exists.
+
+    The dataset is generated and written in chunks, so the 15M rows one fits in memory.
+
+    :param n_rows: Number of restaurants.
+    :param data_dir: Directory of the benchmark datasets.
+    :return: Path to the Parquet file.
+    """
+    file_path = os.path.join(data_dir, f"restaurants_simulated_{n_rows}.parquet")
+    if os.path.exists(file_path):
+        return file_path
+
+    os.makedirs(data_dir, exist_ok=True)
+    temporary_path = f"{file_path}.tmp"
+    writer = None
+    try:
+        for seed, start in enumerate(range(0, n_rows, GENERATION_CHUNK_SIZE)):
+            chunk = generate_restaurants(
+                min(GENERATION_CHUNK_SIZE, n_rows - start), seed, start
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(temporary_path, chunk.schema)
+            writer.write_table(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(temporary_path, file_path)
+
+    execution_logger.info(f"Benchmark dataset of {n_rows} rows written to {file_path}")
+    return file_path
+
+
+def remove_load_artifacts(data_path: str):
+    """
+    Remove the spatial index and coordinate store built next to a dataset.
+
+    They are reused by the next loads, so the first run of a benchmark would time
+    their build and the next ones only their opening.
+
+    :param data_path: Path to the Parquet file.
+    """
+    if os.path.exists(get_index_file_path(data_path)):
+        os.remove(get_index_file_path(data_path))
+    shutil.rmtree(get_store_path(data_path), ignore_errors=True)
+
+
+def display_results(backend: object, result: object, latitude: float, longitude: float):
+    """
+    Prepare a search result for display, as the web app does after each search.
+
+    The result is converted to pandas, the restaurants of the initial map view are
+    loaded and the first page of the table is sorted.
+
+    :param backend: Backend which returned the result.
+    :param result: Search result, in the backend's format.
+    :param latitude: Latitude of the search location.
+    :param longitude: Longitude of the search location.
+    :return: DataFrame of the result.
+    """
+    nearby_restaurants = backend.to_pandas(result)
+    ViewportLoader(nearby_restaurants).load(
+        viewport_bounds(latitude, longitude, MAP_ZOOM_START, MAP_WIDTH, MAP_HEIGHT),
+        MAP_ZOOM_START,
+    )
+    DistanceCursor(nearby_restaurants).page(0)
+    return nearby_restaurants
+
+
+def run_benchmark(
+    sizes: tuple = BENCHMARK_SIZES,
+    backends: tuple = BENCHMARK_BACKENDS,
+    radii: tuple = BENCHMARK_RADII,
+    repeats: int = BENCHMARK_REPEATS,
+    data_dir: str = BENCHMARK_DATA_DIR,
+) -> list:
+    """
+    Time the loading, search and display of each backend on simulated datasets.
+
+    Loading is timed once per dataset and backend, from a cold in-process cache and
+    without the files built by previous loads, so it always includes building the
+    spatial index and coordinate store and runs can be compared with each other.
+    Each search is run at `repeats` popular places, and the median times are kept.
+
+    :param sizes: Numbers of restaurants of the datasets.
+    :param backends: Names of the backends.
+    :param radii: Search radii in meters.
+    :param repeats: Number of searches per dataset, backend and radius.
+    :param data_dir: Directory of the benchmark datasets.
+    :return: List of results, one dictionary per dataset, backend and radius.
+    """
+    locations = list(get_popular_places_paris().values())
+    results = []
+
+    for n_rows in sizes:
+        data_path = write_benchmark_dataset(n_rows, data_dir)
+        for backend_name in backends:
+            data_cache.clear()
+            remove_load_artifacts(data_path)
+            if backend_name == SparkSearchBackend.name:
+                spark_backend.unpersist()
+
+            start_time = time.perf_counter()
+            backend = create_backend(
+                backend_name, data_path, big_data=n_rows > AUTO_PANDAS_MAX_ROWS
+            )
+            load_time = (time.perf_counter() - start_time) * 1000
+
+            for radius in radii:
+                search_times, display_times, n_results = [], [], []
+                for latitude, longitude in (
+                    locations[i % len(locations)] for i in range(repeats)
+                ):
+                    start_time = time.perf_counter()
+                    result = backend.search(latitude, longitude, radius)
+                    search_times.append((time.perf_counter() - start_time) * 1000)
+
+                    start_time = time.perf_counter()
+                    nearby_restaurants = display_results(
+                        backend, result, latitude, longitude
+                    )
+                    display_times.append((time.perf_counter() - start_time) * 1000)
+                    n_results.append(len(nearby_restaurants))
+
+                results.append(
+                    {
+                        "n_rows": n_rows,
+                        "backend": backend_name,
+                        "radius": radius,
+                        "load_ms": round(load_time, 3),
+                        "search_ms": round(statistics.median(search_times), 3),
+                        "display_ms": round(statistics.median(display_times), 3),
+                        "n_results": int(statistics.median(n_results)),
+                    }
+                )
+                execution_logger.info(f"Benchmark: {results[-1]}")
+
+    return results
+
+
+def write_benchmark_results(results: list, output_file_path: str):
+    """
+    Write benchmark results to a JSON or CSV file, depending on its extension.
+
+    The JSON file also describes the machine, to compare runs on the same one only.
+
+    :param results: Results of `run_benchmark`.
+    :param output_file_path: Path of the output file, ending with '.json' or '.csv'.
+    """
+    if output_file_path.endswith(".csv"):
+        with open(output_file_path, "w", newline="") as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        environment = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        }
+        with open(output_file_path, "w") as output_file:
+            json.dump(
+                {"environment": environment, "results": results}, output_file, indent=2
+            )
+
+
+def read_benchmark_results(file_path: str) -> list:
+    """
+    Read benchmark results written by `write_benchmark_results`.
+
+    :param file_path: Path of a JSON or CSV results file.
+    :return: List of results.
+    """
+    if file_path.endswith(".csv"):
+        with open(file_path, newline="") as results_file:
+            return [
+                {
+                    "n_rows": int(row["n_rows"]),
+                    "backend": row["backend"],
+                    "radius": float(row["radius"]),
+                    **{phase: float(row[phase]) for phase in PHASES},
+                    "n_results": int(row["n_results"]),
+                }
+                for row in csv.DictReader(results_file)
+            ]
+    with open(file_path) as results_file:
+        return json.load(results_file)["results"]
+
+
+def compare_with_baseline(
+    results: list,
+    baseline: list,
+    tolerance: float = BENCHMARK_TOLERANCE,
+    min_regression_ms: float = BENCHMARK_MIN_REGRESSION_MS,
+) -> list:
+    """
+    Find the phases slower than in a baseline run.
+
+    A phase regresses when it is more than `tolerance` slower than in the baseline
+    and by more than `min_regression_ms`, which ignores the noise of fast phases.
+    Results without a baseline counterpart are skipped.
+
+    :param results: Results of `run_benchmark`.
+    :param baseline: Results of a previous run, as read by `read_benchmark_results`.
+    :param tolerance: Relative slowdown allowed, 0.2 for 20%.
+    :param min_regression_ms: Absolute slowdown allowed, in milliseconds.
+    :return: List of regressions with the baseline and current times of each phase.
+    """
+    baseline_results = {
+        (result["n_rows"], result["backend"], float(result["radius"])): result
+        for result in baseline
+    }
+
+    regressions = []
+    for result in results:
+        key = (result["n_rows"], result["backend"], float(result["radius"]))
+        if key not in baseline_results:
+            continue
+        for phase in PHASES:
+            baseline_ms = baseline_results[key][phase]
+            current_ms = result[phase]
+            if (
+                current_ms > baseline_ms * (1 + tolerance)
+                and current_ms - baseline_ms > min_regression_ms
+            ):
+                regressions.append(
+                    {
+                        "n_rows": key[0],
+                        "backend": key[1],
+                        "radius": key[2],
+                        "phase": phase,
+                        "baseline_ms": baseline_ms,
+                        "current_ms": current_ms,
+                    }
+                )
+    return regressions
+
+
+def format_benchmark_results(results: list) -> str:
+    """
+    Format benchmark results as one Markdown table per dataset, as in pipeline.md.
+
+    :param results: Results of `run_benchmark`.
+    :return: Markdown text.
+    """
+    lines = []
+    for n_rows in sorted({result["n_rows"] for result in results}):
+        lines += [
+            f"## {n_rows:,} restaurants".replace(",", " "),
+            "",
+            "| Backend | Radius (m) | Loading (ms) | Search (ms) | Display (ms) | Results |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        lines += [
+            f"| {result['backend']} | {result['radius']:g} | {result['load_ms']:.0f} "
+            f"| {result['search_ms']:.1f} | {result['display_ms']:.1f} "
+            f"| {result['n_results']} |"
+            for result in results
+            if result["n_rows"] == n_rows
+        ]
+        lines.append("")
+    return "\n".join(lines)
@@ -1,23 +1,225 @@
+import functools
+import inspect
+import os
 import sys
-import streamlit as st
+import threading
+from collections import OrderedDict
 
+import numpy as np
+import pandas as pd
 
+from modules.config import CACHE_MAX_BYTES
 
-def is_streamlit_active():
+
+def file_fingerprint(file_path: str) -> tuple:
+    """
+    Identify the current version of a file from its modification time and size.
+
+    For a directory, the latest modification time and the total size of the files
+    it contains are used, so adding, removing or rewriting any of them is detected.
+
+    :param file_path: Path to the file or directory.
+    :return: Tuple (modification time in nanoseconds, size in bytes).
+    """
+    stat = os.stat(file_path)
+    if not os.path.isdir(file_path):
+        return stat.st_mtime_ns, stat.st_size
+
+    mtime, size = stat.st_mtime_ns, 0
+    for root, dirs, files in os.walk(file_path):
+        for name in dirs:
+            mtime = max(mtime, os.stat(os.path.join(root, name)).st_mtime_ns)
+        for name in files:
+            file_stat = os.stat(os.path.join(root, name))
+            mtime = max(mtime, file_stat.st_mtime_ns)
+            size += file_stat.st_size
+    return mtime, size
+
+
+def estimate_size(value: object, sample_size: int = 1000) -> int:
+    """
+    Estimate the memory held by a cached value, in bytes.
+
+    DataFrames are measured from their buffers, with the size of object columns
+    extrapolated from a sample of rows. Memory-mapped arrays count as zero since
+    their pages belong to the OS page cache. Containers, dictionaries included,
+    are measured from their items.
+
+    :param value: Value to measure.
+    :param sample_size: Number of rows sampled to measure object columns.
+    :return: Estimated size in bytes.
     """
-    Check if Streamlit is the active runtime environment.
+    if isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(index=True, deep=False).sum())
+        object_columns = value.select_dtypes(include="object").columns
+        if len(object_columns) and len(value):
+            sample = value[object_columns].head(sample_size)
+            per_row = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+            size += int(per_row * len(value))
+        return size
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(key) + estimate_size(item) for key, item in value.items()
+        )
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sum(
+            estimate_size(item)
+            for item in vars(value).values()
+            if isinstance(
+                item, (pd.DataFrame, pd.Index, np.ndarray, tuple, list, dict)
+            )
+        )
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    """
+    Memory-bounded LRU cache for loaded datasets.
+
+    Every entry remembers the fingerprints of the files it was loaded from and is
+    dropped when one of them changes. When the estimated size of the entries goes
+    over `max_bytes`, the least recently used ones are evicted.
     """
-    return "streamlit" in sys.modules
 
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        """
+        Create an empty cache.
+
+        :param max_bytes: Maximum estimated size of the cached values, in bytes.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: tuple, fingerprints: tuple) -> tuple:
+        """
+        Look up a value.
+
+        :param key: Key of the value.
+        :param fingerprints: Current fingerprints of the files the value depends on.
+        :return: Tuple (found, value).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == fingerprints:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value: object, fingerprints: tuple):
+        """
+        Store a value, evicting least recently used values to stay within the bound.
+
+        Values larger than the bound are not stored.
+
+        :param key: Key of the value.
+        :param value: Value to store.
+        :param fingerprints: Fingerprints of the files the value depends on.
+        """
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, fingerprints)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: tuple):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def clear(self, prefix: tuple = ()):
+        """
+        Remove the values whose key starts with `prefix`, or all of them.
+
+        :param prefix: Key prefix of the values to remove.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[: len(prefix)] == prefix]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        :return: Dictionary with hits, misses, evictions, entries, current and max bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Cache shared by all loaders, so that the memory bound applies to all datasets
+data_cache = DataCache()
+
+
+def create_cache_decorator(cache: DataCache = None):
+    """
+    Create a decorator caching the results of a loader function.
+
+    Results are keyed by the function and its arguments. Arguments that are paths
+    to existing files or directories also tie the result to the current version of
+    these files, so a changed file is loaded again instead of being served stale.
+    The same in-process cache is used under Streamlit and from the command line.
+
+    :param cache: Cache storing the results, the shared `data_cache` by default.
+    :return: Decorator to apply to loader functions.
+    """
+    if cache is None:
+        cache = data_cache
+
+    def cache_decorator(func):
+        signature = inspect.signature(func)
+        prefix = (func.__module__, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound_args = signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            arguments = tuple(bound_args.arguments.items())
+
+            key = prefix + arguments
+            fingerprints = tuple(
+                file_fingerprint(value)
+                for _, value in arguments
+                if isinstance(value, str) and os.path.exists(value)
+            )
 
-def create_cache_decorator(force_lru_cache: bool = False):
-    if is_streamlit_active() and not force_lru_cache:
-        cache_decorator = st.cache_data
-        print("Streamlit Cache.")
-    else:
-        from functools import lru_cache
+            found, value = cache.get(key, fingerprints)
+            if not found:
+                value = func(*args, **kwargs)
+                cache.put(key, value, fingerprints)
+            return value
 
-        cache_decorator = lru_cache(maxsize=None)
-        print("LRU Cache.")
+        wrapper.cache_clear = lambda: cache.clear(prefix)
+        return wrapper
 
     return cache_decorator
@@ -4,6 +4,31 @@ RADIUS = 1000
 USE_SPARK = False
 BIG_DATA = False
 VERBOSE = False
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+CACHE_MAX_BYTES = 4 * 1024**3
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 600
+POPULAR_PLACES_MAX_RADIUS = 5000
+DELTA_COMPACTION_SEGMENTS = 16
+SPARK_MASTER = "local[*]"
+SPARK_SHUFFLE_PARTITIONS = 8
+BACKEND = "auto"
+AUTO_PANDAS_MAX_ROWS = 100_000
+N_JOBS = -1
+MAP_MAX_MARKERS = 500
+MAP_ZOOM_START = 12
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+VIEWPORT_MAX_POINTS = 2000
+TABLE_PAGE_SIZE = 50
+BENCHMARK_SIZES = (6_000, 100_000, 1_000_000, 15_000_000)
+BENCHMARK_BACKENDS = ("pandas", "numpy-index", "arrow")
+BENCHMARK_RADII = (500, 1000, 5000)
+BENCHMARK_REPEATS = 5
+BENCHMARK_DATA_DIR = "input_data/benchmark"
+BENCHMARK_TOLERANCE = 0.2
+BENCHMARK_MIN_REGRESSION_MS = 5
 
 
 def default_parameters():
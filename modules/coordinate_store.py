@@ -0,0 +1,235 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from modules.cache_data_fun import create_cache_decorator, file_fingerprint
+from logger.logger import loading_logger
+
+# Array files of a store version, found directly in the store directory of older stores
+STORE_FILES = ("latitude.npy", "longitude.npy", "name_offsets.npy", "name_data.bin")
+
+# Create a caching decorator to keep stores open between searches
+cache_decorator = create_cache_decorator()
+
+
+class CoordinateStore:
+    """
+    Read-only restaurant table backed by memory-mapped files.
+
+    A store is a directory holding contiguous `latitude.npy` and `longitude.npy`
+    arrays and a name table made of UTF-8 bytes (`name_data.bin`) indexed by
+    `name_offsets.npy`. The files are opened with mmap, so every process opening
+    the same store shares its pages through the OS page cache.
+
+    The arrays of each conversion are written to their own version directory, and
+    `metadata.json` names the current one. A conversion never writes into files
+    that another process may have mapped.
+    """
+
+    def __init__(self, store_path: str):
+        """
+        Open an existing store.
+
+        :param store_path: Path to the store directory.
+        """
+        with open(os.path.join(store_path, "metadata.json"), "r") as file:
+            self.metadata = json.load(file)
+
+        self.store_path = store_path
+        version_path = os.path.join(store_path, self.metadata.get("version", ""))
+        self.latitude = np.load(
+            os.path.join(version_path, "latitude.npy"), mmap_mode="r"
+        )
+        self.longitude = np.load(
+            os.path.join(version_path, "longitude.npy"), mmap_mode="r"
+        )
+        self.name_offsets = np.load(
+            os.path.join(version_path, "name_offsets.npy"), mmap_mode="r"
+        )
+        name_data_path = os.path.join(version_path, "name_data.bin")
+        if os.path.getsize(name_data_path) > 0:
+            self.name_data = np.memmap(name_data_path, dtype="uint8", mode="r")
+        else:
+            self.name_data = np.empty(0, dtype="uint8")
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    @property
+    def fingerprint(self) -> tuple:
+        return tuple(self.metadata["fingerprint"])
+
+    def names(self, positions: np.ndarray) -> list:
+        """
+        Decode the names of some rows.
+
+        :param positions: Row positions.
+        :return: List of names.
+        """
+        starts = self.name_offsets[positions]
+        stops = self.name_offsets[np.asarray(positions) + 1]
+        return [
+            self.name_data[start:stop].tobytes().decode("utf-8")
+            for start, stop in zip(starts, stops)
+        ]
+
+    def take(self, positions: np.ndarray) -> pd.DataFrame:
+        """
+        Materialize some rows as a DataFrame.
+
+        :param positions: Row positions.
+        :return: DataFrame with 'name', 'latitude' and 'longitude' columns.
+        """
+        positions = np.asarray(positions, dtype="int64")
+        return pd.DataFrame(
+            {
+                "name": pd.Series(self.names(positions), dtype="object"),
+                "latitude": self.latitude[positions].astype("float64"),
+                "longitude": self.longitude[positions].astype("float64"),
+            }
+        )
+
+
+def get_store_path(data_file_path: str) -> str:
+    """
+    Path of the coordinate store kept next to a data file.
+
+    :param data_file_path: Path to the Parquet file.
+    :return: Path to the store directory.
+    """
+    return f"{os.path.splitext(data_file_path.rstrip(os.sep))[0]}.coords"
+
+
+def convert_parquet_to_store(
+    parquet_file_path: str,
+    store_path: str = None,
+    dtype: str = "float64",
+    batch_size: int = 1_000_000,
+) -> str:
+    """
+    Convert a restaurants Parquet file or dataset to a memory-mappable coordinate store.
+
+    The file is read batch by batch and written straight into the mapped arrays,
+    so the conversion never holds the whole table in memory. Row order is kept,
+    so row positions are the same as in the Parquet file.
+
+    The arrays are written to a new version directory, then `metadata.json` is
+    replaced atomically to point to it, and the previous versions are removed.
+    Processes which mapped a previous version keep reading its files, which are
+    only freed once they are unmapped.
+
+    :param parquet_file_path: Path to the Parquet file or partitioned dataset directory.
+    :param store_path: Path to the store directory, next to the Parquet file by default.
+    :param dtype: Type of the coordinate arrays, "float64" or "float32".
+    :param batch_size: Number of rows converted at once.
+    :return: Path to the store directory.
+    """
+    store_path = store_path or get_store_path(parquet_file_path)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    version_path = os.path.join(store_path, version)
+    os.makedirs(version_path)
+    loading_logger.info(f"Converting {parquet_file_path} to {version_path}.")
+
+    dataset = ds.dataset(parquet_file_path, format="parquet", partitioning="hive")
+    n_rows = dataset.count_rows()
+
+    latitude = np.lib.format.open_memmap(
+        os.path.join(version_path, "latitude.npy"),
+        mode="w+",
+        dtype=dtype,
+        shape=(n_rows,),
+    )
+    longitude = np.lib.format.open_memmap(
+        os.path.join(version_path, "longitude.npy"),
+        mode="w+",
+        dtype=dtype,
+        shape=(n_rows,),
+    )
+    name_offsets = np.lib.format.open_memmap(
+        os.path.join(version_path, "name_offsets.npy"),
+        mode="w+",
+        dtype="int64",
+        shape=(n_rows + 1,),
+    )
+    name_offsets[0] = 0
+
+    start = 0
+    with open(os.path.join(version_path, "name_data.bin"), "wb") as name_data:
+        for batch in dataset.to_batches(
+            batch_size=batch_size, columns=["name", "latitude", "longitude"]
+        ):
+            stop = start + batch.num_rows
+            latitude[start:stop] = batch.column("latitude").to_numpy()
+            longitude[start:stop] = batch.column("longitude").to_numpy()
+
+            names = batch.column("name").cast(pa.large_string()).fill_null("")
+            offsets = np.frombuffer(names.buffers()[1], dtype="int64")[
+                names.offset : names.offset + len(names) + 1
+            ]
+            data = names.buffers()[2]
+            if data is not None:
+                name_data.write(memoryview(data)[offsets[0] : offsets[-1]])
+            name_offsets[start + 1 : stop + 1] = (
+                name_offsets[start] + offsets[1:] - offsets[0]
+            )
+            start = stop
+
+    for array in (latitude, longitude, name_offsets):
+        array.flush()
+
+    # The metadata is switched last, so a store is only valid once fully converted
+    metadata_path = os.path.join(store_path, "metadata.json")
+    with open(f"{metadata_path}.{version}.tmp", "w") as file:
+        json.dump(
+            {
+                "n_rows": n_rows,
+                "dtype": dtype,
+                "fingerprint": list(file_fingerprint(parquet_file_path)),
+                "version": version,
+            },
+            file,
+        )
+    os.replace(f"{metadata_path}.{version}.tmp", metadata_path)
+
+    # Removing the previous versions only unlinks their files, mapped ones stay readable
+    for entry in os.listdir(store_path):
+        entry_path = os.path.join(store_path, entry)
+        if entry != version and entry.startswith("v") and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+        elif entry in STORE_FILES:
+            os.remove(entry_path)
+
+    return store_path
+
+
+@cache_decorator
+def load_coordinate_store(parquet_file_path: str) -> CoordinateStore:
+    """
+    Open the coordinate store of a Parquet file, converting the file if needed.
+
+    The store is rebuilt when the Parquet file's modification time or size no
+    longer match the ones it was converted from.
+
+    :param parquet_file_path: Path to the Parquet file.
+    :return: CoordinateStore with the same rows as the Parquet file.
+    """
+    store_path = get_store_path(parquet_file_path)
+    fingerprint = file_fingerprint(parquet_file_path)
+
+    if os.path.exists(os.path.join(store_path, "metadata.json")):
+        try:
+            store = CoordinateStore(store_path)
+            if store.fingerprint == fingerprint:
+                loading_logger.info(f"Coordinate store opened from {store_path}.")
+                return store
+            loading_logger.info("Coordinate store is outdated, converting again.")
+        except Exception as e:
+            loading_logger.error(f"Error while opening coordinate store: {e}")
+
+    convert_parquet_to_store(parquet_file_path, store_path)
+    return CoordinateStore(store_path)
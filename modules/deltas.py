@@ -0,0 +1,400 @@
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from modules.cache_data_fun import create_cache_decorator, file_fingerprint
+from modules.config import DELTA_COMPACTION_SEGMENTS
+from modules.find_restaurants import (
+    find_nearby_restaurants,
+    find_nearby_restaurants_multi,
+    get_coordinates,
+    take_restaurants,
+)
+from modules.load_data import (
+    SEARCH_COLUMNS,
+    is_partitioned,
+    write_restaurants_to_parquet,
+)
+from logger.logger import loading_logger
+
+# Create a caching decorator to keep the delta set of a dataset between searches
+cache_decorator = create_cache_decorator()
+
+# Columns identifying a restaurant in delta segments; restaurants have no other id
+DELTA_KEY_COLUMNS = SEARCH_COLUMNS
+
+# Operations recorded by delta segments
+DELTA_OPERATIONS = ("upsert", "delete")
+
+# Delta segment file names: sequence number and operation
+SEGMENT_PATTERN = re.compile(r"^(\d{8})-(upsert|delete)\.parquet$")
+
+# Serializes segment numbering and compactions within the process
+_write_lock = threading.Lock()
+_compaction_lock = threading.Lock()
+_compaction_thread = None
+
+
+class DeltaSet:
+    """
+    Net effect of the delta segments of a dataset on its base file.
+
+    `appended` holds the restaurants upserted and not deleted since, and `removed`
+    the keys of the base rows hidden by the segments: deleted restaurants as well as
+    upserted ones, so that an upsert never duplicates a base row. Applying a delta
+    set twice gives the same result, which lets readers race with a compaction.
+    """
+
+    def __init__(self, appended: pd.DataFrame, removed: pd.MultiIndex, version: tuple):
+        """
+        Create a delta set.
+
+        :param appended: DataFrame of restaurants added by the segments.
+        :param removed: Keys of the base restaurants hidden by the segments.
+        :param version: Names of the segments the set was built from.
+        """
+        self.appended = appended
+        self.removed = removed
+        self.version = version
+        # Number of base rows hidden by the set, by `dataset_version` of the base
+        self.removed_counts = {}
+
+    @property
+    def empty(self) -> bool:
+        return not self.version
+
+
+def get_delta_dir(data_path: str) -> str:
+    """
+    Path of the directory holding the delta segments of a dataset.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :return: Path to the delta directory.
+    """
+    return f"{os.path.splitext(data_path.rstrip(os.sep))[0]}.deltas"
+
+
+def list_segments(data_path: str) -> list:
+    """
+    List the delta segments of a dataset in the order they were written.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :return: Sorted list of segment file names.
+    """
+    delta_dir = get_delta_dir(data_path)
+    if not os.path.isdir(delta_dir):
+        return []
+    return sorted(name for name in os.listdir(delta_dir) if SEGMENT_PATTERN.match(name))
+
+
+def key_index(restaurants_df: pd.DataFrame) -> pd.MultiIndex:
+    """
+    Build the keys of some restaurants.
+
+    :param restaurants_df: DataFrame with the key columns.
+    :return: MultiIndex of (name, latitude, longitude) keys.
+    """
+    return pd.MultiIndex.from_frame(
+        restaurants_df[list(DELTA_KEY_COLUMNS)].astype(
+            {"latitude": "float64", "longitude": "float64"}
+        )
+    )
+
+
+def _write_segment(data_path: str, restaurants_df: pd.DataFrame, operation: str):
+    """
+    Write a delta segment after the existing ones.
+    """
+    if operation not in DELTA_OPERATIONS:
+        raise ValueError(f"Unknown delta operation: {operation}.")
+
+    delta_dir = get_delta_dir(data_path)
+    os.makedirs(delta_dir, exist_ok=True)
+    segment_df = restaurants_df[list(DELTA_KEY_COLUMNS)].astype(
+        {"latitude": "float64", "longitude": "float64"}
+    )
+
+    with _write_lock:
+        segments = list_segments(data_path)
+        sequence = (
+            int(SEGMENT_PATTERN.match(segments[-1]).group(1)) + 1 if segments else 1
+        )
+        segment_path = os.path.join(delta_dir, f"{sequence:08d}-{operation}.parquet")
+
+        # Written under a temporary name so that readers never see a partial segment
+        segment_df.to_parquet(f"{segment_path}.tmp", index=False)
+        os.replace(f"{segment_path}.tmp", segment_path)
+
+    loading_logger.info(f"{len(segment_df)} restaurants written to {segment_path}.")
+    if len(segments) + 1 >= DELTA_COMPACTION_SEGMENTS:
+        start_background_compaction(data_path)
+    return segment_path
+
+
+def upsert_restaurants(data_path: str, restaurants_df: pd.DataFrame) -> str:
+    """
+    Add restaurants to a dataset without rewriting it.
+
+    The restaurants are written to a new delta segment. A restaurant already in the
+    dataset with the same name and coordinates is replaced rather than duplicated.
+    To move or rename a restaurant, delete it and upsert the new version.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :param restaurants_df: DataFrame with 'name', 'latitude' and 'longitude' columns.
+    :return: Path to the delta segment.
+    """
+    return _write_segment(data_path, restaurants_df, "upsert")
+
+
+def delete_restaurants(data_path: str, restaurants_df: pd.DataFrame) -> str:
+    """
+    Remove restaurants from a dataset without rewriting it.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :param restaurants_df: DataFrame with the 'name', 'latitude' and 'longitude'
+        columns of the restaurants to remove.
+    :return: Path to the delta segment.
+    """
+    return _write_segment(data_path, restaurants_df, "delete")
+
+
+@cache_decorator
+def _read_delta_set(delta_dir: str, segments: tuple) -> DeltaSet:
+    """
+    Read delta segments and combine them into a delta set.
+    """
+    appended, removed = {}, set()
+    for segment in segments:
+        operation = SEGMENT_PATTERN.match(segment).group(2)
+        segment_df = pd.read_parquet(
+            os.path.join(delta_dir, segment), columns=list(DELTA_KEY_COLUMNS)
+        )
+        keys = list(key_index(segment_df))
+        removed.update(keys)
+        if operation == "upsert":
+            appended.update(dict.fromkeys(keys))
+        else:
+            for key in keys:
+                appended.pop(key, None)
+
+    appended_df = pd.DataFrame(list(appended), columns=list(DELTA_KEY_COLUMNS))
+    appended_df = appended_df.astype({"latitude": "float64", "longitude": "float64"})
+    removed_index = pd.MultiIndex.from_tuples(
+        list(removed), names=list(DELTA_KEY_COLUMNS)
+    )
+    return DeltaSet(appended_df, removed_index, segments)
+
+
+def load_deltas(data_path: str) -> DeltaSet:
+    """
+    Load the current delta set of a dataset.
+
+    Segments are only read again when new ones are written, so loading the deltas
+    costs a directory listing per search.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :return: DeltaSet, empty if the dataset has no delta segments.
+    """
+    return _read_delta_set(get_delta_dir(data_path), tuple(list_segments(data_path)))
+
+
+def apply_deltas(
+    nearby_restaurants: pd.DataFrame,
+    deltas: DeltaSet,
+    latitude: float,
+    longitude: float,
+    radius: float,
+) -> pd.DataFrame:
+    """
+    Bring the result of a search over the base file up to date with the deltas.
+
+    Results hidden by the deltas are dropped and the upserted restaurants within the
+    radius are added, so neither the base file nor its spatial index are rebuilt.
+
+    :param nearby_restaurants: Search result over the base file, with a 'distance' column.
+    :param deltas: DeltaSet of the dataset.
+    :param latitude: Latitude of the search location.
+    :param longitude: Longitude of the search location.
+    :param radius: Search radius in meters.
+    :return: DataFrame of restaurants within the radius.
+    """
+    if deltas.empty or nearby_restaurants is None:
+        return nearby_restaurants
+
+    kept = nearby_restaurants[~key_index(nearby_restaurants).isin(deltas.removed)]
+    added = find_nearby_restaurants(deltas.appended, latitude, longitude, radius)
+    return pd.concat([kept, added], ignore_index=True)
+
+
+def apply_deltas_multi(
+    nearby_restaurants: pd.DataFrame,
+    deltas: DeltaSet,
+    latitudes: object,
+    longitudes: object,
+    radius: object,
+) -> pd.DataFrame:
+    """
+    Bring the result of a multi-point search over the base file up to date with the deltas.
+
+    :param nearby_restaurants: Result of `find_nearby_restaurants_multi` over the base file.
+    :param deltas: DeltaSet of the dataset.
+    :param latitudes: Latitudes of the central points.
+    :param longitudes: Longitudes of the central points.
+    :param radius: Radius in meters, either a single value or one value per central point.
+    :return: Long-format DataFrame with a 'query_id' column.
+    """
+    if deltas.empty or nearby_restaurants is None:
+        return nearby_restaurants
+
+    kept = nearby_restaurants[~key_index(nearby_restaurants).isin(deltas.removed)]
+    added = find_nearby_restaurants_multi(
+        deltas.appended, latitudes, longitudes, radius
+    )
+    return (
+        pd.concat([kept, added], ignore_index=True)
+        .sort_values("query_id", kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def dataset_version(data_path: str, deltas: DeltaSet) -> tuple:
+    """
+    Identify the current content of a dataset, delta segments included.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :param deltas: DeltaSet of the dataset.
+    :return: Tuple (path, fingerprint of the base, names of the segments).
+    """
+    return data_path, file_fingerprint(data_path), deltas.version
+
+
+def count_restaurants(
+    data_path: str, deltas: DeltaSet, restaurants: object = None
+) -> int:
+    """
+    Count the restaurants of a dataset once its deltas are applied.
+
+    Only the base rows whose coordinates appear in the removed keys are compared.
+    Their count is kept in `deltas.removed_counts` for the current version of the
+    base, so a rewritten base is counted again.
+
+    :param data_path: Path to the Parquet file or dataset directory.
+    :param deltas: DeltaSet of the dataset.
+    :param restaurants: DataFrame or CoordinateStore of the base, if loaded. The
+        base is otherwise counted from its metadata and read through a filter.
+    :return: Number of restaurants.
+    """
+    if restaurants is None:
+        dataset = ds.dataset(data_path, format="parquet", partitioning="hive")
+        n_rows = dataset.count_rows()
+    else:
+        n_rows = len(restaurants)
+    if deltas.empty:
+        return n_rows
+
+    version = dataset_version(data_path, deltas)
+    if version not in deltas.removed_counts:
+        removed = deltas.removed.to_frame(index=False)
+        if restaurants is None:
+            candidates_df = dataset.to_table(
+                columns=list(SEARCH_COLUMNS),
+                filter=pc.field("latitude").isin(removed["latitude"].to_numpy())
+                & pc.field("longitude").isin(removed["longitude"].to_numpy()),
+            ).to_pandas()
+        else:
+            latitudes, longitudes = get_coordinates(restaurants)
+            candidates = np.flatnonzero(
+                np.isin(latitudes, removed["latitude"].to_numpy())
+                & np.isin(longitudes, removed["longitude"].to_numpy())
+            )
+            candidates_df = take_restaurants(restaurants, candidates)
+        deltas.removed_counts[version] = int(
+            key_index(candidates_df).isin(deltas.removed).sum()
+        )
+
+    return n_rows - deltas.removed_counts[version] + len(deltas.appended)
+
+
+def compact_deltas(data_path: str) -> int:
+    """
+    Merge the delta segments of a dataset into its base file.
+
+    The base file is rewritten spatially sorted under a temporary name and replaces
+    the old one atomically. Only the merged segments are removed afterwards, so
+    segments written during the compaction are kept.
+
+    :param data_path: Path to the Parquet file.
+    :return: Number of merged segments.
+    """
+    if is_partitioned(data_path):
+        raise ValueError(
+            "Partitioned datasets are not compacted, ingest their sources again."
+        )
+
+    with _compaction_lock:
+        segments = tuple(list_segments(data_path))
+        if not segments:
+            return 0
+
+        loading_logger.info(
+            f"Compacting {len(segments)} delta segments of {data_path}."
+        )
+        deltas = _read_delta_set(get_delta_dir(data_path), segments)
+        base_df = pd.read_parquet(data_path)
+        base_df = base_df[~key_index(base_df).isin(deltas.removed)]
+        merged_df = pd.concat([base_df, deltas.appended], ignore_index=True)
+
+        compacted_path = f"{data_path}.compacting"
+        write_restaurants_to_parquet(merged_df, compacted_path)
+        os.replace(compacted_path, data_path)
+
+        for segment in segments:
+            os.remove(os.path.join(get_delta_dir(data_path), segment))
+
+    loading_logger.info(f"Compacted {data_path} into {len(merged_df)} restaurants.")
+    return len(segments)
+
+
+def _compact_in_background(data_path: str):
+    try:
+        compact_deltas(data_path)
+    except Exception as e:
+        loading_logger.error(f"Error while compacting delta segments: {e}")
+
+
+def start_background_compaction(data_path: str) -> threading.Thread:
+    """
+    Compact the delta segments of a dataset in a background thread.
+
+    Searches keep using the current base file and deltas until the compaction ends.
+    Nothing is started if a compaction is already running in the process.
+
+    :param data_path: Path to the Parquet file.
+    :return: Started thread, or None.
+    """
+    global _compaction_thread
+    if is_partitioned(data_path) or _compaction_lock.locked():
+        return None
+
+    thread = threading.Thread(
+        target=_compact_in_background, args=(data_path,), daemon=True
+    )
+    thread.start()
+    _compaction_thread = thread
+    return thread
+
+
+def wait_for_compaction():
+    """
+    Wait for the last background compaction started in the process to end.
+
+    The compaction thread is a daemon, so a short-lived process writing deltas,
+    such as the command line, must wait for it before exiting or the segments are
+    never merged.
+    """
+    if _compaction_thread is not None:
+        _compaction_thread.join()
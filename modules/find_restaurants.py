@@ -1,6 +1,28 @@
+import functools
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 from logger.logger import execution_logger
 
+# Radius of the Earth in meters
+EARTH_RADIUS = 6371000
+
+# Maximum number of distances evaluated at once in multi-point searches
+MAX_BLOCK_SIZE = 10_000_000
+
+# First radius tried by expanding k-nearest searches, in meters
+INITIAL_KNN_RADIUS = 500
+
+# Half of the Earth's circumference, no point is farther away than this, in meters
+MAX_DISTANCE = math.pi * EARTH_RADIUS
+
+# Minimum number of rows per chunk of a parallel scan, smaller chunks cost more to
+# dispatch than they save
+MIN_CHUNK_SIZE = 250_000
+
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -14,7 +36,7 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     float: Distance in meters.
     """
     # Radius of the Earth in meters
-    R = 6371000
+    R = EARTH_RADIUS
 
     # Convert coordinates from degrees to radians
     phi1 = math.radians(lat1)
@@ -31,38 +53,491 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
     return R * c
 
-  
+
+def haversine_distance_vectorized(
+    lat1: object, lon1: object, lat2: object, lon2: object
+) -> np.ndarray:
+    """
+    Calculate Haversine distances on whole arrays of coordinates at once.
+
+    The inputs follow NumPy broadcasting rules, so a scalar point can be compared
+    with a column of points, or a column of query points of shape (n, 1) with
+    a row of restaurants of shape (m,) to get an (n, m) distance matrix.
+
+    Args:
+    lat1, lon1: Latitudes and longitudes of the first points in degrees.
+    lat2, lon2: Latitudes and longitudes of the second points in degrees.
+
+    Returns:
+    np.ndarray: Distances in meters.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+
+    a = (
+        np.sin(delta_phi / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    )
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS * c
+
+
+def bounding_box(central_lat: float, central_lon: float, radius: float) -> tuple:
+    """
+    Calculate the latitude/longitude box enclosing a circle on the Earth's surface.
+
+    Any point within `radius` meters of the central point lies inside the box, so the
+    box can be used as a cheap prefilter before computing exact distances. When the
+    circle contains a pole or crosses the antimeridian, the box spans all longitudes.
+
+    Args:
+    central_lat, central_lon: Latitude and longitude of the central point in degrees.
+    radius: Radius of the circle, in meters.
+
+    Returns:
+    tuple: (min_lat, max_lat, min_lon, max_lon) in degrees.
+    """
+    angular_radius = max(radius, 0) / EARTH_RADIUS
+    delta_lat = math.degrees(angular_radius)
+
+    min_lat = central_lat - delta_lat
+    max_lat = central_lat + delta_lat
+
+    cos_lat = math.cos(math.radians(central_lat))
+    if min_lat <= -90 or max_lat >= 90 or math.sin(angular_radius) >= cos_lat:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    # Widest longitude extent of the circle, reached below or above the central latitude
+    delta_lon = math.degrees(math.asin(math.sin(angular_radius) / cos_lat))
+    min_lon = central_lon - delta_lon
+    max_lon = central_lon + delta_lon
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def bounding_box_mask(
+    latitudes: np.ndarray, longitudes: np.ndarray, box: tuple
+) -> np.ndarray:
+    """
+    Select the points lying inside a latitude/longitude box.
+
+    Args:
+    latitudes, longitudes: Arrays of coordinates in degrees.
+    box: (min_lat, max_lat, min_lon, max_lon) as returned by `bounding_box`.
+
+    Returns:
+    np.ndarray: Boolean mask of the points inside the box.
+    """
+    min_lat, max_lat, min_lon, max_lon = box
+    mask = (latitudes >= min_lat) & (latitudes <= max_lat)
+    if min_lon > -180 or max_lon < 180:
+        mask &= (longitudes >= min_lon) & (longitudes <= max_lon)
+    return mask
+
+
+def hilbert_key(latitudes: object, longitudes: object, order: int = 16) -> np.ndarray:
+    """
+    Position of points along a Hilbert curve covering the whole latitude/longitude plane.
+
+    Points close to each other on the Earth's surface mostly get close keys, so sorting
+    rows by this key groups nearby restaurants together.
+
+    Args:
+    latitudes, longitudes: Arrays of coordinates in degrees.
+    order: Number of bits per axis of the curve, the grid has 2**order cells per side.
+
+    Returns:
+    np.ndarray: Hilbert keys as 64-bit integers.
+    """
+    n = 1 << order
+    x = np.clip(((np.asarray(longitudes) + 180) / 360 * n).astype("int64"), 0, n - 1)
+    y = np.clip(((np.asarray(latitudes) + 90) / 180 * n).astype("int64"), 0, n - 1)
+
+    keys = np.zeros(x.shape, dtype="int64")
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx.astype("int64")) ^ ry.astype("int64"))
+
+        # Rotate the quadrant so that the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+
+    return keys
+
+
+def get_coordinates(restaurants: object) -> tuple:
+    """
+    Get the coordinate arrays of a restaurants DataFrame or coordinate store.
+
+    Args:
+    restaurants: DataFrame with 'latitude' and 'longitude' columns, or a
+    CoordinateStore (see modules.coordinate_store).
+
+    Returns:
+    tuple: (latitudes, longitudes) as NumPy arrays, memory-mapped for a store.
+    """
+    if isinstance(restaurants, pd.DataFrame):
+        return restaurants["latitude"].to_numpy(), restaurants["longitude"].to_numpy()
+    return restaurants.latitude, restaurants.longitude
+
+
+def take_restaurants(restaurants: object, positions: np.ndarray) -> pd.DataFrame:
+    """
+    Materialize some rows of a restaurants DataFrame or coordinate store.
+
+    Args:
+    restaurants: DataFrame or CoordinateStore.
+    positions: Row positions to keep.
+
+    Returns:
+    DataFrame: Copy of the selected rows.
+    """
+    if isinstance(restaurants, pd.DataFrame):
+        return restaurants.iloc[positions].copy()
+    return restaurants.take(positions)
+
+
+def find_candidates(
+    latitudes: np.ndarray, longitudes: np.ndarray, box: tuple, index: object = None
+) -> np.ndarray:
+    """
+    Find the positions of the points that may lie inside a bounding box.
+
+    Args:
+    latitudes, longitudes: Arrays of coordinates in degrees.
+    box: (min_lat, max_lat, min_lon, max_lon) as returned by `bounding_box`.
+    index: Optional spatial index over the points (see modules.spatial_index). When
+    given, only the points in the grid cells overlapping the box are returned.
+
+    Returns:
+    np.ndarray: Sorted positions of the candidate points.
+    """
+    if index is not None:
+        return index.query(box)
+    return np.flatnonzero(bounding_box_mask(latitudes, longitudes, box))
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """
+    Number of threads to use for a number of jobs, -1 meaning one per CPU.
+    """
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+@functools.lru_cache(maxsize=None)
+def _get_executor(n_threads: int) -> ThreadPoolExecutor:
+    """
+    Thread pool shared by the parallel scans using the same number of threads.
+    """
+    return ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="letsdine-scan")
+
+
+def _scan_chunk(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    start: int,
+    stop: int,
+    central_lat: float,
+    central_lon: float,
+    radius: float,
+    box: tuple,
+) -> tuple:
+    """
+    Find the positions and distances of the points of a chunk within a radius.
+    """
+    lat = latitudes[start:stop]
+    lon = longitudes[start:stop]
+    candidates = np.flatnonzero(bounding_box_mask(lat, lon, box))
+    distances = haversine_distance_vectorized(
+        central_lat,
+        central_lon,
+        lat[candidates].astype("float64"),
+        lon[candidates].astype("float64"),
+    )
+    mask = distances <= radius
+    return candidates[mask] + start, distances[mask]
+
+
+def scan_within_radius(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    central_lat: float,
+    central_lon: float,
+    radius: float,
+    n_jobs: int = 1,
+) -> tuple:
+    """
+    Scan coordinate arrays for the points within a radius, on several threads.
+
+    The arrays are split into contiguous chunks evaluated in a thread pool. NumPy
+    releases the GIL in the comparisons and trigonometric functions, so chunks run
+    on separate cores; their results are concatenated in chunk order, so positions
+    come out sorted as with a single-threaded scan.
+
+    Args:
+    latitudes, longitudes: Arrays of coordinates in degrees, possibly memory-mapped.
+    central_lat, central_lon: Latitude and longitude of the central point in degrees.
+    radius: Radius in meters.
+    n_jobs: Number of threads, -1 for one per CPU.
+
+    Returns:
+    tuple: (sorted positions of the points within the radius, their distances in meters).
+    """
+    box = bounding_box(central_lat, central_lon, radius)
+    n_rows = len(latitudes)
+    n_chunks = min(resolve_n_jobs(n_jobs), max(1, n_rows // MIN_CHUNK_SIZE))
+    if n_chunks == 1:
+        return _scan_chunk(
+            latitudes, longitudes, 0, n_rows, central_lat, central_lon, radius, box
+        )
+
+    bounds = np.linspace(0, n_rows, n_chunks + 1).astype("int64")
+    executor = _get_executor(n_chunks)
+    futures = [
+        executor.submit(
+            _scan_chunk,
+            latitudes,
+            longitudes,
+            start,
+            stop,
+            central_lat,
+            central_lon,
+            radius,
+            box,
+        )
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+    results = [future.result() for future in futures]
+    return (
+        np.concatenate([positions for positions, _ in results]),
+        np.concatenate([distances for _, distances in results]),
+    )
+
+
 def find_nearby_restaurants(
-    df: object, central_lat: float, central_lon: float, radius: int
+    df: object,
+    central_lat: float,
+    central_lon: float,
+    radius: int,
+    index: object = None,
+    n_jobs: int = 1,
 ) -> object:
     """
     Find restaurants within a specified radius from a central latitude and longitude.
 
-    This function calculates the distance to each restaurant using the Haversine formula,
-    then filters the restaurants based on the specified radius.
+    This function first keeps the restaurants inside the bounding box of the search circle,
+    then calculates the distance to each of them using the Haversine formula and filters
+    the restaurants based on the specified radius.
 
     Args:
-    df: DataFrame containing restaurant data with 'latitude' and 'longitude' columns.
+    df: DataFrame containing restaurant data with 'latitude' and 'longitude' columns,
+    or a memory-mapped CoordinateStore.
     central_lat, central_lon: Latitude and longitude of the central point in degrees.
     radius: Radius within which to find restaurants, in meters.
+    index: Optional spatial index over the rows of `df`, used to visit only the grid
+    cells overlapping the search circle instead of scanning every row.
+    n_jobs: Number of threads scanning the rows when there is no index, -1 for one
+    per CPU.
 
     Returns:
     DataFrame: Restaurants within the specified radius with an additional 'distance' column.
     """
     try:
-        # Calculate distance for each restaurant
-        df["distance"] = df.apply(
-            lambda row: haversine_distance(
-                central_lat, central_lon, row["latitude"], row["longitude"]
-            ),
-            axis=1,
-        )
+        lat, lon = get_coordinates(df)
+
+        if index is None:
+            positions, distances = scan_within_radius(
+                lat, lon, central_lat, central_lon, radius, n_jobs
+            )
+        else:
+            # Keep only the restaurants in the grid cells overlapping the search circle
+            box = bounding_box(central_lat, central_lon, radius)
+            candidates = find_candidates(lat, lon, box, index)
+
+            # Calculate the exact distance for the remaining restaurants
+            distances = haversine_distance_vectorized(
+                central_lat,
+                central_lon,
+                lat[candidates].astype("float64"),
+                lon[candidates].astype("float64"),
+            )
 
-        # Filter restaurants within the specified radius
-        nearby_restaurants = df[df["distance"] <= radius].copy()
+            # Filter restaurants within the specified radius
+            mask = distances <= radius
+            positions, distances = candidates[mask], distances[mask]
+
+        nearby_restaurants = take_restaurants(df, positions)
 
         # Round the distance to two decimal places
-        nearby_restaurants["distance"] = nearby_restaurants["distance"].round(2)
+        nearby_restaurants["distance"] = np.round(distances, 2)
+
+        return nearby_restaurants
+    except Exception as e:
+        execution_logger.error(f"An error occurred: {e}")
+
+
+def _k_smallest(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k smallest distances, sorted by distance, using a partial sort.
+    """
+    if k < len(distances):
+        positions = np.argpartition(distances, k - 1)[:k]
+    else:
+        positions = np.arange(len(distances))
+    return positions[np.argsort(distances[positions], kind="stable")]
+
+
+def find_k_nearest(
+    df: object,
+    central_lat: float,
+    central_lon: float,
+    k: int,
+    max_radius: float = None,
+    index: object = None,
+) -> object:
+    """
+    Find the k restaurants closest to a central latitude and longitude.
+
+    With a spatial index, the search radius starts small and doubles until the circle
+    holds k restaurants, so the cost depends on k rather than on the size of the
+    dataset or the density of the area. Without an index, distances are computed for
+    the candidates in the bounding box of `max_radius` (or all rows) and only the k
+    smallest are partially sorted.
+
+    Args:
+    df: DataFrame containing restaurant data with 'latitude' and 'longitude' columns,
+    or a memory-mapped CoordinateStore.
+    central_lat, central_lon: Latitude and longitude of the central point in degrees.
+    k: Number of restaurants to return.
+    max_radius: Optional maximum distance of the returned restaurants, in meters.
+    index: Optional spatial index over the rows of `df`.
+
+    Returns:
+    DataFrame: Up to k restaurants sorted by distance with an additional 'distance' column.
+    """
+    try:
+        lat, lon = get_coordinates(df)
+        limit = MAX_DISTANCE if max_radius is None else max_radius
+
+        radius = min(INITIAL_KNN_RADIUS, limit) if index is not None else limit
+        while True:
+            candidates = find_candidates(
+                lat, lon, bounding_box(central_lat, central_lon, radius), index
+            )
+            distances = haversine_distance_vectorized(
+                central_lat,
+                central_lon,
+                lat[candidates].astype("float64"),
+                lon[candidates].astype("float64"),
+            )
+            within = distances <= radius
+            if within.sum() >= k or radius >= limit:
+                break
+            radius = min(radius * 2, limit)
+
+        candidates, distances = candidates[within], distances[within]
+        nearest = _k_smallest(distances, k)
+
+        nearest_restaurants = take_restaurants(df, candidates[nearest])
+        nearest_restaurants["distance"] = np.round(distances[nearest], 2)
+
+        return nearest_restaurants
+    except Exception as e:
+        execution_logger.error(f"An error occurred: {e}")
+
+
+def find_nearby_restaurants_multi(
+    df: object,
+    latitudes: object,
+    longitudes: object,
+    radius: object,
+    index: object = None,
+) -> object:
+    """
+    Find restaurants within a radius of several central points in a single call.
+
+    Without an index, query points are processed in blocks so that each block is one
+    broadcasted distance computation between the block of points and the restaurants
+    inside the union of their bounding boxes. With an index, each point only visits
+    the grid cells overlapping its own search circle.
+
+    Args:
+    df: DataFrame containing restaurant data with 'latitude' and 'longitude' columns,
+    or a memory-mapped CoordinateStore.
+    latitudes, longitudes: Sequences of latitudes and longitudes of the central points in degrees.
+    radius: Radius in meters, either a single value or one value per central point.
+    index: Optional spatial index over the rows of `df`.
+
+    Returns:
+    DataFrame: Long-format results with a 'query_id' column (position of the central point
+    in the input sequences) followed by the restaurant columns and 'distance'.
+    """
+    try:
+        query_lat = np.asarray(latitudes, dtype="float64").ravel()
+        query_lon = np.asarray(longitudes, dtype="float64").ravel()
+        query_radius = np.broadcast_to(
+            np.asarray(radius, dtype="float64"), query_lat.shape
+        )
+
+        lat, lon = get_coordinates(df)
+        if index is not None:
+            block_size = 1
+        else:
+            block_size = max(1, MAX_BLOCK_SIZE // max(1, len(df)))
+
+        query_ids, positions, distances = [], [], []
+        for start in range(0, len(query_lat), block_size):
+            stop = start + block_size
+            boxes = np.array(
+                [
+                    bounding_box(q_lat, q_lon, q_radius)
+                    for q_lat, q_lon, q_radius in zip(
+                        query_lat[start:stop],
+                        query_lon[start:stop],
+                        query_radius[start:stop],
+                    )
+                ]
+            )
+            union_box = (
+                boxes[:, 0].min(),
+                boxes[:, 1].max(),
+                boxes[:, 2].min(),
+                boxes[:, 3].max(),
+            )
+            candidates = find_candidates(lat, lon, union_box, index)
+
+            block_distances = haversine_distance_vectorized(
+                query_lat[start:stop, None],
+                query_lon[start:stop, None],
+                lat[candidates].astype("float64"),
+                lon[candidates].astype("float64"),
+            )
+            rows, cols = np.nonzero(block_distances <= query_radius[start:stop, None])
+            query_ids.append(rows + start)
+            positions.append(candidates[cols])
+            distances.append(block_distances[rows, cols])
+
+        query_ids = np.concatenate(query_ids) if query_ids else np.empty(0, "int64")
+        positions = np.concatenate(positions) if positions else np.empty(0, "int64")
+        distances = np.concatenate(distances) if distances else np.empty(0)
+
+        nearby_restaurants = take_restaurants(df, positions).reset_index(drop=True)
+        nearby_restaurants.insert(0, "query_id", query_ids)
+        nearby_restaurants["distance"] = np.round(distances, 2)
 
         return nearby_restaurants
     except Exception as e:
@@ -0,0 +1,110 @@
+import math
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from modules.cache_data_fun import create_cache_decorator
+from modules.find_restaurants import bounding_box, EARTH_RADIUS
+from modules.load_data import PARTITION_COLUMNS, SEARCH_COLUMNS, bbox_filters
+from logger.logger import execution_logger
+
+# Create a caching decorator to keep dataset discovery between searches
+cache_decorator = create_cache_decorator()
+
+
+@cache_decorator
+def open_arrow_dataset(parquet_file_path: str) -> ds.Dataset:
+    """
+    Open a Parquet file or a partitioned Parquet dataset for Arrow scans.
+
+    Only the file listing and schema are read; rows are read by each search.
+
+    :param parquet_file_path: Path to the Parquet file or dataset directory.
+    :return: pyarrow Dataset.
+    """
+    return ds.dataset(parquet_file_path, format="parquet", partitioning="hive")
+
+
+def haversine_distance_arrow(
+    central_lat: float, central_lon: float, latitudes: object, longitudes: object
+) -> object:
+    """
+    Calculate the Haversine distance from a point to arrays of points with Arrow compute kernels.
+
+    Args:
+    central_lat, central_lon: Latitude and longitude of the reference point in degrees.
+    latitudes, longitudes: Arrow arrays of latitudes and longitudes in degrees.
+
+    Returns:
+    Arrow array of distances in meters.
+    """
+    lat1 = math.radians(central_lat)
+    lat2 = pc.multiply(latitudes, math.pi / 180)
+    half_dlat = pc.sin(pc.divide(pc.subtract(lat2, lat1), 2))
+    half_dlon = pc.sin(
+        pc.divide(
+            pc.subtract(
+                pc.multiply(longitudes, math.pi / 180), math.radians(central_lon)
+            ),
+            2,
+        )
+    )
+
+    a = pc.add(
+        pc.multiply(half_dlat, half_dlat),
+        pc.multiply(
+            pc.multiply(pc.cos(lat2), math.cos(lat1)),
+            pc.multiply(half_dlon, half_dlon),
+        ),
+    )
+    c = pc.multiply(pc.atan2(pc.sqrt(a), pc.sqrt(pc.subtract(1, a))), 2)
+    return pc.multiply(c, EARTH_RADIUS)
+
+
+def find_nearby_restaurants_arrow(
+    dataset: ds.Dataset,
+    central_lat: float,
+    central_lon: float,
+    radius: float,
+) -> object:
+    """
+    Find restaurants within a radius by scanning Parquet data with Arrow.
+
+    The bounding box of the search circle is pushed down to the scan, which skips
+    the row groups, and the partitions of a partitioned dataset, outside of it and
+    decodes the remaining ones on several threads. The distance and radius filter
+    then run as vectorized Arrow kernels on the candidates only.
+
+    Args:
+    dataset: pyarrow Dataset of restaurants with 'latitude' and 'longitude' columns.
+    central_lat, central_lon: Latitude and longitude of the central point in degrees.
+    radius: Radius within which to find restaurants, in meters.
+
+    Returns:
+    DataFrame: Restaurants within the specified radius with an additional 'distance' column.
+    """
+    try:
+        partitioned = all(
+            column in dataset.schema.names for column in PARTITION_COLUMNS
+        )
+        box = bounding_box(central_lat, central_lon, radius)
+        candidates = dataset.to_table(
+            columns=list(SEARCH_COLUMNS),
+            filter=pq.filters_to_expression(bbox_filters(box, partitioned)),
+            use_threads=True,
+        )
+
+        distances = haversine_distance_arrow(
+            central_lat,
+            central_lon,
+            candidates["latitude"],
+            candidates["longitude"],
+        )
+        mask = pc.less_equal(distances, radius)
+        nearby_restaurants = candidates.filter(mask).append_column(
+            "distance", pc.round(pc.filter(distances, mask), 2)
+        )
+        return nearby_restaurants.to_pandas()
+    except Exception as e:
+        execution_logger.error(f"An error occurred: {e}")
@@ -1,40 +1,117 @@
-from pyspark.sql.functions import radians, cos, sin, atan2, sqrt, lit
+from pyspark.sql.functions import radians, cos, sin, atan2, sqrt, lit, broadcast, col
 from pyspark.sql.functions import round as pyspark_round
-import sys
+import math
+import numpy as np
+import pandas as pd
 
+from modules.find_restaurants import (
+    bounding_box,
+    haversine_distance,
+    EARTH_RADIUS,
+    INITIAL_KNN_RADIUS,
+    MAX_DISTANCE,
+)
+from modules.load_data import PARTITION_COLUMNS
 from logger.logger import execution_logger
 
 
-def calculate_distance_spark(df: object, lat: float, lon: float) -> object:
+def box_filter_spark(df: object, box: tuple) -> object:
     """
-    Calculate the distance between each point in a DataFrame and a given latitude and longitude.
+    Keep only the rows inside a bounding box.
 
-    This function uses the Haversine formula to calculate the distance on the Earth's surface.
+    The box is expressed as plain comparisons on the 'latitude' and 'longitude' columns,
+    so Spark can push it down to the Parquet reader and skip row groups using their
+    min/max statistics. On a dataset partitioned by 'lat_tile' and 'lon_tile', the
+    box is also applied to the tile columns so that Spark prunes whole partitions;
+    the tile columns are dropped from the result.
+
+    :param df: A PySpark DataFrame containing the columns 'latitude' and 'longitude'.
+    :param box: (min_lat, max_lat, min_lon, max_lon) as returned by `bounding_box`.
+    :return: DataFrame restricted to the bounding box.
+    """
+    min_lat, max_lat, min_lon, max_lon = box
+
+    predicate = (df["latitude"] >= min_lat) & (df["latitude"] <= max_lat)
+    if min_lon > -180 or max_lon < 180:
+        predicate = (
+            predicate & (df["longitude"] >= min_lon) & (df["longitude"] <= max_lon)
+        )
+
+    if all(column in df.columns for column in PARTITION_COLUMNS):
+        predicate = (
+            predicate
+            & (df["lat_tile"] >= math.floor(min_lat))
+            & (df["lat_tile"] <= math.floor(max_lat))
+            & (df["lon_tile"] >= math.floor(min_lon))
+            & (df["lon_tile"] <= math.floor(max_lon))
+        )
+        return df.filter(predicate).drop(*PARTITION_COLUMNS)
+
+    return df.filter(predicate)
+
+
+def bounding_box_filter_spark(
+    df: object, lat: float, lon: float, radius: float
+) -> object:
+    """
+    Keep only the rows inside the bounding box of a search circle.
 
     :param df: A PySpark DataFrame containing the columns 'latitude' and 'longitude'.
     :param lat: Latitude of the reference point.
     :param lon: Longitude of the reference point.
-    :return: DataFrame with an additional column 'distance' representing the distance in meters.
+    :param radius: Radius of the search circle, in meters.
+    :return: DataFrame restricted to the bounding box.
+    """
+    return box_filter_spark(df, bounding_box(lat, lon, radius))
+
+
+def distance_to_point_spark(lat: float, lon: float) -> object:
     """
-    # Earth's radius in meters
-    R = 6371000
+    Build a Spark expression of the Haversine distance from each row to a fixed point.
 
-    # Convert coordinates to radians in the DataFrame
-    lat_rad = radians(lit(lat))
-    lon_rad = radians(lit(lon))
-    df = df.withColumn("lat_rad", radians(df["latitude"])).withColumn(
-        "lon_rad", radians(df["longitude"])
+    The radians and cosine of the reference point are computed once in Python and
+    inlined as literals, so the whole distance is a single expression evaluated in
+    generated code, without intermediate columns.
+
+    :param lat: Latitude of the reference point.
+    :param lon: Longitude of the reference point.
+    :return: Column expression of the distance in meters.
+    """
+    lat_rad = math.radians(lat)
+    return _distance_from_radians_spark(
+        lit(lat_rad), lit(math.radians(lon)), lit(math.cos(lat_rad))
     )
 
-    # Calculate the distance
-    df = df.withColumn(
-        "a",
-        sin((df["lat_rad"] - lat_rad) / 2) ** 2
-        + cos(lat_rad) * cos(df["lat_rad"]) * sin((df["lon_rad"] - lon_rad) / 2) ** 2,
+
+def _distance_from_radians_spark(
+    ref_lat_rad: object, ref_lon_rad: object, ref_cos_lat: object
+) -> object:
+    """
+    Haversine distance from the 'latitude' and 'longitude' columns to a reference point
+    given by its latitude and longitude in radians and the cosine of its latitude.
+    """
+    lat_rad = radians(col("latitude"))
+    a = (
+        sin((lat_rad - ref_lat_rad) / 2) ** 2
+        + ref_cos_lat
+        * cos(lat_rad)
+        * sin((radians(col("longitude")) - ref_lon_rad) / 2) ** 2
     )
-    df = df.withColumn("distance", 2 * atan2(sqrt(df["a"]), sqrt(1 - df["a"])) * R)
+    return 2 * atan2(sqrt(a), sqrt(1 - a)) * EARTH_RADIUS
+
 
-    return df
+def calculate_distance_spark(df: object, lat: float, lon: float) -> object:
+    """
+    Calculate the distance between each point in a DataFrame and a given latitude and longitude.
+
+    This function uses the Haversine formula to calculate the distance on the Earth's surface.
+
+    :param df: A PySpark DataFrame containing the columns 'latitude' and 'longitude'.
+    :param lat: Latitude of the reference point.
+    :param lon: Longitude of the reference point.
+    :return: DataFrame with an additional column 'distance' representing the distance in meters.
+    """
+    return df.withColumn("distance", distance_to_point_spark(lat, lon))
 
 
 def find_nearby_restaurants_spark(
@@ -43,8 +120,10 @@ def find_nearby_restaurants_spark(
     """
     Find restaurants within a specified radius from a given latitude and longitude.
 
-    This function first calculates the distance to each restaurant using the Haversine formula,
-    then filters the restaurants based on the specified radius.
+    This function first keeps the restaurants inside the bounding box of the search circle,
+    then calculates the distance to each of them using the Haversine formula and filters
+    the restaurants based on the specified radius. Only the restaurant columns and the
+    distance are returned.
 
     :param df: A PySpark DataFrame containing restaurant data with 'latitude' and 'longitude' columns.
     :param lat: Latitude of the reference point.
@@ -53,17 +132,153 @@ def find_nearby_restaurants_spark(
     :return: DataFrame of restaurants within the specified radius.
     """
     try:
-        df_with_distance = calculate_distance_spark(df, lat, lon)
+        candidates = bounding_box_filter_spark(df, lat, lon, radius)
+        nearby_restaurants = candidates.select(
+            *candidates.columns, distance_to_point_spark(lat, lon).alias("distance")
+        )
+        nearby_restaurants = nearby_restaurants.filter(
+            nearby_restaurants["distance"] <= radius
+        )
 
         # Round the 'distance' column to 2 decimal places
-        df_with_distance = df_with_distance.withColumn(
-            "distance", pyspark_round(df_with_distance["distance"], 2)
+        return nearby_restaurants.withColumn(
+            "distance", pyspark_round(nearby_restaurants["distance"], 2)
+        )
+    except Exception as e:
+        execution_logger.error(f"An error occurred: {e}")
+        raise e
+
+
+def find_k_nearest_spark(
+    df: object, lat: float, lon: float, k: int, max_radius: float = None
+) -> object:
+    """
+    Find the k restaurants closest to a given latitude and longitude.
+
+    Without a maximum radius, the bounding box of the search circle is doubled until it
+    holds at least k restaurants; each step is a count that Parquet statistics can
+    answer from a few row groups. The k nearest restaurants then lie within the circle
+    enclosing that box, and only the candidates of this circle are ranked with an
+    `orderBy(...).limit(k)`, which Spark runs as a per-partition top-k instead of a
+    global sort.
+
+    :param df: A PySpark DataFrame containing restaurant data with 'latitude' and 'longitude' columns.
+    :param lat: Latitude of the reference point.
+    :param lon: Longitude of the reference point.
+    :param k: Number of restaurants to return.
+    :param max_radius: Optional maximum distance of the returned restaurants, in meters.
+    :return: DataFrame of up to k restaurants ordered by distance.
+    """
+    try:
+        if max_radius is None:
+            radius = INITIAL_KNN_RADIUS
+            while radius < MAX_DISTANCE:
+                if bounding_box_filter_spark(df, lat, lon, radius).count() >= k:
+                    break
+                radius *= 2
+
+            # Farthest corner of the box, every point of the box lies within this radius
+            min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+            if min_lon == -180 and max_lon == 180:
+                max_radius = MAX_DISTANCE
+            else:
+                max_radius = max(
+                    haversine_distance(lat, lon, corner_lat, corner_lon)
+                    for corner_lat in (min_lat, max_lat)
+                    for corner_lon in (min_lon, max_lon)
+                )
+
+        return (
+            find_nearby_restaurants_spark(df, lat, lon, max_radius)
+            .orderBy("distance")
+            .limit(k)
+        )
+    except Exception as e:
+        execution_logger.error(f"An error occurred: {e}")
+        raise e
+
+
+def find_nearby_restaurants_batch_spark(
+    df: object, queries: pd.DataFrame, spark_session: object
+) -> object:
+    """
+    Find restaurants within the radius of many query points in a single Spark job.
+
+    The queries are small, so they are broadcast to every executor and joined with
+    the restaurants on their bounding boxes; the exact distance is only computed for
+    the pairs surviving the join. The restaurants are first restricted to the union
+    of the boxes, so the Parquet reader skips row groups and partitions far from
+    every query, and the radians and cosine of the query points are computed once in
+    pandas instead of once per pair.
+
+    :param df: A PySpark DataFrame containing restaurant data with 'latitude' and 'longitude' columns.
+    :param queries: Pandas DataFrame with 'query_id', 'latitude', 'longitude' and 'radius' columns.
+    :param spark_session: Spark session used to distribute the queries.
+    :return: Long-format DataFrame with 'query_id', the restaurant columns and 'distance'.
+    """
+    try:
+        boxes = pd.DataFrame(
+            [
+                bounding_box(lat, lon, radius)
+                for lat, lon, radius in zip(
+                    queries["latitude"], queries["longitude"], queries["radius"]
+                )
+            ],
+            columns=["min_lat", "max_lat", "min_lon", "max_lon"],
+            index=queries.index,
+        )
+        query_lat_rad = np.radians(queries["latitude"].to_numpy(dtype="float64"))
+        queries_df = spark_session.createDataFrame(
+            pd.concat(
+                [
+                    queries[["query_id", "radius"]],
+                    pd.DataFrame(
+                        {
+                            "query_lat_rad": query_lat_rad,
+                            "query_lon_rad": np.radians(
+                                queries["longitude"].to_numpy(dtype="float64")
+                            ),
+                            "query_cos_lat": np.cos(query_lat_rad),
+                        },
+                        index=queries.index,
+                    ),
+                    boxes,
+                ],
+                axis=1,
+            )
+        )
+
+        candidates = box_filter_spark(
+            df,
+            (
+                boxes["min_lat"].min(),
+                boxes["max_lat"].max(),
+                boxes["min_lon"].min(),
+                boxes["max_lon"].max(),
+            ),
+        )
+        joined = candidates.join(
+            broadcast(queries_df),
+            candidates["latitude"].between(queries_df["min_lat"], queries_df["max_lat"])
+            & candidates["longitude"].between(
+                queries_df["min_lon"], queries_df["max_lon"]
+            ),
+        )
+        joined = joined.select(
+            "query_id",
+            *candidates.columns,
+            "radius",
+            _distance_from_radians_spark(
+                col("query_lat_rad"), col("query_lon_rad"), col("query_cos_lat")
+            ).alias("distance"),
         )
+        joined = joined.filter(joined["distance"] <= joined["radius"])
 
-        nearby_restaurants = df_with_distance.filter(
-            df_with_distance["distance"] <= radius
+        return joined.select(
+            "query_id",
+            *candidates.columns,
+            pyspark_round(joined["distance"], 2).alias("distance"),
         )
-        return nearby_restaurants
     except Exception as e:
         execution_logger.error(f"An error occurred: {e}")
-        sys.exit(1)
+        raise e
@@ -0,0 +1,172 @@
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from modules.find_restaurants import hilbert_key
+from modules.load_data import (
+    PARTITION_COLUMNS,
+    SEARCH_COLUMNS,
+    iter_restaurant_batches,
+)
+from logger.logger import loading_logger
+
+# File extensions recognized when ingesting a directory
+SOURCE_EXTENSIONS = (".geojson", ".json", ".csv")
+
+
+def expand_sources(sources: object) -> list:
+    """
+    List the source files designated by directories, glob patterns or file paths.
+
+    :param sources: A path, directory or glob pattern, or a list of them.
+    :return: Sorted list of GeoJSON and CSV file paths.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    file_paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            pattern = os.path.join(source, "**", "*")
+            candidates = glob.glob(pattern, recursive=True)
+        else:
+            candidates = glob.glob(source, recursive=True)
+        file_paths.update(
+            path
+            for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(SOURCE_EXTENSIONS)
+        )
+    return sorted(file_paths)
+
+
+def add_partition_columns(restaurants_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the tile columns used to partition the dataset.
+
+    :param restaurants_df: DataFrame with 'latitude' and 'longitude' columns.
+    :return: DataFrame with additional 'lat_tile' and 'lon_tile' integer columns.
+    """
+    return restaurants_df.assign(
+        lat_tile=np.floor(restaurants_df["latitude"]).astype("int32"),
+        lon_tile=np.floor(restaurants_df["longitude"]).astype("int32"),
+    )
+
+
+def _read_source(file_path: str) -> object:
+    """
+    Read a source file as DataFrame batches with the search columns.
+    """
+    if file_path.lower().endswith(".csv"):
+        for batch in pd.read_csv(file_path, chunksize=500_000):
+            yield batch[list(SEARCH_COLUMNS)].dropna()
+    else:
+        yield from iter_restaurant_batches(file_path)
+
+
+def source_basename(file_path: str) -> str:
+    """
+    Prefix of the dataset files written from a source file.
+
+    The prefix only depends on the absolute path of the source, so the files of a
+    source can be found and replaced when it is ingested again.
+
+    :param file_path: Path to a GeoJSON or CSV file.
+    :return: File name prefix.
+    """
+    source_id = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    return f"part-{source_id}-"
+
+
+def ingest_file(file_path: str, output_dir: str, output_format: str = "parquet"):
+    """
+    Convert one source file into files of the partitioned dataset.
+
+    Rows are sorted along a Hilbert curve before being written, so that the row
+    groups of each tile stay spatially compact. The files written by a previous
+    ingestion of the same source are removed first, so ingesting a source again
+    replaces its restaurants instead of adding them twice.
+
+    :param file_path: Path to a GeoJSON or CSV file.
+    :param output_dir: Root directory of the partitioned dataset.
+    :param output_format: "parquet" or "csv".
+    :return: Number of restaurants written.
+    """
+    basename = source_basename(file_path)
+    previous_files = glob.glob(
+        os.path.join(output_dir, "**", f"{basename}*"), recursive=True
+    )
+    for previous_file in previous_files:
+        os.remove(previous_file)
+
+    n_rows = 0
+    for batch_number, batch in enumerate(_read_source(file_path)):
+        if batch.empty:
+            continue
+        batch = batch[list(SEARCH_COLUMNS)].astype(
+            {"latitude": "float64", "longitude": "float64"}
+        )
+        batch = add_partition_columns(batch)
+        batch = batch.iloc[
+            hilbert_key(batch["latitude"], batch["longitude"]).argsort(kind="stable")
+        ]
+
+        ds.write_dataset(
+            pa.Table.from_pandas(batch, preserve_index=False),
+            output_dir,
+            format=output_format,
+            partitioning=ds.partitioning(
+                pa.schema([(column, pa.int32()) for column in PARTITION_COLUMNS]),
+                flavor="hive",
+            ),
+            basename_template=f"{basename}{batch_number}-{{i}}.{output_format}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        n_rows += len(batch)
+
+    loading_logger.info(f"Ingested {n_rows} restaurants from {file_path}.")
+    return n_rows
+
+
+def ingest_sources(
+    sources: object,
+    output_dir: str,
+    workers: int = None,
+    output_format: str = "parquet",
+) -> int:
+    """
+    Ingest GeoJSON and CSV sources into a partitioned dataset with a process pool.
+
+    Each source file is converted by its own worker and written to hive-style
+    `lat_tile=<n>/lon_tile=<n>` directories, which the loaders use to skip the
+    tiles outside of a bounding box.
+
+    :param sources: A path, directory or glob pattern, or a list of them.
+    :param output_dir: Root directory of the partitioned dataset.
+    :param workers: Number of worker processes, the number of CPUs by default.
+    :param output_format: "parquet" or "csv".
+    :return: Number of restaurants written.
+    """
+    file_paths = expand_sources(sources)
+    if not file_paths:
+        raise ValueError(f"No GeoJSON or CSV source found in {sources}.")
+
+    loading_logger.info(f"Ingesting {len(file_paths)} files into {output_dir}.")
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        n_rows = sum(
+            executor.map(
+                ingest_file,
+                file_paths,
+                [output_dir] * len(file_paths),
+                [output_format] * len(file_paths),
+            )
+        )
+
+    loading_logger.info(f"Ingested {n_rows} restaurants into {output_dir}.")
+    return n_rows
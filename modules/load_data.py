@@ -1,18 +1,219 @@
 import json
+import math
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import sys
 
 from modules.cache_data_fun import create_cache_decorator
+from modules.find_restaurants import hilbert_key
 from logger.logger import loading_logger
 
 from dotenv import dotenv_values
 
 config = dotenv_values(".env")
 
+# Columns needed to search and display restaurants
+SEARCH_COLUMNS = ("name", "latitude", "longitude")
+
+# Number of rows per Parquet row group written by `write_restaurants_to_parquet`
+DEFAULT_ROW_GROUP_SIZE = 50_000
+
+# Partition columns of the datasets written by `modules.ingest`, one per 1 degree tile
+PARTITION_COLUMNS = ("lat_tile", "lon_tile")
+
 # Create a caching decorator to optimize data loading
 cache_decorator = create_cache_decorator()
 
 
+# Number of characters read at once when streaming a GeoJSON file
+GEOJSON_CHUNK_SIZE = 1 << 20
+
+# Number of restaurants per DataFrame batch when streaming a GeoJSON file
+GEOJSON_BATCH_SIZE = 100_000
+
+
+class _JSONStream:
+    """
+    Minimal incremental JSON reader over a text file.
+
+    Only the characters of the value being decoded are kept in memory, so arrays
+    of any size can be iterated element by element.
+    """
+
+    def __init__(self, file: object, chunk_size: int = GEOJSON_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.exhausted = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.exhausted = True
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character, or "" at the end of the file.
+        """
+        while True:
+            while self.position < len(self.buffer):
+                if not self.buffer[self.position].isspace():
+                    return self.buffer[self.position]
+                self.position += 1
+            if not self._fill():
+                return ""
+
+    def expect(self, character: str):
+        """
+        Consume the next non-whitespace character, which must be `character`.
+        """
+        if self.peek() != character:
+            raise ValueError(f"Invalid GeoJSON: expected '{character}'.")
+        self.position += 1
+
+    def decode(self) -> object:
+        """
+        Decode the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A value ending with the buffer may be a truncated number or literal
+                if end < len(self.buffer) or self.exhausted:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self._fill()
+
+    def iter_array(self) -> object:
+        """
+        Iterate over the elements of the JSON array starting at the next character.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() == ",":
+                self.position += 1
+            else:
+                self.expect("]")
+                return
+
+
+def iter_geojson_features(
+    file_path: str, chunk_size: int = GEOJSON_CHUNK_SIZE
+) -> object:
+    """
+    Iterate over the features of a GeoJSON FeatureCollection without loading the file.
+
+    :param file_path: Path to the GeoJSON file.
+    :param chunk_size: Number of characters read at once.
+    :return: Generator of feature dictionaries.
+    """
+    with open(file_path, "r") as file:
+        stream = _JSONStream(file, chunk_size)
+        stream.expect("{")
+        while stream.peek() not in ("}", ""):
+            key = stream.decode()
+            stream.expect(":")
+            if key == "features":
+                yield from stream.iter_array()
+            else:
+                stream.decode()
+            if stream.peek() == ",":
+                stream.position += 1
+
+
+def iter_restaurant_batches(
+    file_path: str,
+    batch_size: int = GEOJSON_BATCH_SIZE,
+    chunk_size: int = GEOJSON_CHUNK_SIZE,
+    counts: dict = None,
+) -> object:
+    """
+    Stream the restaurants of a GeoJSON file as DataFrame batches.
+
+    Features that are not named points are dropped as they are read, and duplicates
+    of (name, longitude, latitude) are detected with a set of these keys, so memory
+    stays bounded by the batch size and the number of distinct restaurants.
+
+    :param file_path: Path to the GeoJSON file.
+    :param batch_size: Maximum number of restaurants per batch.
+    :param chunk_size: Number of characters read at once.
+    :param counts: Optional dictionary updated with the 'total', 'filtered' and
+        'duplicates' counts.
+    :return: Generator of DataFrames with 'name', 'longitude' and 'latitude' columns.
+    """
+    counts = counts if counts is not None else {}
+    counts.update(total=0, filtered=0, duplicates=0)
+    seen = set()
+    names, longitudes, latitudes = [], [], []
+
+    for feature in iter_geojson_features(file_path, chunk_size):
+        counts["total"] += 1
+
+        # Filter out non-Point types and entries without coordinates or name
+        geometry = feature.get("geometry") or {}
+        coordinates = geometry.get("coordinates")
+        name = (feature.get("properties") or {}).get("name")
+        if (
+            geometry.get("type") != "Point"
+            or coordinates is None
+            or len(coordinates) != 2
+            or name is None
+        ):
+            continue
+        counts["filtered"] += 1
+
+        # Remove duplicates
+        longitude, latitude = coordinates
+        key = (name, longitude, latitude)
+        if key in seen:
+            counts["duplicates"] += 1
+            continue
+        seen.add(key)
+
+        names.append(name)
+        longitudes.append(longitude)
+        latitudes.append(latitude)
+        if len(names) >= batch_size:
+            yield _restaurants_batch(names, longitudes, latitudes)
+            names, longitudes, latitudes = [], [], []
+
+    if names:
+        yield _restaurants_batch(names, longitudes, latitudes)
+
+
+def _restaurants_batch(names: list, longitudes: list, latitudes: list) -> object:
+    return pd.DataFrame(
+        {
+            "name": pd.Series(names, dtype="object"),
+            "longitude": pd.Series(longitudes, dtype="float64"),
+            "latitude": pd.Series(latitudes, dtype="float64"),
+        }
+    )
+
+
+def _log_geojson_counts(counts: dict):
+    loading_logger.info(f"Total number of entries: {counts['total']}")
+    loading_logger.info(f"Number of entries after filtering: {counts['filtered']}")
+    loading_logger.info(f"Number of duplicates removed: {counts['duplicates']}")
+
+
 @cache_decorator
 def load_restaurants_from_geojson(
     file_path: str, convert_to_parquet: bool = False
@@ -20,64 +221,145 @@ def load_restaurants_from_geojson(
     """
     Load restaurant data from a GeoJSON file and optionally convert it to Parquet format.
 
+    The file is parsed incrementally, so the raw GeoJSON is never held in memory.
+
     :param file_path: Path to the GeoJSON file.
     :param convert_to_parquet: Boolean flag to convert the data to Parquet format.
     :return: DataFrame containing restaurant data.
     """
-    with open(file_path, "r") as file:
-        geojson_data = json.load(file)
+    counts = {}
+    batches = list(iter_restaurant_batches(file_path, counts=counts))
+    _log_geojson_counts(counts)
 
-        # Convert GeoJSON data to a DataFrame
-        restaurants_df = pd.json_normalize(geojson_data["features"])
-        original_count = len(restaurants_df)
-        loading_logger.info(f"Total number of entries: {original_count}")
+    if batches:
+        restaurants_df = pd.concat(batches, ignore_index=True)
+    else:
+        restaurants_df = _restaurants_batch([], [], [])
 
-        # Filter out non-Point types and entries without coordinates or name
-        restaurants_df = restaurants_df[
-            (restaurants_df["geometry.type"] == "Point")
-            & restaurants_df["geometry.coordinates"].apply(
-                lambda x: x is not None and len(x) == 2
-            )
-            & restaurants_df["properties.name"].notna()
-        ]
+    if convert_to_parquet:
+        write_restaurants_to_parquet(restaurants_df, config["PARQUET_FILE_PATH"])
 
-        filtered_count = len(restaurants_df)
-        loading_logger.info(f"Number of entries after filtering: {filtered_count}")
+    return restaurants_df
 
-        # Process coordinates
-        restaurants_df[["longitude", "latitude"]] = pd.DataFrame(
-            restaurants_df["geometry.coordinates"].tolist(), index=restaurants_df.index
-        )
 
-        # Remove duplicates
-        restaurants_df = restaurants_df.drop_duplicates(
-            subset=["properties.name", "longitude", "latitude"]
-        )
-        duplicates_removed = original_count - filtered_count
-        loading_logger.info(f"Number of duplicates removed: {duplicates_removed}")
+def convert_geojson_to_parquet(
+    file_path: str,
+    parquet_file_path: str,
+    batch_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """
+    Convert a GeoJSON file of any size to Parquet with bounded memory.
 
-        # Select and rename relevant columns
-        restaurants_df = restaurants_df[
-            ["properties.name", "longitude", "latitude"]
-        ].rename(columns={"properties.name": "name"})
+    Each batch of restaurants is written as a row group as soon as it is complete.
+    Rows keep the order of the GeoJSON file; use `write_restaurants_to_parquet` on
+    the result to sort it spatially.
 
-        if convert_to_parquet:
-            restaurants_df.to_parquet(config["PARQUET_FILE_PATH"], index=False)
+    :param file_path: Path to the GeoJSON file.
+    :param parquet_file_path: Path to the Parquet file.
+    :param batch_size: Number of restaurants per row group.
+    :return: Number of restaurants written.
+    """
+    counts = {}
+    n_rows = 0
+    writer = None
+    try:
+        for batch in iter_restaurant_batches(file_path, batch_size, counts=counts):
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_file_path, table.schema)
+            writer.write_table(table)
+            n_rows += len(batch)
+        if writer is None:
+            _restaurants_batch([], [], []).to_parquet(parquet_file_path, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
 
-        return restaurants_df
+    _log_geojson_counts(counts)
+    return n_rows
 
 
-@cache_decorator
-def load_restaurants_from_parquet(parquet_file_path: str) -> object:
+def write_restaurants_to_parquet(
+    restaurants_df: pd.DataFrame,
+    parquet_file_path: str,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+):
     """
-    Load restaurant data from a Parquet file.
+    Write restaurant data to a Parquet file sorted along a Hilbert curve.
+
+    Sorting spatially makes each row group cover a small area, so the latitude and
+    longitude statistics of the row groups let bounding-box reads skip most of them.
 
+    :param restaurants_df: DataFrame with 'latitude' and 'longitude' columns.
     :param parquet_file_path: Path to the Parquet file.
+    :param row_group_size: Maximum number of rows per row group.
+    """
+    keys = hilbert_key(restaurants_df["latitude"], restaurants_df["longitude"])
+    sorted_df = restaurants_df.iloc[keys.argsort(kind="stable")]
+    sorted_df.to_parquet(parquet_file_path, index=False, row_group_size=row_group_size)
+
+
+def is_partitioned(data_path: str) -> bool:
+    """
+    Check whether a path is a partitioned dataset directory rather than a single file.
+    """
+    return os.path.isdir(data_path)
+
+
+def bbox_filters(bbox: tuple, partitioned: bool = False) -> list:
+    """
+    Build pyarrow filters restricting rows to a bounding box.
+
+    On a partitioned dataset, filters on the tile columns are added so that the
+    directories of the tiles outside of the box are skipped without being opened.
+
+    :param bbox: (min_lat, max_lat, min_lon, max_lon) in degrees.
+    :param partitioned: Whether the dataset is partitioned by 'lat_tile' and 'lon_tile'.
+    :return: List of (column, operator, value) filters.
+    """
+    min_lat, max_lat, min_lon, max_lon = bbox
+    filters = [
+        ("latitude", ">=", min_lat),
+        ("latitude", "<=", max_lat),
+        ("longitude", ">=", min_lon),
+        ("longitude", "<=", max_lon),
+    ]
+    if partitioned:
+        filters += [
+            ("lat_tile", ">=", math.floor(min_lat)),
+            ("lat_tile", "<=", math.floor(max_lat)),
+            ("lon_tile", ">=", math.floor(min_lon)),
+            ("lon_tile", "<=", math.floor(max_lon)),
+        ]
+    return filters
+
+
+@cache_decorator
+def load_restaurants_from_parquet(
+    parquet_file_path: str, columns: tuple = SEARCH_COLUMNS, bbox: tuple = None
+) -> object:
+    """
+    Load restaurant data from a Parquet file or a partitioned Parquet dataset.
+
+    Only the requested columns are read. When a bounding box is given, it is pushed
+    down to pyarrow so that row groups outside of it are skipped without being decoded,
+    and so are the partitions outside of it when reading a partitioned dataset.
+
+    :param parquet_file_path: Path to the Parquet file or dataset directory.
+    :param columns: Columns to read, or None to read all of them.
+    :param bbox: Optional (min_lat, max_lat, min_lon, max_lon) box to restrict the rows to.
     :return: DataFrame containing restaurant data or None in case of failure.
     """
     try:
         loading_logger.info("Loading data from Parquet using Pandas.")
-        restaurants_df = pd.read_parquet(parquet_file_path)
+        filters = None
+        if bbox is not None:
+            filters = bbox_filters(bbox, is_partitioned(parquet_file_path))
+        restaurants_df = pd.read_parquet(
+            parquet_file_path,
+            columns=list(columns) if columns is not None else None,
+            filters=filters,
+        )
         return restaurants_df
     except Exception as e:
         loading_logger.error(f"Error while loading Parquet file: {e}")
@@ -85,17 +367,72 @@ def load_restaurants_from_parquet(parquet_file_path: str) -> object:
 
 
 @cache_decorator
-def load_restaurants_from_csv(csv_file_path: str) -> object:
+def load_restaurants_from_csv(
+    csv_file_path: str, columns: tuple = None, bbox: tuple = None
+) -> object:
     """
-    Load restaurant data from a CSV file.
+    Load restaurant data from a CSV file or a partitioned CSV dataset.
 
-    :param csv_file_path: Path to the csv file.
+    :param csv_file_path: Path to the csv file or dataset directory.
+    :param columns: Columns to read, or None to read all of them.
+    :param bbox: Optional (min_lat, max_lat, min_lon, max_lon) box to restrict the rows to.
     :return: DataFrame containing restaurant data or None in case of failure.
     """
     try:
         loading_logger.info("Loading data from CSV using Pandas.")
-        restaurants_df = pd.read_csv(csv_file_path)
+        columns = list(columns) if columns is not None else None
+        if is_partitioned(csv_file_path):
+            dataset = ds.dataset(csv_file_path, format="csv", partitioning="hive")
+            filters = bbox_filters(bbox, True) if bbox is not None else None
+            table = dataset.to_table(
+                columns=columns,
+                filter=pq.filters_to_expression(filters) if filters else None,
+            )
+            return table.to_pandas()
+
+        restaurants_df = pd.read_csv(csv_file_path, usecols=columns)
+        if bbox is not None:
+            min_lat, max_lat, min_lon, max_lon = bbox
+            restaurants_df = restaurants_df[
+                restaurants_df["latitude"].between(min_lat, max_lat)
+                & restaurants_df["longitude"].between(min_lon, max_lon)
+            ].reset_index(drop=True)
         return restaurants_df
     except Exception as e:
         loading_logger.error(f"Error while loading csv file: {e}")
         raise e
+
+
+def load_queries(file_path: str, default_radius: float = None) -> object:
+    """
+    Load search queries from a CSV or Parquet file.
+
+    The file must contain 'latitude' and 'longitude' columns, and either a 'radius'
+    column or a default radius. An optional 'query_id' column identifies the queries
+    in the results; the row number is used otherwise.
+
+    :param file_path: Path to the CSV or Parquet file.
+    :param default_radius: Radius in meters for queries without a 'radius' column.
+    :return: DataFrame with 'query_id', 'latitude', 'longitude' and 'radius' columns.
+    """
+    try:
+        loading_logger.info(f"Loading queries from {file_path}.")
+        if file_path.endswith(".parquet"):
+            queries_df = pd.read_parquet(file_path)
+        else:
+            queries_df = pd.read_csv(file_path)
+
+        if "radius" not in queries_df.columns:
+            if default_radius is None:
+                raise ValueError("Queries need a 'radius' column or a default radius.")
+            queries_df["radius"] = default_radius
+        if "query_id" not in queries_df.columns:
+            queries_df["query_id"] = range(len(queries_df))
+
+        queries_df = queries_df[["query_id", "latitude", "longitude", "radius"]]
+        return queries_df.astype(
+            {"latitude": "float64", "longitude": "float64", "radius": "float64"}
+        )
+    except Exception as e:
+        loading_logger.error(f"Error while loading queries: {e}")
+        raise e
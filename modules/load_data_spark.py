@@ -1,4 +1,11 @@
-from modules.cache_data_fun import create_cache_decorator
+import math
+import threading
+
+import pandas as pd
+
+from modules.cache_data_fun import file_fingerprint
+from modules.config import SPARK_MASTER, SPARK_SHUFFLE_PARTITIONS
+from modules.load_data import PARTITION_COLUMNS, SEARCH_COLUMNS
 from logger.logger import loading_logger
 
 from dotenv import dotenv_values
@@ -6,39 +13,212 @@ from dotenv import dotenv_values
 # Load environment variables
 config = dotenv_values(".env")
 from pyspark.sql import SparkSession
-
-# Initialize cache decorator for caching data
-cache_decorator = create_cache_decorator(force_lru_cache=True)
+from pyspark.sql.functions import broadcast
 
 
-@cache_decorator
-def load_restaurants_from_parquet_spark(parquet_file_path: str) -> object:
+class SparkBackend:
     """
-    Load restaurant data from a Parquet file using Apache Spark.
+    Owner of the Spark session and of the prepared restaurant DataFrames.
 
-    :param spark: Spark session object.
-    :param parquet_file_path: Path to the Parquet file.
-    :return: DataFrame containing restaurant data, or None in case of failure.
+    The session is created once, tuned for a single machine: few shuffle partitions,
+    since the data fits on one host, and Arrow for conversions to pandas. Each
+    dataset is read, cleaned and persisted in memory once per file version, and its
+    row count is recorded while the cache is filled, so searches never trigger an
+    extra full scan. Filters on a persisted DataFrame still skip the cached batches
+    outside of a bounding box, using their min/max statistics.
     """
-    loading_logger.info("Loading data from Parquet using Spark.")
 
-    try:
-        spark_session = SparkSession.builder.appName("letsdine").getOrCreate()
+    def __init__(
+        self,
+        app_name: str = "letsdine",
+        master: str = SPARK_MASTER,
+        shuffle_partitions: int = SPARK_SHUFFLE_PARTITIONS,
+    ):
+        """
+        Create a backend; the Spark session is only started when first needed.
 
-        # Read data from Parquet file
-        restaurants_df = spark_session.read.parquet(
-            parquet_file_path, header=True, inferSchema=True
-        )
+        :param app_name: Name of the Spark application.
+        :param master: Spark master URL.
+        :param shuffle_partitions: Number of partitions used by joins and aggregations.
+        """
+        self.app_name = app_name
+        self.master = master
+        self.shuffle_partitions = shuffle_partitions
+        self._session = None
+        self._datasets = {}
+        self._removed_counts = {}
+        self._lock = threading.RLock()
+
+    @property
+    def session(self) -> object:
+        """
+        Spark session of the backend, started on first use.
+        """
+        with self._lock:
+            if self._session is None:
+                loading_logger.info("Starting the Spark session.")
+                self._session = (
+                    SparkSession.builder.appName(self.app_name)
+                    .master(self.master)
+                    .config("spark.sql.shuffle.partitions", self.shuffle_partitions)
+                    .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+                    .config(
+                        "spark.sql.execution.arrow.pyspark.fallback.enabled", "true"
+                    )
+                    .getOrCreate()
+                )
+            return self._session
+
+    @property
+    def started(self) -> bool:
+        """
+        Whether the Spark session is already running.
+        """
+        return self._session is not None
+
+    def _read(self, parquet_file_path: str) -> object:
+        """
+        Read and clean the restaurants of a Parquet file or dataset.
+        """
+        # Read data from Parquet file, keeping only the columns needed for search
+        restaurants_df = self.session.read.parquet(parquet_file_path)
+        partition_columns = [
+            column for column in PARTITION_COLUMNS if column in restaurants_df.columns
+        ]
+        restaurants_df = restaurants_df.select(*SEARCH_COLUMNS, *partition_columns)
 
         # Drop missing values
         restaurants_df = restaurants_df.na.drop()
 
-        # Ensure correct data types for latitude and longitude
-        restaurants_df = restaurants_df.withColumn(
-            "latitude", restaurants_df["latitude"].cast("float")
-        ).withColumn("longitude", restaurants_df["longitude"].cast("float"))
+        # Ensure correct data types for latitude and longitude. Columns that are
+        # already doubles are left untouched so that filters on them can still be
+        # pushed down to the Parquet reader.
+        column_types = dict(restaurants_df.dtypes)
+        for column in ("latitude", "longitude"):
+            if column_types[column] != "double":
+                restaurants_df = restaurants_df.withColumn(
+                    column, restaurants_df[column].cast("double")
+                )
+        return restaurants_df
+
+    def load(self, parquet_file_path: str) -> object:
+        """
+        Get the prepared DataFrame of a dataset, reading it if it changed.
+
+        :param parquet_file_path: Path to the Parquet file or dataset directory.
+        :return: Persisted Spark DataFrame of the restaurants.
+        """
+        fingerprint = file_fingerprint(parquet_file_path)
+        with self._lock:
+            dataset = self._datasets.get(parquet_file_path)
+            if dataset is not None and dataset[0] == fingerprint:
+                return dataset[1]
+            if dataset is not None:
+                dataset[1].unpersist()
+
+            loading_logger.info("Loading data from Parquet using Spark.")
+            restaurants_df = self._read(parquet_file_path).persist()
+            n_rows = restaurants_df.count()
+            self._datasets[parquet_file_path] = (fingerprint, restaurants_df, n_rows)
+            loading_logger.info(f"{n_rows} restaurants persisted in Spark.")
+            return restaurants_df
+
+    def count(self, parquet_file_path: str, deltas: object = None) -> int:
+        """
+        Get the number of restaurants of a dataset from the recorded metadata.
+
+        With deltas, the base rows they hide are counted once per delta version, by
+        joining the persisted DataFrame with the few removed keys.
+
+        :param parquet_file_path: Path to the Parquet file or dataset directory.
+        :param deltas: Optional DeltaSet of the dataset (see modules.deltas).
+        :return: Number of restaurants.
+        """
+        restaurants_df = self.load(parquet_file_path)
+        with self._lock:
+            n_rows = self._datasets[parquet_file_path][2]
+        if deltas is None or deltas.empty:
+            return n_rows
+
+        key = (parquet_file_path, self._datasets[parquet_file_path][0], deltas.version)
+        if key not in self._removed_counts:
+            removed_df = self.session.createDataFrame(
+                deltas.removed.to_frame(index=False),
+                "name string, latitude double, longitude double",
+            )
+            self._removed_counts[key] = restaurants_df.join(
+                broadcast(removed_df), list(SEARCH_COLUMNS), "left_semi"
+            ).count()
+        return n_rows - self._removed_counts[key] + len(deltas.appended)
+
+    def unpersist(self):
+        """
+        Release the persisted DataFrames.
+        """
+        with self._lock:
+            for _, restaurants_df, _ in self._datasets.values():
+                restaurants_df.unpersist()
+            self._datasets.clear()
+            self._removed_counts.clear()
+
 
-        return spark_session, restaurants_df
+# Spark backend shared by the process, so that only one session is ever created
+spark_backend = SparkBackend()
+
+
+def load_restaurants_from_parquet_spark(parquet_file_path: str) -> tuple:
+    """
+    Load restaurant data from a Parquet file or a partitioned Parquet dataset using Apache Spark.
+
+    The 'lat_tile' and 'lon_tile' columns of a partitioned dataset are kept, so that
+    bounding-box filters can prune partitions. The data is prepared and persisted once
+    by the shared `spark_backend`.
+
+    :param parquet_file_path: Path to the Parquet file.
+    :return: Tuple (Spark session, persisted DataFrame containing restaurant data).
+    """
+    try:
+        return spark_backend.session, spark_backend.load(parquet_file_path)
     except Exception as e:
         loading_logger.error(f"Error while loading the Parquet file: {e}")
-        raise f"Error while loading the Parquet file: {e}"
+        raise RuntimeError(f"Error while loading the Parquet file: {e}")
+
+
+def apply_deltas_spark(df: object, deltas: object, spark_session: object) -> object:
+    """
+    Apply the delta segments of a dataset to its Spark DataFrame.
+
+    The keys hidden by the deltas are removed with a broadcast anti-join and the
+    upserted restaurants are unioned back, lazily, so filters are still pushed down
+    to the base Parquet files.
+
+    :param df: Spark DataFrame of the base dataset.
+    :param deltas: DeltaSet of the dataset (see modules.deltas).
+    :param spark_session: Spark session used to distribute the deltas.
+    :return: Spark DataFrame of the up-to-date dataset.
+    """
+    if deltas.empty:
+        return df
+
+    key_schema = "name string, latitude double, longitude double"
+    removed_df = spark_session.createDataFrame(
+        deltas.removed.to_frame(index=False), key_schema
+    )
+
+    # Upserted restaurants get the tile columns of a partitioned dataset
+    appended = deltas.appended
+    partition_columns = [column for column in PARTITION_COLUMNS if column in df.columns]
+    if partition_columns:
+        key_schema += ", lat_tile int, lon_tile int"
+        appended = appended.assign(
+            lat_tile=[math.floor(lat) for lat in appended["latitude"]],
+            lon_tile=[math.floor(lon) for lon in appended["longitude"]],
+        )
+    appended_df = spark_session.createDataFrame(
+        pd.DataFrame(appended, columns=[*SEARCH_COLUMNS, *partition_columns]),
+        key_schema,
+    )
+
+    return df.join(
+        broadcast(removed_df), list(SEARCH_COLUMNS), "left_anti"
+    ).unionByName(appended_df.select(*df.columns))
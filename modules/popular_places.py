@@ -0,0 +1,194 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules.cache_data_fun import create_cache_decorator, file_fingerprint
+from modules.config import POPULAR_PLACES_MAX_RADIUS, get_popular_places_paris
+from modules.find_restaurants import bounding_box, find_nearby_restaurants_multi
+from modules.load_data import load_restaurants_from_parquet
+from logger.logger import loading_logger
+
+# Create a caching decorator to keep neighbourhoods in memory between searches
+cache_decorator = create_cache_decorator()
+
+# Key of the Parquet schema metadata describing precomputed neighbourhoods
+METADATA_KEY = b"letsdine.popular_places"
+
+
+def precompute_neighbourhoods(
+    restaurants: object,
+    places: dict,
+    max_radius: float = POPULAR_PLACES_MAX_RADIUS,
+    index: object = None,
+) -> dict:
+    """
+    Find the restaurants around each popular place, sorted by distance.
+
+    :param restaurants: DataFrame or CoordinateStore of restaurants.
+    :param places: Dictionary of place names and (latitude, longitude) tuples.
+    :param max_radius: Largest radius that can be answered from the result, in meters.
+    :param index: Optional spatial index over the restaurants.
+    :return: Dictionary of place names and DataFrames of restaurants sorted by distance.
+    """
+    names = list(places)
+    coordinates = np.array([places[name] for name in names], dtype="float64")
+    results = find_nearby_restaurants_multi(
+        restaurants, coordinates[:, 0], coordinates[:, 1], max_radius, index
+    )
+    results = results.sort_values(["query_id", "distance"], kind="stable")
+
+    neighbourhoods = {name: results.iloc[:0].drop(columns="query_id") for name in names}
+    for query_id, group in results.groupby("query_id", sort=False):
+        neighbourhoods[names[query_id]] = group.drop(columns="query_id").reset_index(
+            drop=True
+        )
+    return neighbourhoods
+
+
+def get_neighbourhood(neighbourhoods: dict, place: str, radius: float) -> object:
+    """
+    Slice the precomputed restaurants of a place to a radius, without searching.
+
+    :param neighbourhoods: Dictionary returned by `precompute_neighbourhoods`.
+    :param place: Name of the popular place.
+    :param radius: Search radius in meters, at most the precomputed maximum radius.
+    :return: DataFrame of the restaurants within the radius, sorted by distance.
+    """
+    neighbourhood = neighbourhoods[place]
+    n_restaurants = np.searchsorted(
+        neighbourhood["distance"].to_numpy(), radius, side="right"
+    )
+    return neighbourhood.iloc[:n_restaurants]
+
+
+def find_precomputed_restaurants(
+    neighbourhoods: dict,
+    place: str,
+    latitude: float,
+    longitude: float,
+    radius: float,
+    max_radius: float = POPULAR_PLACES_MAX_RADIUS,
+) -> object:
+    """
+    Answer a search from the precomputed neighbourhoods when it targets a popular place.
+
+    :param neighbourhoods: Dictionary returned by `load_popular_neighbourhoods`.
+    :param place: Name of the selected place, or None.
+    :param latitude: Latitude of the search location.
+    :param longitude: Longitude of the search location.
+    :param radius: Search radius in meters.
+    :param max_radius: Radius the neighbourhoods were precomputed with, in meters.
+    :return: DataFrame of restaurants sorted by distance, or None if a search is needed.
+    """
+    if place not in neighbourhoods or radius > max_radius:
+        return None
+    if tuple(get_popular_places_paris().get(place, ())) != (latitude, longitude):
+        return None
+    return get_neighbourhood(neighbourhoods, place, radius)
+
+
+def get_neighbourhoods_file_path(data_file_path: str) -> str:
+    """
+    Path of the precomputed neighbourhoods kept next to a data file.
+
+    :param data_file_path: Path to the Parquet file.
+    :return: Path to the neighbourhoods Parquet file.
+    """
+    return f"{os.path.splitext(data_file_path.rstrip(os.sep))[0]}.popular.parquet"
+
+
+def save_neighbourhoods(neighbourhoods: dict, file_path: str, metadata: dict):
+    """
+    Save precomputed neighbourhoods to a single Parquet file.
+
+    :param neighbourhoods: Dictionary returned by `precompute_neighbourhoods`.
+    :param file_path: Path to the Parquet file.
+    :param metadata: Description of the neighbourhoods stored in the file's schema.
+    """
+    frames = [
+        neighbourhood.assign(place=place)
+        for place, neighbourhood in neighbourhoods.items()
+    ]
+    table = pa.Table.from_pandas(pd.concat(frames), preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata)}
+    )
+    pq.write_table(table, file_path)
+
+
+def read_neighbourhoods(file_path: str) -> tuple:
+    """
+    Read neighbourhoods saved with `save_neighbourhoods`.
+
+    :param file_path: Path to the Parquet file.
+    :return: Tuple (neighbourhoods dictionary, metadata dictionary).
+    """
+    table = pq.read_table(file_path)
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    neighbourhoods_df = table.to_pandas()
+
+    neighbourhoods = {
+        place: neighbourhoods_df.iloc[:0].drop(columns="place")
+        for place in metadata["places"]
+    }
+    for place, group in neighbourhoods_df.groupby("place", sort=False):
+        neighbourhoods[place] = group.drop(columns="place").reset_index(drop=True)
+    return neighbourhoods, metadata
+
+
+@cache_decorator
+def load_popular_neighbourhoods(
+    parquet_file_path: str, max_radius: float = POPULAR_PLACES_MAX_RADIUS
+) -> dict:
+    """
+    Load the precomputed neighbourhoods of the popular places, computing them if needed.
+
+    The neighbourhoods are saved next to the dataset and computed again when the
+    dataset file, the popular places or the maximum radius change. Computing them
+    only reads the row groups of the dataset around the popular places.
+
+    :param parquet_file_path: Path to the Parquet file of the restaurants.
+    :param max_radius: Largest radius that can be answered without searching, in meters.
+    :return: Dictionary of place names and DataFrames of restaurants sorted by distance.
+    """
+    places = get_popular_places_paris()
+    file_path = get_neighbourhoods_file_path(parquet_file_path)
+    metadata = {
+        "fingerprint": list(file_fingerprint(parquet_file_path)),
+        "max_radius": max_radius,
+        "places": {place: list(coordinates) for place, coordinates in places.items()},
+    }
+
+    if os.path.exists(file_path):
+        try:
+            neighbourhoods, saved_metadata = read_neighbourhoods(file_path)
+            if saved_metadata == metadata:
+                loading_logger.info(f"Popular places loaded from {file_path}.")
+                return neighbourhoods
+            loading_logger.info("Popular places are outdated, computing them again.")
+        except Exception as e:
+            loading_logger.error(f"Error while loading popular places: {e}")
+
+    boxes = np.array(
+        [bounding_box(lat, lon, max_radius) for lat, lon in places.values()]
+    )
+    restaurants = load_restaurants_from_parquet(
+        parquet_file_path,
+        bbox=(
+            boxes[:, 0].min(),
+            boxes[:, 1].max(),
+            boxes[:, 2].min(),
+            boxes[:, 3].max(),
+        ),
+    )
+    neighbourhoods = precompute_neighbourhoods(restaurants, places, max_radius)
+    try:
+        save_neighbourhoods(neighbourhoods, file_path, metadata)
+        loading_logger.info(f"Popular places saved to {file_path}.")
+    except OSError as e:
+        loading_logger.error(f"Error while saving popular places: {e}")
+
+    return neighbourhoods
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from modules.config import RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+
+
+class QueryResultCache:
+    """
+    TTL/LRU cache of search results keyed by dataset version, location and radius.
+
+    Locations are rounded to `precision` decimals (about 1 m at 5 decimals), so
+    repeated searches around the same point share their results. A search with a
+    smaller radius than a cached one around the same location is answered by
+    filtering the cached superset on its 'distance' column instead of searching again.
+    Entries are indexed by location, so a lookup only visits the radii cached there,
+    and expired entries are dropped when their location is looked up again. pandas
+    results are copied in and out, so callers never share the cached frame.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESULT_CACHE_SIZE,
+        ttl: float = RESULT_CACHE_TTL,
+        precision: int = 5,
+    ):
+        """
+        Create an empty result cache.
+
+        :param maxsize: Maximum number of cached results.
+        :param ttl: Time to live of a result, in seconds.
+        :param precision: Number of decimals kept when rounding latitudes and longitudes.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        self.hits = 0
+        self.superset_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._radii = {}
+        self._lock = threading.RLock()
+
+    def _location(self, dataset_version: tuple, latitude: float, longitude: float):
+        return (
+            dataset_version,
+            round(latitude, self.precision),
+            round(longitude, self.precision),
+        )
+
+    def get(
+        self, dataset_version: tuple, latitude: float, longitude: float, radius: float
+    ) -> object:
+        """
+        Look up the result of a search.
+
+        :param dataset_version: Identifier of the searched dataset and its version.
+        :param latitude: Latitude of the search location.
+        :param longitude: Longitude of the search location.
+        :param radius: Search radius in meters.
+        :return: Cached or filtered result, or None when the search must be run.
+        """
+        location = self._location(dataset_version, latitude, longitude)
+        now = time.monotonic()
+
+        with self._lock:
+            # Only the radii cached at this location are visited, expiring them lazily
+            best_radius = None
+            for cached_radius in list(self._radii.get(location, ())):
+                key = (location, cached_radius)
+                if now - self._entries[key][1] > self.ttl:
+                    self._remove(key)
+                elif cached_radius >= radius and (
+                    best_radius is None or cached_radius < best_radius
+                ):
+                    best_radius = cached_radius
+
+            if best_radius is None:
+                self.misses += 1
+                return None
+
+            best_key = (location, best_radius)
+            self._entries.move_to_end(best_key)
+            result = self._entries[best_key][0]
+            if best_radius == radius:
+                self.hits += 1
+                # Callers get their own copy, so they cannot alter the cached result
+                return result.copy() if isinstance(result, pd.DataFrame) else result
+            self.superset_hits += 1
+
+        if isinstance(result, pd.DataFrame):
+            return result[result["distance"] <= radius]
+        return result.filter(result["distance"] <= radius)
+
+    def put(
+        self,
+        dataset_version: tuple,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        result: object,
+    ):
+        """
+        Store the result of a search, evicting the least recently used ones if full.
+
+        :param dataset_version: Identifier of the searched dataset and its version.
+        :param latitude: Latitude of the search location.
+        :param longitude: Longitude of the search location.
+        :param radius: Search radius in meters.
+        :param result: DataFrame or Spark DataFrame with a 'distance' column.
+        """
+        location = self._location(dataset_version, latitude, longitude)
+        key = (location, radius)
+        if isinstance(result, pd.DataFrame):
+            result = result.copy()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, time.monotonic())
+            self._radii.setdefault(location, set()).add(radius)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple):
+        result, _ = self._entries.pop(key)
+        location, radius = key
+        self._radii[location].discard(radius)
+        if not self._radii[location]:
+            del self._radii[location]
+        if hasattr(result, "unpersist"):
+            result.unpersist()
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        :return: Dictionary with hits, superset hits, misses and entries.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "superset_hits": self.superset_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+# Result cache shared by the searches of the process
+query_result_cache = QueryResultCache()
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from modules.config import TABLE_PAGE_SIZE
+
+
+class DistanceCursor:
+    """
+    Pages of search results in increasing distance, sorted lazily.
+
+    A page is read by partially sorting the results: the distance of the last row of
+    the page is found with `np.partition`, the rows up to that distance are selected
+    and only those are sorted, so the first pages of a large result cost a linear
+    pass instead of a full sort. The sorted prefix is kept, and earlier pages are
+    read from it. Ties are ordered by position, so pages never overlap nor miss a
+    row, and rows without a distance come last.
+    """
+
+    def __init__(self, results: pd.DataFrame, page_size: int = TABLE_PAGE_SIZE):
+        """
+        Create a cursor over search results.
+
+        :param results: DataFrame of restaurants with a 'distance' column.
+        :param page_size: Number of rows of a page.
+        """
+        self.results = results
+        self.page_size = page_size
+        # Missing distances are sorted as infinite ones, after all the others
+        distances = results["distance"].to_numpy(dtype=np.float64)
+        self._distances = np.where(np.isnan(distances), np.inf, distances)
+        self._sorted_prefix = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._distances)
+
+    @property
+    def n_pages(self) -> int:
+        """
+        Number of pages, at least one.
+        """
+        return max(1, math.ceil(len(self) / self.page_size))
+
+    def _sorted_positions(self, end: int) -> np.ndarray:
+        # Extend the sorted prefix to at least `end` rows
+        if end > len(self._sorted_prefix):
+            if end < len(self):
+                threshold = np.partition(self._distances, end - 1)[end - 1]
+                candidates = np.flatnonzero(self._distances <= threshold)
+            else:
+                candidates = np.arange(len(self))
+            order = np.argsort(self._distances[candidates], kind="stable")
+            self._sorted_prefix = candidates[order]
+        return self._sorted_prefix[:end]
+
+    def page(self, page_number: int) -> pd.DataFrame:
+        """
+        Read a page of the results.
+
+        :param page_number: Number of the page, starting at 0.
+        :return: DataFrame with the rows of the page, in increasing distance.
+        """
+        start = page_number * self.page_size
+        end = min(start + self.page_size, len(self))
+        if start >= end:
+            return self.results.iloc[:0]
+        return self.results.iloc[self._sorted_positions(end)[start:end]]
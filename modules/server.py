@@ -0,0 +1,221 @@
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from main import main, load_restaurants_pandas
+from modules.config import SERVER_HOST, SERVER_PORT
+from modules.popular_places import load_popular_neighbourhoods
+from modules.load_data_spark import load_restaurants_from_parquet_spark
+from logger.logger import execution_logger
+
+from dotenv import dotenv_values
+
+config = dotenv_values(".env")
+
+
+def _parse_bool(value: str) -> bool:
+    return str(value).lower() == "true"
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler answering search queries with the resident datasets.
+
+    Endpoints:
+    - GET /health: returns {"status": "ok"}.
+    - GET /search?latitude=..&longitude=..&radius=..[&use_spark=..&big_data=..&backend=..]:
+      returns {"monitoring": {...}, "restaurants": {"columns": [...], "data": [...]}}.
+    """
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/search":
+            params = dict(urllib.parse.parse_qsl(url.query))
+            try:
+                latitude = float(params["latitude"])
+                longitude = float(params["longitude"])
+                radius = float(params["radius"])
+            except (KeyError, ValueError):
+                self._send_json(
+                    400, {"error": "latitude, longitude and radius are required."}
+                )
+                return
+
+            try:
+                self._send_json(
+                    200,
+                    search(
+                        latitude,
+                        longitude,
+                        radius,
+                        use_spark=_parse_bool(params.get("use_spark", False)),
+                        big_data=_parse_bool(params.get("big_data", False)),
+                        backend=params.get("backend"),
+                    ),
+                )
+            except Exception as e:
+                execution_logger.error(f"Error while serving a search: {e}")
+                self._send_json(500, {"error": str(e)})
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {url.path}"})
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        execution_logger.info(f"Search server: {format % args}")
+
+
+def search(
+    latitude: float,
+    longitude: float,
+    radius: float,
+    use_spark: bool = False,
+    big_data: bool = False,
+    backend: str = None,
+) -> dict:
+    """
+    Run a search with the resident datasets and convert the result to plain JSON types.
+
+    :param latitude: Latitude of the search location.
+    :param longitude: Longitude of the search location.
+    :param radius: Search radius in meters.
+    :param use_spark: Flag to use Apache Spark for processing.
+    :param big_data: Flag to handle big data sets.
+    :param backend: Name of the search backend, or "auto" (see `main`).
+    :return: Dictionary with monitoring data and nearby restaurants in "split" layout.
+    """
+    monitoring, nearby_restaurants = main(
+        latitude,
+        longitude,
+        radius,
+        use_spark=use_spark,
+        big_data=big_data,
+        backend=backend,
+        display=False,
+    )
+
+    return {
+        "monitoring": {
+            key: value if isinstance(value, str) else float(value)
+            for key, value in monitoring.items()
+        },
+        "restaurants": nearby_restaurants.to_dict(orient="split", index=False),
+    }
+
+
+def create_server(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    use_spark: bool = False,
+    big_data: bool = False,
+) -> ThreadingHTTPServer:
+    """
+    Create the search server and warm up its dataset, spatial index and Spark session.
+
+    The datasets stay in the loaders' caches for the lifetime of the process, so
+    queries only pay for the search itself.
+
+    :param host: Interface to listen on.
+    :param port: Port to listen on (0 picks a free port).
+    :param use_spark: Flag to also warm up the Spark session and DataFrame.
+    :param big_data: Flag to warm up the big data set instead of the default one.
+    :return: Server ready to be started with `serve_forever`.
+    """
+    execution_logger.info("Warming up the search server.")
+    filepath = (
+        config["PARQUET_FILE_PATH_15M"] if big_data else config["PARQUET_FILE_PATH"]
+    )
+    load_restaurants_pandas(filepath, big_data)
+    load_popular_neighbourhoods(filepath)
+    if use_spark:
+        load_restaurants_from_parquet_spark(filepath)
+
+    return ThreadingHTTPServer((host, port), SearchRequestHandler)
+
+
+def run_server(
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    use_spark: bool = False,
+    big_data: bool = False,
+):
+    """
+    Start the search server and serve queries until interrupted.
+
+    :param host: Interface to listen on.
+    :param port: Port to listen on.
+    :param use_spark: Flag to also warm up the Spark session and DataFrame.
+    :param big_data: Flag to warm up the big data set instead of the default one.
+    """
+    server = create_server(host, port, use_spark, big_data)
+    print(f"Search server listening on http://{host}:{server.server_port}")
+    execution_logger.info(f"Search server listening on {host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def query_server(
+    latitude: float,
+    longitude: float,
+    radius: float,
+    use_spark: bool = False,
+    big_data: bool = False,
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    timeout: float = 60,
+    backend: str = None,
+):
+    """
+    Send a search to a running search server.
+
+    :param latitude: Latitude of the search location.
+    :param longitude: Longitude of the search location.
+    :param radius: Search radius in meters.
+    :param use_spark: Flag to use Apache Spark for processing.
+    :param big_data: Flag to handle big data sets.
+    :param host: Host of the search server.
+    :param port: Port of the search server.
+    :param timeout: Timeout of the request in seconds.
+    :param backend: Name of the search backend, or "auto" (server default if None).
+    :return: A dictionary with monitoring data and a DataFrame of nearby restaurants.
+    """
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius": radius,
+        "use_spark": use_spark,
+        "big_data": big_data,
+    }
+    if backend is not None:
+        params["backend"] = backend
+    query = urllib.parse.urlencode(params)
+    try:
+        with urllib.request.urlopen(
+            f"http://{host}:{port}/search?{query}", timeout=timeout
+        ) as response:
+            payload = json.load(response)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.load(e).get("error", str(e))) from e
+
+    restaurants = payload["restaurants"]
+    nearby_restaurants = pd.DataFrame(
+        restaurants["data"], columns=restaurants["columns"]
+    )
+    return payload["monitoring"], nearby_restaurants
@@ -0,0 +1,207 @@
+import os
+import numpy as np
+import pandas as pd
+
+from modules.cache_data_fun import create_cache_decorator, file_fingerprint
+from logger.logger import loading_logger
+
+# Side of a grid cell in degrees (about 1.1 km of latitude)
+DEFAULT_CELL_SIZE = 0.01
+
+# Create a caching decorator to keep indexes in memory between searches
+cache_decorator = create_cache_decorator()
+
+
+class GridIndex:
+    """
+    Uniform latitude/longitude grid over the rows of a restaurants DataFrame.
+
+    Rows are bucketed by grid cell and stored sorted by cell id, so the rows of
+    consecutive cells on the same grid row form a single contiguous slice. A
+    bounding-box query therefore costs one binary search per grid row it spans.
+    """
+
+    def __init__(
+        self,
+        cell_size: float,
+        cells: np.ndarray,
+        offsets: np.ndarray,
+        order: np.ndarray,
+        fingerprint: tuple = (0, 0),
+    ):
+        """
+        Create an index from its arrays. Use `GridIndex.build` to index coordinates.
+
+        :param cell_size: Side of a grid cell in degrees.
+        :param cells: Sorted ids of the non-empty cells.
+        :param offsets: Start of each cell in `order`, followed by the number of rows.
+        :param order: Row positions sorted by cell id.
+        :param fingerprint: Version of the indexed file, see `file_fingerprint`.
+        """
+        self.cell_size = float(cell_size)
+        self.n_cols = int(np.ceil(360 / self.cell_size))
+        self.cells = cells
+        self.offsets = offsets
+        self.order = order
+        self.fingerprint = tuple(int(value) for value in fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _cell_coordinates(self, latitudes: object, longitudes: object) -> tuple:
+        rows = np.floor((np.asarray(latitudes) + 90) / self.cell_size).astype("int64")
+        cols = np.floor((np.asarray(longitudes) + 180) / self.cell_size).astype("int64")
+        return rows, np.clip(cols, 0, self.n_cols - 1)
+
+    @classmethod
+    def build(
+        cls,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        cell_size: float = DEFAULT_CELL_SIZE,
+        fingerprint: tuple = (0, 0),
+    ) -> "GridIndex":
+        """
+        Index arrays of coordinates.
+
+        :param latitudes: Latitudes of the rows in degrees.
+        :param longitudes: Longitudes of the rows in degrees.
+        :param cell_size: Side of a grid cell in degrees.
+        :param fingerprint: Version of the indexed file, see `file_fingerprint`.
+        :return: GridIndex over the rows.
+        """
+        index = cls(
+            cell_size,
+            np.empty(0, "int64"),
+            np.zeros(1, "int64"),
+            np.empty(0, "int64"),
+            fingerprint,
+        )
+        rows, cols = index._cell_coordinates(latitudes, longitudes)
+        cell_ids = rows * index.n_cols + cols
+
+        position_dtype = "int32" if len(cell_ids) < np.iinfo("int32").max else "int64"
+        order = np.argsort(cell_ids, kind="stable").astype(position_dtype)
+        cells, starts = np.unique(cell_ids[order], return_index=True)
+
+        index.cells = cells
+        index.offsets = np.append(starts, len(order)).astype("int64")
+        index.order = order
+        return index
+
+    def query(self, box: tuple) -> np.ndarray:
+        """
+        Find the rows in the grid cells overlapping a bounding box.
+
+        The result is a superset of the rows inside the box; exact filtering is left
+        to the caller.
+
+        :param box: (min_lat, max_lat, min_lon, max_lon) in degrees.
+        :return: Sorted array of candidate row positions.
+        """
+        min_lat, max_lat, min_lon, max_lon = box
+        (row_start, row_stop), (col_start, col_stop) = self._cell_coordinates(
+            [min_lat, max_lat], [min_lon, max_lon]
+        )
+
+        first_ids = np.arange(row_start, row_stop + 1) * self.n_cols + col_start
+        last_ids = first_ids + (col_stop - col_start)
+        starts = self.offsets[np.searchsorted(self.cells, first_ids, side="left")]
+        stops = self.offsets[np.searchsorted(self.cells, last_ids, side="right")]
+
+        slices = [
+            self.order[start:stop] for start, stop in zip(starts, stops) if stop > start
+        ]
+        if not slices:
+            return np.empty(0, "int64")
+        return np.sort(np.concatenate(slices))
+
+    def save(self, index_file_path: str):
+        """
+        Save the index to a NumPy archive.
+
+        :param index_file_path: Path to the archive.
+        """
+        with open(index_file_path, "wb") as file:
+            np.savez(
+                file,
+                cell_size=self.cell_size,
+                cells=self.cells,
+                offsets=self.offsets,
+                order=self.order,
+                fingerprint=np.array(self.fingerprint, dtype="int64"),
+            )
+
+    @classmethod
+    def load(cls, index_file_path: str) -> "GridIndex":
+        """
+        Load an index saved with `GridIndex.save`.
+
+        :param index_file_path: Path to the archive.
+        :return: GridIndex read from the archive.
+        """
+        with np.load(index_file_path) as archive:
+            return cls(
+                float(archive["cell_size"]),
+                archive["cells"],
+                archive["offsets"],
+                archive["order"],
+                tuple(archive["fingerprint"]),
+            )
+
+
+def get_index_file_path(data_file_path: str) -> str:
+    """
+    Path of the index cached next to a data file.
+
+    :param data_file_path: Path to the indexed data file.
+    :return: Path to the index archive.
+    """
+    return f"{os.path.splitext(data_file_path.rstrip(os.sep))[0]}.grid.npz"
+
+
+@cache_decorator
+def load_spatial_index(
+    parquet_file_path: str, cell_size: float = DEFAULT_CELL_SIZE
+) -> GridIndex:
+    """
+    Load the spatial index of a Parquet file, building it if needed.
+
+    The index is cached next to the Parquet file and rebuilt when the file's
+    modification time or size no longer match the ones it was built from.
+
+    :param parquet_file_path: Path to the Parquet file.
+    :param cell_size: Side of a grid cell in degrees.
+    :return: GridIndex over the rows of the Parquet file, in file order.
+    """
+    index_file_path = get_index_file_path(parquet_file_path)
+    fingerprint = file_fingerprint(parquet_file_path)
+
+    if os.path.exists(index_file_path):
+        try:
+            index = GridIndex.load(index_file_path)
+            if index.fingerprint == fingerprint and index.cell_size == cell_size:
+                loading_logger.info(f"Spatial index loaded from {index_file_path}.")
+                return index
+            loading_logger.info("Spatial index is outdated, rebuilding it.")
+        except Exception as e:
+            loading_logger.error(f"Error while loading spatial index: {e}")
+
+    # Only the coordinates are needed, they are read without going through the cache
+    coordinates_df = pd.read_parquet(
+        parquet_file_path, columns=["latitude", "longitude"]
+    )
+    index = GridIndex.build(
+        coordinates_df["latitude"].to_numpy(),
+        coordinates_df["longitude"].to_numpy(),
+        cell_size,
+        fingerprint,
+    )
+
+    try:
+        index.save(index_file_path)
+        loading_logger.info(f"Spatial index saved to {index_file_path}.")
+    except OSError as e:
+        loading_logger.error(f"Error while saving spatial index: {e}")
+
+    return index
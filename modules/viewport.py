@@ -0,0 +1,216 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from modules.config import VIEWPORT_MAX_POINTS
+
+# Latitude limit of the Web Mercator tiles used by web maps
+MAX_MERCATOR_LATITUDE = 85.0511
+# Number of cluster cells along each side of a tile
+TILE_CLUSTER_CELLS = 8
+
+
+def tile_coordinates(latitudes: object, longitudes: object, zoom: int) -> tuple:
+    """
+    Convert coordinates to fractional Web Mercator tile coordinates.
+
+    The integer parts are the x/y indices of the map tile containing each point at
+    this zoom level, as used by Leaflet and OpenStreetMap.
+
+    Args:
+    latitudes, longitudes: Arrays of coordinates in degrees.
+    zoom: Zoom level of the map.
+
+    Returns:
+    tuple: (x, y) arrays of tile coordinates.
+    """
+    n_tiles = 2**zoom
+    latitudes = np.radians(
+        np.clip(
+            np.asarray(latitudes, dtype=np.float64),
+            -MAX_MERCATOR_LATITUDE,
+            MAX_MERCATOR_LATITUDE,
+        )
+    )
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    x = (longitudes + 180.0) / 360.0 * n_tiles
+    y = (1.0 - np.arcsinh(np.tan(latitudes)) / math.pi) / 2.0 * n_tiles
+    return (
+        np.clip(x, 0, np.nextafter(n_tiles, 0)),
+        np.clip(y, 0, np.nextafter(n_tiles, 0)),
+    )
+
+
+def tiles_in_bounds(bounds: tuple, zoom: int) -> list:
+    """
+    List the map tiles covering a viewport.
+
+    Args:
+    bounds: (min_lat, max_lat, min_lon, max_lon) of the viewport in degrees.
+    zoom: Zoom level of the map.
+
+    Returns:
+    list: (x, y) indices of the tiles.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounds
+    x, y = tile_coordinates(
+        [max_lat, min_lat], [max(min_lon, -180.0), min(max_lon, 180.0)], zoom
+    )
+    x, y = x.astype(np.int64), y.astype(np.int64)
+    return [
+        (tile_x, tile_y)
+        for tile_x in range(x[0], x[1] + 1)
+        for tile_y in range(y[0], y[1] + 1)
+    ]
+
+
+def viewport_bounds(
+    central_lat: float, central_lon: float, zoom: int, width: int, height: int
+) -> tuple:
+    """
+    Calculate the bounds of a map view from its center, zoom level and size.
+
+    Args:
+    central_lat, central_lon: Latitude and longitude of the center in degrees.
+    zoom: Zoom level of the map.
+    width, height: Size of the map in pixels, with 256 pixels tiles.
+
+    Returns:
+    tuple: (min_lat, max_lat, min_lon, max_lon) in degrees.
+    """
+    n_tiles = 2**zoom
+    x, y = tile_coordinates([central_lat], [central_lon], zoom)
+    half_width, half_height = width / 512, height / 512
+
+    longitudes = (x[0] + np.array([-half_width, half_width])) / n_tiles * 360.0 - 180.0
+    latitudes = np.degrees(
+        np.arctan(
+            np.sinh(
+                math.pi
+                * (1 - 2 * (y[0] + np.array([half_height, -half_height])) / n_tiles)
+            )
+        )
+    )
+    return (
+        float(latitudes[0]),
+        float(latitudes[1]),
+        float(max(longitudes[0], -180.0)),
+        float(min(longitudes[1], 180.0)),
+    )
+
+
+class ViewportLoader:
+    """
+    Serve search results tile by tile for the viewport of a map.
+
+    Only the tiles covering the viewport are sent to the map, so panning fetches the
+    newly visible tiles only. When the viewport holds more than `max_points`
+    restaurants, each tile is aggregated into at most TILE_CLUSTER_CELLS² clusters,
+    which bounds the map payload whatever the radius, while smaller results are
+    shown as individual restaurants at any zoom level.
+    Tiles are computed once per zoom level and kept for the next viewports.
+    """
+
+    def __init__(
+        self,
+        restaurants: pd.DataFrame,
+        max_points: int = VIEWPORT_MAX_POINTS,
+    ):
+        """
+        Create a loader over search results.
+
+        :param restaurants: DataFrame of restaurants with 'latitude' and 'longitude' columns.
+        :param max_points: Maximum number of individual restaurants in a viewport.
+        """
+        self.restaurants = restaurants.reset_index(drop=True)
+        self.max_points = max_points
+        self._tile_rows = {}
+        self._tiles = {}
+
+    def _rows_by_tile(self, zoom: int) -> tuple:
+        # Rows sorted by tile, so that the rows of a tile are a contiguous slice
+        if zoom not in self._tile_rows:
+            x, y = tile_coordinates(
+                self.restaurants["latitude"].to_numpy(),
+                self.restaurants["longitude"].to_numpy(),
+                zoom,
+            )
+            tile_ids = x.astype(np.int64) * 2**zoom + y.astype(np.int64)
+            order = np.argsort(tile_ids, kind="stable")
+            self._tile_rows[zoom] = (tile_ids[order], order, x[order], y[order])
+        return self._tile_rows[zoom]
+
+    def _tile_slice(self, zoom: int, tile: tuple) -> slice:
+        tile_ids = self._rows_by_tile(zoom)[0]
+        tile_id = tile[0] * 2**zoom + tile[1]
+        return slice(
+            np.searchsorted(tile_ids, tile_id, side="left"),
+            np.searchsorted(tile_ids, tile_id, side="right"),
+        )
+
+    def count(self, zoom: int, tiles: list) -> int:
+        """
+        Count the restaurants of some tiles.
+        """
+        rows = (self._tile_slice(zoom, tile) for tile in tiles)
+        return sum(row.stop - row.start for row in rows)
+
+    def tile(self, zoom: int, tile: tuple, clustered: bool) -> pd.DataFrame:
+        """
+        Get the restaurants or clusters of a tile.
+
+        :param zoom: Zoom level of the map.
+        :param tile: (x, y) indices of the tile.
+        :param clustered: Flag to aggregate the restaurants into clusters.
+        :return: Rows of the restaurants, or clusters with 'latitude', 'longitude'
+            (mean position) and 'count' columns.
+        """
+        key = (zoom, tile, clustered)
+        if key not in self._tiles:
+            _, order, x, y = self._rows_by_tile(zoom)
+            rows = self._tile_slice(zoom, tile)
+            if not clustered:
+                self._tiles[key] = self.restaurants.iloc[order[rows]]
+            else:
+                cell_x = (x[rows] % 1 * TILE_CLUSTER_CELLS).astype(np.int64)
+                cell_y = (y[rows] % 1 * TILE_CLUSTER_CELLS).astype(np.int64)
+                _, inverse, counts = np.unique(
+                    cell_x * TILE_CLUSTER_CELLS + cell_y,
+                    return_inverse=True,
+                    return_counts=True,
+                )
+                positions = order[rows]
+                self._tiles[key] = pd.DataFrame(
+                    {
+                        "latitude": np.bincount(
+                            inverse,
+                            self.restaurants["latitude"].to_numpy()[positions],
+                        )
+                        / counts,
+                        "longitude": np.bincount(
+                            inverse,
+                            self.restaurants["longitude"].to_numpy()[positions],
+                        )
+                        / counts,
+                        "count": counts,
+                    }
+                )
+        return self._tiles[key]
+
+    def load(self, bounds: tuple, zoom: int) -> tuple:
+        """
+        Get the restaurants or clusters to display in a viewport.
+
+        :param bounds: (min_lat, max_lat, min_lon, max_lon) of the viewport in degrees.
+        :param zoom: Zoom level of the map.
+        :return: Tuple (DataFrame of restaurants or clusters, flag set for clusters).
+        """
+        zoom = int(zoom)
+        tiles = tiles_in_bounds(bounds, zoom)
+        clustered = self.count(zoom, tiles) > self.max_points
+        viewport = pd.concat(
+            [self.tile(zoom, tile, clustered) for tile in tiles], ignore_index=True
+        )
+        return viewport, clustered
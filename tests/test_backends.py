@@ -0,0 +1,89 @@
+import pytest
+import os
+import sys
+
+# Add parent directory to system path to import modules
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.backends import create_backend, select_backend, BackendTimings
+from main import main
+
+from dotenv import dotenv_values
+config = dotenv_values(".env")
+
+@pytest.mark.parametrize("backend", ["numpy-index", "arrow"])
+def test_backends_agree(backend):
+    """
+    Test that every backend finds and counts the same restaurants as the pandas scan.
+    """
+    pandas_backend = create_backend("pandas", config['PARQUET_FILE_PATH'])
+    other_backend = create_backend(backend, config['PARQUET_FILE_PATH'])
+
+    pandas_results = pandas_backend.to_pandas(pandas_backend.search(48.8566, 2.3522, 800))
+    other_results = other_backend.to_pandas(other_backend.search(48.8566, 2.3522, 800))
+
+    assert not pandas_results.empty
+    assert sorted(zip(pandas_results['name'], pandas_results['distance'])) == \
+           sorted(zip(other_results['name'], other_results['distance']))
+    assert pandas_backend.count() == other_backend.count()
+
+def test_backends_count_deltas(tmp_path):
+    """
+    Test that every backend counts the restaurants of a dataset with delta segments alike.
+    """
+    import pandas as pd
+    from modules.deltas import delete_restaurants, upsert_restaurants
+
+    file_path = str(tmp_path / "restaurants.parquet")
+    pd.DataFrame({
+        "name": [f"Restaurant {i}" for i in range(10)],
+        "latitude": [48.85 + i / 1000 for i in range(10)],
+        "longitude": [2.35] * 10,
+    }).to_parquet(file_path, index=False)
+    upsert_restaurants(file_path, pd.DataFrame({"name": ["New"], "latitude": [48.851], "longitude": [2.351]}))
+    delete_restaurants(file_path, pd.DataFrame({
+        "name": ["Restaurant 0", "Restaurant 1"], "latitude": [48.85, 48.85 + 1 / 1000], "longitude": [2.35, 2.35],
+    }))
+
+    for backend in ["pandas", "numpy-index", "arrow"]:
+        assert create_backend(backend, file_path).count() == 9
+
+def test_auto_backend(monkeypatch):
+    """
+    Test that the small dataset is scanned with pandas until other backends are measured faster,
+    and that main reports the backend used.
+    """
+    import modules.backends as backends
+
+    monkeypatch.setattr(backends, "backend_timings", BackendTimings())
+    assert select_backend(config['PARQUET_FILE_PATH']) == "pandas"
+
+    monitoring, _ = main(48.8566, 2.3522, 750, backend="auto")
+    assert monitoring['backend'] == "pandas"
+
+    backends.backend_timings.record(config['PARQUET_FILE_PATH'], "pandas", 50)
+    backends.backend_timings.record(config['PARQUET_FILE_PATH'], "arrow", 5)
+    assert select_backend(config['PARQUET_FILE_PATH']) == "arrow"
+
+    with monkeypatch.context() as context:
+        context.setattr(backends, "AUTO_PANDAS_MAX_ROWS", 100)
+        context.setattr(backends, "backend_timings", BackendTimings())
+        assert select_backend(config['PARQUET_FILE_PATH']) == "numpy-index"
+
+    with pytest.raises(ValueError):
+        create_backend("unknown", config['PARQUET_FILE_PATH'])
+
+def test_backend_timings():
+    """
+    Test that the fastest backend is only chosen once several were measured.
+    """
+    timings = BackendTimings(smoothing=0.5)
+    timings.record("data.parquet", "pandas", 10)
+    assert timings.fastest("data.parquet", ["pandas", "numpy-index"]) is None
+
+    timings.record("data.parquet", "numpy-index", 4)
+    assert timings.fastest("data.parquet", ["pandas", "numpy-index"]) == "numpy-index"
+
+    timings.record("data.parquet", "numpy-index", 30)
+    assert timings.fastest("data.parquet", ["pandas", "numpy-index"]) == "pandas"
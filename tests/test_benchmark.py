@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.benchmark import (
+    compare_with_baseline,
+    generate_restaurants,
+    read_benchmark_results,
+    remove_load_artifacts,
+    run_benchmark,
+    write_benchmark_dataset,
+    write_benchmark_results,
+)
+from modules.backends import create_backend
+from modules.coordinate_store import get_store_path
+from modules.spatial_index import get_index_file_path
+
+def test_generate_restaurants():
+    """
+    Test that simulated restaurants have unique names and lie around Paris.
+    """
+    restaurants_df = generate_restaurants(10_000).to_pandas()
+
+    assert len(restaurants_df) == 10_000
+    assert restaurants_df["name"].is_unique
+    assert restaurants_df["latitude"].between(48.7, 49.0).mean() > 0.99
+    assert restaurants_df["longitude"].between(2.1, 2.6).mean() > 0.99
+
+def test_run_benchmark_and_compare(tmp_path):
+    """
+    Test that every backend and radius is timed, that results round-trip through JSON and CSV,
+    and that a slower phase is reported as a regression.
+    """
+    results = run_benchmark(
+        sizes=(2000,), backends=("pandas", "arrow"), radii=(500, 1000), repeats=2, data_dir=str(tmp_path)
+    )
+
+    assert [(result["backend"], result["radius"]) for result in results] == [
+        ("pandas", 500), ("pandas", 1000), ("arrow", 500), ("arrow", 1000)
+    ]
+    assert results[0]["n_results"] == results[2]["n_results"], "Backends should find the same restaurants"
+
+    for file_name in ["results.json", "results.csv"]:
+        write_benchmark_results(results, str(tmp_path / file_name))
+        baseline = read_benchmark_results(str(tmp_path / file_name))
+        assert compare_with_baseline(results, baseline) == []
+
+    slower = [dict(result, search_ms=result["search_ms"] * 3 + 100) for result in results]
+    regressions = compare_with_baseline(slower, baseline)
+    assert len(regressions) == 4
+    assert {regression["phase"] for regression in regressions} == {"search_ms"}
+
+def test_remove_load_artifacts(tmp_path):
+    """
+    Test that the spatial index and coordinate store of a benchmark dataset are removed, so every run builds them.
+    """
+    data_path = write_benchmark_dataset(2000, str(tmp_path))
+    create_backend("numpy-index", data_path, big_data=True)
+    assert os.path.exists(get_index_file_path(data_path))
+    assert os.path.exists(get_store_path(data_path))
+
+    remove_load_artifacts(data_path)
+    assert not os.path.exists(get_index_file_path(data_path))
+    assert not os.path.exists(get_store_path(data_path))
+    remove_load_artifacts(data_path)
@@ -0,0 +1,70 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.cache_data_fun import DataCache, create_cache_decorator, estimate_size
+
+def test_cache_invalidation_on_file_change(tmp_path):
+    """
+    Test that a cached loader reloads a file after it changed instead of serving stale data.
+    """
+    cache = DataCache(max_bytes=10**6)
+    file_path = str(tmp_path / "data.csv")
+
+    @create_cache_decorator(cache)
+    def load(path):
+        return pd.read_csv(path)
+
+    pd.DataFrame({"value": [1]}).to_csv(file_path, index=False)
+    assert load(file_path)["value"].tolist() == [1]
+    assert load(file_path)["value"].tolist() == [1]
+
+    pd.DataFrame({"value": [1, 2]}).to_csv(file_path, index=False)
+    os.utime(file_path, ns=(0, 10**18))
+    assert load(file_path)["value"].tolist() == [1, 2]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 1
+
+def test_cache_eviction():
+    """
+    Test that the least recently used values are evicted to stay within the memory bound.
+    """
+    cache = DataCache(max_bytes=2000)
+
+    @create_cache_decorator(cache)
+    def make_array(seed):
+        return np.full(100, seed, dtype="float64")
+
+    make_array(1)
+    make_array(2)
+    make_array(1)
+    make_array(3)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["current_bytes"] <= 2000
+    make_array(1)
+    assert cache.stats()["hits"] == 2, "The most recently used value should have been kept"
+
+def test_estimate_size_of_containers():
+    """
+    Test that dictionaries of DataFrames and indexes are measured from their content.
+    """
+    restaurants_df = pd.DataFrame({
+        "name": [f"Restaurant {i}" for i in range(10_000)],
+        "latitude": np.linspace(48.8, 48.9, 10_000),
+        "longitude": np.linspace(2.3, 2.4, 10_000),
+    })
+    frames_size = estimate_size(restaurants_df)
+
+    assert estimate_size({"a": restaurants_df, "b": restaurants_df}) >= 2 * frames_size
+    keys = pd.MultiIndex.from_frame(restaurants_df)
+    assert estimate_size(keys) >= 2 * restaurants_df["latitude"].nbytes
@@ -0,0 +1,64 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.load_data import load_restaurants_from_parquet
+from modules.find_restaurants import find_nearby_restaurants
+from modules.coordinate_store import CoordinateStore, convert_parquet_to_store
+
+from dotenv import dotenv_values
+config = dotenv_values(".env")
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Pytest fixture converting the Parquet file to a coordinate store in a temporary directory.
+    """
+    store_path = convert_parquet_to_store(config['PARQUET_FILE_PATH'], str(tmp_path / "restaurants.coords"))
+    return CoordinateStore(store_path)
+
+def test_store_content(store):
+    """
+    Test that the store holds the same rows as the Parquet file.
+    """
+    restaurants_df = load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+
+    assert len(store) == len(restaurants_df)
+    assert (store.latitude == restaurants_df['latitude'].to_numpy()).all()
+    assert store.names(range(len(store))) == list(restaurants_df['name'])
+
+def test_find_nearby_restaurants_on_store(store):
+    """
+    Test that a search on the memory-mapped store matches a search on the DataFrame.
+    """
+    restaurants_df = load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+    central_lat, central_lon, radius = 48.8566, 2.3522, 1000
+
+    store_result = find_nearby_restaurants(store, central_lat, central_lon, radius)
+    df_result = find_nearby_restaurants(restaurants_df, central_lat, central_lon, radius)
+
+    assert list(store_result['name']) == list(df_result['name'])
+    assert list(store_result['distance']) == list(df_result['distance'])
+
+def test_reconvert_keeps_open_store(tmp_path):
+    """
+    Test that converting an updated Parquet file leaves an already opened store readable.
+    """
+    restaurants_df = load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+    parquet_file_path = str(tmp_path / "restaurants.parquet")
+    store_path = str(tmp_path / "restaurants.coords")
+    restaurants_df.to_parquet(parquet_file_path, index=False)
+    old_store = CoordinateStore(convert_parquet_to_store(parquet_file_path, store_path))
+
+    restaurants_df.head(100).to_parquet(parquet_file_path, index=False)
+    new_store = CoordinateStore(convert_parquet_to_store(parquet_file_path, store_path))
+
+    assert len(new_store) == 100
+    assert len(old_store) == len(restaurants_df)
+    assert (old_store.latitude == restaurants_df['latitude'].to_numpy()).all()
+    assert old_store.names([len(old_store) - 1]) == [restaurants_df['name'].iloc[-1]]
+    assert len(os.listdir(store_path)) == 2, "Only the metadata and the current version should remain"
@@ -0,0 +1,94 @@
+import pytest
+import os
+import sys
+import pandas as pd
+
+# Add parent directory to system path to import modules
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.find_restaurants import find_nearby_restaurants
+from modules.load_data import write_restaurants_to_parquet
+from modules.deltas import (
+    upsert_restaurants,
+    delete_restaurants,
+    load_deltas,
+    list_segments,
+    apply_deltas,
+    count_restaurants,
+    compact_deltas,
+    wait_for_compaction,
+)
+
+@pytest.fixture
+def base_file_path(tmp_path):
+    """
+    Pytest fixture writing a small base Parquet file.
+    """
+    base_df = pd.DataFrame({
+        "name": [f"Restaurant {i}" for i in range(10)],
+        "latitude": [48.85 + i / 1000 for i in range(10)],
+        "longitude": [2.35] * 10,
+    })
+    file_path = str(tmp_path / "restaurants.parquet")
+    write_restaurants_to_parquet(base_df, file_path)
+    return file_path
+
+def search(file_path):
+    """
+    Search the base file and apply its deltas, returning the names found.
+    """
+    base_df = pd.read_parquet(file_path)
+    nearby_restaurants = find_nearby_restaurants(base_df, 48.85, 2.35, 2000)
+    nearby_restaurants = apply_deltas(nearby_restaurants, load_deltas(file_path), 48.85, 2.35, 2000)
+    return sorted(nearby_restaurants["name"])
+
+def test_deltas_applied_to_search(base_file_path):
+    """
+    Test that upserts and deletes are visible in search results without rewriting the base file.
+    """
+    base_fingerprint = os.stat(base_file_path).st_mtime_ns
+    upsert_restaurants(base_file_path, pd.DataFrame({
+        "name": ["New", "Restaurant 1", "Far away"],
+        "latitude": [48.851, 48.85 + 1 / 1000, 45.76],
+        "longitude": [2.351, 2.35, 4.83],
+    }))
+    delete_restaurants(base_file_path, pd.DataFrame({
+        "name": ["Restaurant 2", "New"], "latitude": [48.85 + 2 / 1000, 48.851], "longitude": [2.35, 2.351],
+    }))
+
+    assert list_segments(base_file_path) == ["00000001-upsert.parquet", "00000002-delete.parquet"]
+    assert os.stat(base_file_path).st_mtime_ns == base_fingerprint
+
+    expected_names = sorted(f"Restaurant {i}" for i in range(10) if i != 2)
+    assert search(base_file_path) == expected_names
+
+    deltas = load_deltas(base_file_path)
+    assert count_restaurants(base_file_path, deltas, pd.read_parquet(base_file_path)) == 10
+    assert count_restaurants(base_file_path, deltas) == 10
+
+def test_compact_deltas(base_file_path):
+    """
+    Test that compaction merges the segments into the base file with the same content.
+    """
+    upsert_restaurants(base_file_path, pd.DataFrame({"name": ["New"], "latitude": [48.851], "longitude": [2.351]}))
+    delete_restaurants(base_file_path, pd.DataFrame({"name": ["Restaurant 0"], "latitude": [48.85], "longitude": [2.35]}))
+    names_before = search(base_file_path)
+
+    assert compact_deltas(base_file_path) == 2
+    assert list_segments(base_file_path) == []
+    assert load_deltas(base_file_path).empty
+    assert search(base_file_path) == names_before
+    assert len(pd.read_parquet(base_file_path)) == 10
+
+def test_background_compaction(base_file_path, monkeypatch):
+    """
+    Test that writing enough segments compacts them in the background, and that a writer can wait for it.
+    """
+    monkeypatch.setattr("modules.deltas.DELTA_COMPACTION_SEGMENTS", 2)
+    upsert_restaurants(base_file_path, pd.DataFrame({"name": ["New"], "latitude": [48.851], "longitude": [2.351]}))
+    delete_restaurants(base_file_path, pd.DataFrame({"name": ["Restaurant 0"], "latitude": [48.85], "longitude": [2.35]}))
+    wait_for_compaction()
+
+    assert list_segments(base_file_path) == []
+    assert len(pd.read_parquet(base_file_path)) == 10
@@ -7,7 +7,18 @@ current_dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.split(current_dir)[0])
 
 from modules.load_data import load_restaurants_from_parquet
-from modules.find_restaurants import haversine_distance, find_nearby_restaurants 
+from modules.find_restaurants import (
+    haversine_distance,
+    haversine_distance_vectorized,
+    bounding_box,
+    find_nearby_restaurants,
+    find_nearby_restaurants_multi,
+    find_k_nearest,
+    scan_within_radius,
+)
+import modules.find_restaurants as find_restaurants
+import numpy as np
+from modules.spatial_index import load_spatial_index
 
 from dotenv import dotenv_values
 config = dotenv_values(".env")
@@ -63,3 +74,68 @@ def test_find_nearby_restaurants(restaurants_df):
     zero_radius = 0
     zero_radius_result = find_nearby_restaurants(restaurants_df, central_lat, central_lon, zero_radius)
     assert len(zero_radius_result) == 0, "No restaurants should be found with a zero radius"
+
+def test_haversine_distance_vectorized():
+    """
+    Test that the vectorized Haversine kernel matches the scalar implementation.
+    """
+    latitudes = [45.7640, 43.2965, 48.8566]
+    longitudes = [4.8357, 5.3698, 2.3522]
+    distances = haversine_distance_vectorized(48.8566, 2.3522, latitudes, longitudes)
+
+    for lat, lon, distance in zip(latitudes, longitudes, distances):
+        assert abs(distance - haversine_distance(48.8566, 2.3522, lat, lon)) < 1e-6
+
+def test_find_nearby_restaurants_multi(restaurants_df):
+    """
+    Test that a multi-point search returns the same rows as separate single-point searches.
+    """
+    latitudes, longitudes, radius = [48.8566, 48.8584], [2.3522, 2.2945], 500
+    multi_result = find_nearby_restaurants_multi(restaurants_df, latitudes, longitudes, radius)
+
+    for query_id, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        single_result = find_nearby_restaurants(restaurants_df, lat, lon, radius)
+        query_result = multi_result[multi_result['query_id'] == query_id]
+        assert len(query_result) == len(single_result)
+        assert list(query_result['distance']) == list(single_result['distance'])
+
+def test_scan_within_radius_parallel(monkeypatch):
+    """
+    Test that a scan split over several threads returns the same rows, in the same order, as a serial scan.
+    """
+    monkeypatch.setattr(find_restaurants, 'MIN_CHUNK_SIZE', 1000)
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(48.80, 48.90, 10_000)
+    longitudes = rng.uniform(2.25, 2.42, 10_000)
+
+    serial = scan_within_radius(latitudes, longitudes, 48.8566, 2.3522, 2000, n_jobs=1)
+    parallel = scan_within_radius(latitudes, longitudes, 48.8566, 2.3522, 2000, n_jobs=4)
+    assert len(serial[0]) > 0
+    assert np.array_equal(serial[0], parallel[0])
+    assert np.array_equal(serial[1], parallel[1])
+
+def test_bounding_box():
+    """
+    Test that points on the search circle lie inside its bounding box.
+    """
+    central_lat, central_lon, radius = 48.8566, 2.3522, 1000
+    min_lat, max_lat, min_lon, max_lon = bounding_box(central_lat, central_lon, radius)
+
+    assert min_lat < central_lat < max_lat
+    assert min_lon < central_lon < max_lon
+    assert haversine_distance(central_lat, central_lon, max_lat, central_lon) <= radius + 1e-6
+    assert haversine_distance(central_lat, central_lon, central_lat, max_lon) >= radius
+
+@pytest.mark.parametrize("k, max_radius", [(1, None), (10, None), (50, 300), (10**5, None)])
+def test_find_k_nearest(restaurants_df, k, max_radius):
+    """
+    Test that the k nearest restaurants, with or without spatial index, are the first k of a full search.
+    """
+    central_lat, central_lon = 48.8566, 2.3522
+    all_restaurants = find_nearby_restaurants(restaurants_df, central_lat, central_lon, max_radius or 10**7)
+    expected_distances = sorted(all_restaurants['distance'])[:k]
+
+    index = load_spatial_index(config['PARQUET_FILE_PATH'])
+    for spatial_index in (None, index):
+        nearest = find_k_nearest(restaurants_df, central_lat, central_lon, k, max_radius, spatial_index)
+        assert list(nearest['distance']) == expected_distances
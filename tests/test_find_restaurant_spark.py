@@ -0,0 +1,88 @@
+import pytest
+import shutil
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+pytest.importorskip("pyspark")
+if not (shutil.which("java") or os.environ.get("JAVA_HOME")):
+    pytest.skip("Spark needs a Java runtime.", allow_module_level=True)
+
+from modules.load_data import load_restaurants_from_parquet
+from modules.load_data_spark import load_restaurants_from_parquet_spark
+from modules.find_restaurants import (
+    find_k_nearest,
+    find_nearby_restaurants_multi,
+    haversine_distance_vectorized,
+)
+from modules.find_restaurants_spark import (
+    calculate_distance_spark,
+    find_k_nearest_spark,
+    find_nearby_restaurants_batch_spark,
+)
+
+from dotenv import dotenv_values
+config = dotenv_values(".env")
+
+@pytest.fixture(scope="module")
+def restaurants():
+    """
+    Pytest fixture with the restaurants as a pandas DataFrame and as a persisted Spark DataFrame.
+    """
+    spark_session, restaurants_spark = load_restaurants_from_parquet_spark(config['PARQUET_FILE_PATH'])
+    return load_restaurants_from_parquet(config['PARQUET_FILE_PATH']), restaurants_spark
+
+@pytest.mark.parametrize("k, max_radius", [(1, None), (25, None), (50, 300)])
+def test_find_k_nearest_spark(restaurants, k, max_radius):
+    """
+    Test that the Spark k nearest restaurants, with their widening search, match the pandas ones.
+    """
+    restaurants_df, restaurants_spark = restaurants
+    expected = find_k_nearest(restaurants_df, 48.8566, 2.3522, k, max_radius)
+    nearest = find_k_nearest_spark(restaurants_spark, 48.8566, 2.3522, k, max_radius).toPandas()
+
+    assert len(nearest) == len(expected)
+    assert list(nearest['distance']) == pytest.approx(list(expected['distance']), abs=0.01)
+
+def test_distance_to_point_spark(restaurants):
+    """
+    Test that the distance from precomputed radians matches the vectorized Haversine distance.
+    """
+    restaurants_df, restaurants_spark = restaurants
+    sample = restaurants_df.head(200)
+    distances = calculate_distance_spark(
+        restaurants_spark.sparkSession.createDataFrame(sample[["latitude", "longitude"]]), 48.8566, 2.3522
+    ).toPandas()
+
+    expected = haversine_distance_vectorized(48.8566, 2.3522, sample["latitude"].to_numpy(), sample["longitude"].to_numpy())
+    assert list(distances["distance"]) == pytest.approx(list(expected), abs=0.01)
+
+def test_find_nearby_restaurants_batch_spark(restaurants):
+    """
+    Test that the batch Spark search returns, for each query id, the restaurants of the pandas multi-point search.
+    """
+    restaurants_df, restaurants_spark = restaurants
+    queries = pd.DataFrame({
+        "query_id": [10, 20, 30],
+        "latitude": [48.8566, 48.8738, 48.8867],
+        "longitude": [2.3522, 2.2950, 2.3431],
+        "radius": [300.0, 500.0, 200.0],
+    })
+    nearby = find_nearby_restaurants_batch_spark(
+        restaurants_spark, queries, restaurants_spark.sparkSession
+    ).toPandas()
+    expected = find_nearby_restaurants_multi(
+        restaurants_df, queries["latitude"], queries["longitude"], queries["radius"].to_numpy()
+    )
+    expected["query_id"] = queries["query_id"].to_numpy()[expected["query_id"]]
+
+    assert len(nearby) == len(expected) > 0
+    for query_id in queries["query_id"]:
+        distances = np.sort(nearby.loc[nearby["query_id"] == query_id, "distance"].to_numpy())
+        expected_distances = np.sort(expected.loc[expected["query_id"] == query_id, "distance"].to_numpy())
+        assert list(distances) == pytest.approx(list(expected_distances), abs=0.01)
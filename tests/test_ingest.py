@@ -0,0 +1,106 @@
+import pytest
+import json
+import os
+import sys
+import pandas as pd
+
+# Add parent directory to system path to import modules
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.ingest import expand_sources, ingest_sources
+from modules.load_data import load_restaurants_from_parquet, load_restaurants_from_csv
+from modules.coordinate_store import convert_parquet_to_store, CoordinateStore
+from modules.find_restaurants_arrow import find_nearby_restaurants_arrow, open_arrow_dataset
+from modules.backends import create_backend
+from modules.cache_data_fun import file_fingerprint
+from modules.coordinate_store import get_store_path
+from modules.spatial_index import get_index_file_path
+from modules.popular_places import get_neighbourhoods_file_path
+
+@pytest.fixture
+def source_dir(tmp_path):
+    """
+    Pytest fixture writing restaurants of Paris and Lyon to CSV and GeoJSON files.
+    """
+    source_dir = tmp_path / "sources"
+    source_dir.mkdir()
+    pd.DataFrame({
+        "name": [f"Paris {i}" for i in range(10)],
+        "latitude": [48.85 + i / 1000 for i in range(10)],
+        "longitude": [2.35] * 10,
+    }).to_csv(source_dir / "paris.csv", index=False)
+
+    features = [
+        {"type": "Feature", "properties": {"name": f"Lyon {i}"},
+         "geometry": {"type": "Point", "coordinates": [4.83 + i / 1000, 45.76]}}
+        for i in range(5)
+    ]
+    with open(source_dir / "lyon.geojson", "w") as file:
+        json.dump({"type": "FeatureCollection", "features": features}, file)
+    (source_dir / "notes.txt").write_text("not a source")
+    return str(source_dir)
+
+def test_expand_sources(source_dir):
+    """
+    Test that directories and glob patterns are expanded to GeoJSON and CSV files only.
+    """
+    assert [os.path.basename(path) for path in expand_sources(source_dir)] == ["lyon.geojson", "paris.csv"]
+    assert [os.path.basename(path) for path in expand_sources(os.path.join(source_dir, "*.csv"))] == ["paris.csv"]
+
+def test_ingest_sources_parquet(source_dir, tmp_path):
+    """
+    Test that files ingested in parallel form a partitioned dataset that loaders read by tile.
+    """
+    output_dir = str(tmp_path / "restaurants")
+    assert ingest_sources(source_dir, output_dir, workers=2) == 15
+    assert os.path.isdir(os.path.join(output_dir, "lat_tile=48", "lon_tile=2"))
+    assert os.path.isdir(os.path.join(output_dir, "lat_tile=45", "lon_tile=4"))
+
+    restaurants_df = load_restaurants_from_parquet(output_dir)
+    assert list(restaurants_df.columns) == ["name", "latitude", "longitude"]
+    assert len(restaurants_df) == 15
+
+    paris_df = load_restaurants_from_parquet(output_dir, bbox=(48.8, 48.9, 2.3, 2.4))
+    assert sorted(paris_df["name"]) == sorted(f"Paris {i}" for i in range(10))
+
+    nearby_restaurants = find_nearby_restaurants_arrow(open_arrow_dataset(output_dir), 48.85, 2.35, 2000)
+    assert sorted(nearby_restaurants["name"]) == sorted(paris_df["name"])
+
+    store = CoordinateStore(convert_parquet_to_store(output_dir, str(tmp_path / "restaurants.coords")))
+    assert list(store.take(range(len(store)))["name"]) == list(restaurants_df["name"])
+
+def test_ingest_sources_twice(source_dir, tmp_path):
+    """
+    Test that ingesting the same sources again replaces their restaurants instead of duplicating them.
+    """
+    output_dir = str(tmp_path / "restaurants")
+    ingest_sources(source_dir, output_dir, workers=2)
+    assert ingest_sources(source_dir, output_dir, workers=2) == 15
+    assert len(load_restaurants_from_parquet(output_dir)) == 15
+
+def test_derived_files_outside_dataset(source_dir, tmp_path):
+    """
+    Test that files built from a dataset directory given with a trailing separator are written next to it.
+    """
+    output_dir = str(tmp_path / "restaurants")
+    ingest_sources(source_dir, output_dir, workers=2)
+    fingerprint = file_fingerprint(output_dir)
+
+    for get_path in (get_index_file_path, get_store_path, get_neighbourhoods_file_path):
+        assert get_path(output_dir + os.sep) == get_path(output_dir)
+        assert os.path.dirname(get_path(output_dir + os.sep)) == str(tmp_path)
+
+    create_backend("numpy-index", output_dir + os.sep, big_data=True)
+    assert file_fingerprint(output_dir) == fingerprint
+
+def test_ingest_sources_csv(source_dir, tmp_path):
+    """
+    Test that a partitioned CSV dataset is read with the same bounding-box pruning.
+    """
+    output_dir = str(tmp_path / "restaurants_csv")
+    ingest_sources(os.path.join(source_dir, "*"), output_dir, workers=1, output_format="csv")
+
+    lyon_df = load_restaurants_from_csv(output_dir, columns=("name", "latitude", "longitude"),
+                                        bbox=(45.7, 45.8, 4.8, 4.9))
+    assert sorted(lyon_df["name"]) == [f"Lyon {i}" for i in range(5)]
@@ -1,7 +1,9 @@
 import pytest
+import json
 import os
 import sys
 import pandas as pd
+import pyarrow.parquet as pq
 from dotenv import dotenv_values
 
 # Load configuration from .env file
@@ -11,7 +13,12 @@ config = dotenv_values(".env")
 current_dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.split(current_dir)[0])
 
-from modules.load_data import load_restaurants_from_parquet
+from modules.load_data import (
+    load_restaurants_from_parquet,
+    write_restaurants_to_parquet,
+    iter_restaurant_batches,
+    convert_geojson_to_parquet,
+)
 
 def test_load_restaurants_from_parquet():
     """
@@ -43,4 +50,69 @@ def test_data_quality():
 
     assert pd.api.types.is_object_dtype(restaurants_df['name']), "Column 'name' should be of type string"
     assert pd.api.types.is_float_dtype(restaurants_df['latitude']), "Column 'longitude' should be of type float"
-    assert pd.api.types.is_float_dtype(restaurants_df['longitude']), "Column 'longitude' should be of type float"
\ No newline at end of file
+    assert pd.api.types.is_float_dtype(restaurants_df['longitude']), "Column 'longitude' should be of type float"
+
+def test_load_restaurants_from_parquet_with_bbox(tmp_path):
+    """
+    Test that a bounding-box read of a spatially sorted file returns exactly the restaurants inside the box.
+    """
+    restaurants_df = load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+    sorted_file_path = str(tmp_path / "sorted.parquet")
+    write_restaurants_to_parquet(restaurants_df, sorted_file_path, row_group_size=500)
+
+    bbox = (48.85, 48.86, 2.34, 2.36)
+    restaurants_in_bbox = load_restaurants_from_parquet(sorted_file_path, bbox=bbox)
+    expected_restaurants = restaurants_df[restaurants_df['latitude'].between(48.85, 48.86)
+                                          & restaurants_df['longitude'].between(2.34, 2.36)]
+
+    assert list(restaurants_in_bbox.columns) == ['name', 'latitude', 'longitude']
+    assert sorted(restaurants_in_bbox['name']) == sorted(expected_restaurants['name'])
+
+@pytest.fixture
+def geojson_file_path(tmp_path):
+    """
+    Pytest fixture writing a small GeoJSON file with invalid and duplicated features.
+    """
+    features = [
+        {"type": "Feature", "properties": {"name": f"Restaurant {i}"},
+         "geometry": {"type": "Point", "coordinates": [2.35 + i / 1000, 48.85]}}
+        for i in range(25)
+    ]
+    features += [
+        {"type": "Feature", "properties": {"name": "Restaurant 3"},
+         "geometry": {"type": "Point", "coordinates": [2.353, 48.85]}},
+        {"type": "Feature", "properties": {"amenity": "restaurant"},
+         "geometry": {"type": "Point", "coordinates": [2.35, 48.85]}},
+        {"type": "Feature", "properties": {"name": "Area"},
+         "geometry": {"type": "Polygon", "coordinates": [[[2.35, 48.85], [2.36, 48.86], [2.35, 48.86]]]}},
+        {"type": "Feature", "properties": {"name": "No geometry"}, "geometry": None},
+    ]
+    file_path = tmp_path / "restaurants.geojson"
+    with open(file_path, "w") as file:
+        json.dump({"type": "FeatureCollection", "name": "restaurants", "features": features,
+                   "crs": {"type": "name"}}, file, indent=1)
+    return str(file_path)
+
+def test_iter_restaurant_batches(geojson_file_path):
+    """
+    Test that streaming a GeoJSON file in small chunks filters and deduplicates features.
+    """
+    counts = {}
+    batches = list(iter_restaurant_batches(geojson_file_path, batch_size=10, chunk_size=64, counts=counts))
+    restaurants_df = pd.concat(batches)
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert list(restaurants_df.columns) == ['name', 'longitude', 'latitude']
+    assert list(restaurants_df['name']) == [f"Restaurant {i}" for i in range(25)]
+    assert counts == {"total": 29, "filtered": 26, "duplicates": 1}
+
+def test_convert_geojson_to_parquet(geojson_file_path, tmp_path):
+    """
+    Test that the streaming conversion writes one row group per batch.
+    """
+    parquet_file_path = str(tmp_path / "restaurants.parquet")
+    n_rows = convert_geojson_to_parquet(geojson_file_path, parquet_file_path, batch_size=10)
+
+    assert n_rows == 25
+    assert len(pd.read_parquet(parquet_file_path)) == 25
+    assert pq.ParquetFile(parquet_file_path).metadata.num_row_groups == 3
@@ -0,0 +1,63 @@
+import pytest
+import shutil
+import sys
+import os
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+pytest.importorskip("pyspark")
+if not (shutil.which("java") or os.environ.get("JAVA_HOME")):
+    pytest.skip("Spark needs a Java runtime.", allow_module_level=True)
+
+from modules.deltas import count_restaurants, delete_restaurants, load_deltas, upsert_restaurants
+from modules.load_data_spark import SparkBackend
+
+def write_restaurants(file_path, n_rows):
+    pd.DataFrame({
+        "name": [f"Restaurant {i}" for i in range(n_rows)],
+        "latitude": [48.85 + i / 1000 for i in range(n_rows)],
+        "longitude": [2.35] * n_rows,
+    }).to_parquet(file_path, index=False)
+
+def test_spark_backend_load_and_count(tmp_path):
+    """
+    Test that a dataset is persisted once per file version and counted with its deltas.
+    """
+    file_path = str(tmp_path / "restaurants.parquet")
+    write_restaurants(file_path, 10)
+    backend = SparkBackend()
+
+    restaurants_df = backend.load(file_path)
+    assert backend.load(file_path) is restaurants_df
+    assert restaurants_df.is_cached
+    assert backend.count(file_path) == 10
+
+    upsert_restaurants(file_path, pd.DataFrame({"name": ["New"], "latitude": [48.851], "longitude": [2.351]}))
+    delete_restaurants(file_path, pd.DataFrame({
+        "name": ["Restaurant 0", "Restaurant 1"], "latitude": [48.85, 48.85 + 1 / 1000], "longitude": [2.35, 2.35],
+    }))
+    deltas = load_deltas(file_path)
+    assert backend.count(file_path, deltas) == count_restaurants(file_path, deltas) == 9
+
+    write_restaurants(file_path, 12)
+    assert backend.load(file_path) is not restaurants_df
+    assert not restaurants_df.is_cached, "The previous version should be released"
+    assert backend.count(file_path) == 12
+
+def test_spark_backend_unpersist(tmp_path):
+    """
+    Test that unpersisting releases the persisted DataFrames and that they are read again when needed.
+    """
+    file_path = str(tmp_path / "restaurants.parquet")
+    write_restaurants(file_path, 10)
+    backend = SparkBackend()
+
+    restaurants_df = backend.load(file_path)
+    backend.unpersist()
+
+    assert not restaurants_df.is_cached
+    assert backend.load(file_path) is not restaurants_df
+    assert backend.count(file_path) == 10
@@ -6,7 +6,9 @@ import os
 current_dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.split(current_dir)[0])
 
-from main import main
+import pandas as pd
+
+from main import main, main_batch
 
 @pytest.mark.parametrize("latitude, longitude, radius, expected_count", [
     (48.8566, 2.3522, 1000, None),  # Example coordinates with a radius and an expected number of restaurants
@@ -35,3 +37,27 @@ def test_main(latitude, longitude, radius, expected_count):
     # Check performance metrics
     assert monitoring['load_data_time'] < 1000, "Data loading takes too long (in ms)"
     assert monitoring['search_time'] < 500, "Search takes too long (in ms)"
+
+def test_main_batch(tmp_path):
+    """
+    Test the batch mode with a few queries read from a CSV file.
+
+    Each query should get the same restaurants as a single search with the same parameters.
+    """
+    queries = pd.DataFrame({
+        "query_id": ["bastille", "eiffel"],
+        "latitude": [48.8530, 48.8584],
+        "longitude": [2.3690, 2.2945],
+        "radius": [500, 300],
+    })
+    queries.to_csv(tmp_path / "queries.csv", index=False)
+
+    monitoring, _ = main_batch(str(tmp_path / "queries.csv"), str(tmp_path / "results.parquet"))
+    results = pd.read_parquet(tmp_path / "results.parquet")
+
+    assert monitoring['n_queries'] == 2
+    assert monitoring['n_results'] == len(results)
+    for query in queries.itertuples():
+        _, expected_restaurants = main(query.latitude, query.longitude, query.radius)
+        query_results = results[results['query_id'] == query.query_id]
+        assert list(query_results['name']) == list(expected_restaurants['name'])
@@ -25,3 +25,22 @@ def test_app_initialization():
         assert True, "App instance successfully created."
     except Exception as e:
         pytest.fail(f"Failed to create App instance: {e}")
+
+def test_fast_markers_layer():
+    """
+    Tests that large results are added to the map as a single data-driven layer.
+    """
+    import folium
+    import pandas as pd
+
+    nearby_restaurants = pd.DataFrame({
+        "name": [f"Restaurant_{i}" for i in range(2000)],
+        "latitude": [48.85 + i / 100000 for i in range(2000)],
+        "longitude": [2.35] * 2000,
+        "distance": [float(i) for i in range(2000)],
+    })
+    map = folium.Map(location=[48.85, 2.35])
+    App.add_fast_markers(None, map, nearby_restaurants)
+
+    assert len(map._children) == 2
+    assert "Restaurant_1999" in map.get_root().render()
@@ -0,0 +1,41 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.config import get_popular_places_paris
+from modules.load_data import load_restaurants_from_parquet
+from modules.find_restaurants import find_nearby_restaurants
+from modules.popular_places import load_popular_neighbourhoods, find_precomputed_restaurants
+
+from dotenv import dotenv_values
+config = dotenv_values(".env")
+
+@pytest.mark.parametrize("place, radius", [("Louvre", 300), ("Eiffel Tower", 1000), ("La Défense", 0)])
+def test_precomputed_neighbourhoods_match_search(place, radius):
+    """
+    Test that slicing a precomputed neighbourhood returns the restaurants a search would find, sorted by distance.
+    """
+    latitude, longitude = get_popular_places_paris()[place]
+    neighbourhoods = load_popular_neighbourhoods(config['PARQUET_FILE_PATH'])
+    restaurants_df = load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+
+    precomputed = find_precomputed_restaurants(neighbourhoods, place, latitude, longitude, radius)
+    searched = find_nearby_restaurants(restaurants_df, latitude, longitude, radius)
+
+    assert list(precomputed['distance']) == sorted(precomputed['distance'])
+    assert sorted(precomputed['name']) == sorted(searched['name'])
+
+def test_precomputed_neighbourhoods_need_exact_place():
+    """
+    Test that searches away from the popular place or beyond the precomputed radius are not answered.
+    """
+    latitude, longitude = get_popular_places_paris()["Louvre"]
+    neighbourhoods = load_popular_neighbourhoods(config['PARQUET_FILE_PATH'])
+
+    assert find_precomputed_restaurants(neighbourhoods, "Louvre", latitude + 0.01, longitude, 300) is None
+    assert find_precomputed_restaurants(neighbourhoods, "Louvre", latitude, longitude, 10**6) is None
+    assert find_precomputed_restaurants(neighbourhoods, None, latitude, longitude, 300) is None
@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.result_cache import QueryResultCache
+
+@pytest.fixture
+def result():
+    """
+    Pytest fixture with a small search result.
+    """
+    return pd.DataFrame({"name": ["A", "B", "C"], "distance": [10.0, 250.0, 900.0]})
+
+def test_exact_and_superset_hits(result):
+    """
+    Test that a cached result answers the same search, and smaller radii by filtering.
+    """
+    cache = QueryResultCache()
+    cache.put("v1", 48.8566, 2.3522, 1000, result)
+
+    exact_hit = cache.get("v1", 48.8566, 2.3522, 1000)
+    assert exact_hit.equals(result)
+    exact_hit.loc[0, "name"] = "Changed"
+    result.loc[1, "name"] = "Changed"
+    assert list(cache.get("v1", 48.8566, 2.3522, 1000)["name"]) == ["A", "B", "C"], "Cached results are not shared"
+    assert list(cache.get("v1", 48.856601, 2.352201, 300)["name"]) == ["A", "B"]
+    assert cache.get("v1", 48.8566, 2.3522, 2000) is None, "A larger radius needs a new search"
+    assert cache.get("v2", 48.8566, 2.3522, 1000) is None, "Another dataset version needs a new search"
+
+    assert cache.stats() == {"hits": 2, "superset_hits": 1, "misses": 2, "entries": 1}
+
+def test_ttl_and_lru(result):
+    """
+    Test that results expire after their time to live and that the least recently used one is evicted.
+    """
+    cache = QueryResultCache(maxsize=2, ttl=0)
+    cache.put("v1", 48.0, 2.0, 1000, result)
+    assert cache.get("v1", 48.0, 2.0, 1000) is None
+
+    cache = QueryResultCache(maxsize=2)
+    cache.put("v1", 48.0, 2.0, 1000, result)
+    cache.put("v1", 49.0, 2.0, 1000, result)
+    cache.get("v1", 48.0, 2.0, 1000)
+    cache.put("v1", 50.0, 2.0, 1000, result)
+
+    assert cache.get("v1", 48.0, 2.0, 1000).equals(result)
+    assert cache.get("v1", 49.0, 2.0, 1000) is None
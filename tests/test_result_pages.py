@@ -0,0 +1,50 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.result_pages import DistanceCursor
+
+@pytest.fixture
+def results():
+    """
+    Pytest fixture with a search result of 1,000 restaurants, with tied distances.
+    """
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "name": [f"Restaurant_{i}" for i in range(1000)],
+        "distance": rng.integers(0, 300, 1000).astype(float),
+    })
+
+def test_pages_match_full_sort(results):
+    """
+    Test that the pages, read in any order, follow a full stable sort by distance.
+    """
+    cursor = DistanceCursor(results, page_size=30)
+    expected = results.sort_values(by="distance", kind="stable")
+
+    assert cursor.n_pages == 34
+    for page_number in [5, 0, 33, 12, 1]:
+        page = cursor.page(page_number)
+        start = page_number * 30
+        assert list(page["name"]) == list(expected["name"].iloc[start:start + 30])
+
+    assert cursor.page(34).empty
+
+def test_missing_distances_last(results):
+    """
+    Test that rows without a distance come last and do not shorten the pages before them.
+    """
+    results.loc[::10, "distance"] = float("nan")
+    cursor = DistanceCursor(results, page_size=30)
+    expected = results.sort_values(by="distance", kind="stable", na_position="last")
+
+    for page_number in [0, 29, 30, 33]:
+        page = cursor.page(page_number)
+        start = page_number * 30
+        assert list(page["name"]) == list(expected["name"].iloc[start:start + 30])
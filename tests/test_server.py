@@ -0,0 +1,54 @@
+import pytest
+import sys
+import os
+import threading
+
+# Add the parent directory to the system path to import modules
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from main import main
+from modules.server import create_server, query_server
+
+@pytest.fixture
+def server():
+    """
+    Pytest fixture starting a search server on a free port in a background thread.
+    """
+    server = create_server(host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_query_server(server):
+    """
+    Test that the search server returns the same restaurants as a local search.
+    """
+    latitude, longitude, radius = 48.8566, 2.3522, 1000
+
+    monitoring, nearby_restaurants = query_server(latitude, longitude, radius, port=server.server_port)
+    _, expected_restaurants = main(latitude, longitude, radius)
+
+    assert monitoring['n_restaurants'] > 0
+    assert list(nearby_restaurants['name']) == list(expected_restaurants['name'])
+    assert list(nearby_restaurants['distance']) == list(expected_restaurants['distance'])
+
+def test_query_server_invalid_parameters(server):
+    """
+    Test that the search server rejects queries without valid coordinates.
+    """
+    with pytest.raises(RuntimeError):
+        query_server("north", 2.3522, 1000, port=server.server_port)
+
+def test_query_server_errors(server, capsys):
+    """
+    Test that a failing search is returned as an error without stopping the server nor printing results.
+    """
+    with pytest.raises(RuntimeError, match="Unknown backend"):
+        query_server(48.8566, 2.3522, 1000, backend="unknown", port=server.server_port)
+
+    monitoring, _ = query_server(48.8566, 2.3522, 1000, port=server.server_port)
+    assert monitoring['n_restaurants'] > 0
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,47 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.load_data import load_restaurants_from_parquet
+from modules.find_restaurants import find_nearby_restaurants
+from modules.spatial_index import GridIndex, load_spatial_index
+
+from dotenv import dotenv_values
+config = dotenv_values(".env")
+
+@pytest.fixture
+def restaurants_df():
+    """
+    Pytest fixture to load restaurants data from a Parquet file.
+    """
+    return load_restaurants_from_parquet(config['PARQUET_FILE_PATH'])
+
+@pytest.mark.parametrize("radius", [0, 100, 1000, 10000])
+def test_indexed_search_matches_full_scan(restaurants_df, radius):
+    """
+    Test that a search through the spatial index returns the same restaurants as a full scan.
+    """
+    central_lat, central_lon = 48.8566, 2.3522
+    index = load_spatial_index(config['PARQUET_FILE_PATH'])
+
+    indexed_result = find_nearby_restaurants(restaurants_df, central_lat, central_lon, radius, index)
+    full_scan_result = find_nearby_restaurants(restaurants_df, central_lat, central_lon, radius)
+
+    assert indexed_result.equals(full_scan_result), "Indexed search should match the full scan"
+
+def test_index_round_trip(restaurants_df, tmp_path):
+    """
+    Test that a saved index is loaded back unchanged.
+    """
+    index = GridIndex.build(restaurants_df['latitude'].to_numpy(), restaurants_df['longitude'].to_numpy(),
+                            fingerprint=(1, 2))
+    index.save(tmp_path / "index.npz")
+    loaded_index = GridIndex.load(tmp_path / "index.npz")
+
+    assert loaded_index.fingerprint == (1, 2)
+    assert (loaded_index.order == index.order).all()
+    assert (loaded_index.cells == index.cells).all()
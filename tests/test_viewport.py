@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the system path for module imports
+current_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.split(current_dir)[0])
+
+from modules.viewport import (
+    TILE_CLUSTER_CELLS,
+    ViewportLoader,
+    tiles_in_bounds,
+    viewport_bounds,
+)
+
+@pytest.fixture
+def restaurants():
+    """
+    Pytest fixture with 50,000 restaurants spread over Paris.
+    """
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "name": [f"Restaurant_{i}" for i in range(50_000)],
+        "latitude": rng.uniform(48.80, 48.90, 50_000),
+        "longitude": rng.uniform(2.25, 2.42, 50_000),
+        "distance": np.zeros(50_000),
+    })
+
+def test_clusters_at_low_zoom(restaurants):
+    """
+    Test that a zoomed-out viewport is aggregated into a bounded number of clusters of all its restaurants.
+    """
+    bounds = viewport_bounds(48.85, 2.335, 10, 700, 500)
+    viewport, clustered = ViewportLoader(restaurants).load(bounds, 10)
+
+    assert clustered
+    assert len(viewport) <= len(tiles_in_bounds(bounds, 10)) * TILE_CLUSTER_CELLS**2
+    assert viewport["count"].sum() == len(restaurants)
+
+def test_restaurants_at_high_zoom(restaurants):
+    """
+    Test that a zoomed-in viewport returns the restaurants of its tiles only.
+    """
+    bounds = viewport_bounds(48.85, 2.335, 17, 700, 500)
+    viewport, clustered = ViewportLoader(restaurants).load(bounds, 17)
+
+    assert not clustered
+    assert 0 < len(viewport) < len(restaurants)
+    in_bounds = restaurants[
+        restaurants["latitude"].between(bounds[0], bounds[1])
+        & restaurants["longitude"].between(bounds[2], bounds[3])
+    ]
+    assert set(in_bounds["name"]) <= set(viewport["name"])
+
+def test_small_result_not_clustered_at_low_zoom():
+    """
+    Test that a result smaller than the maximum number of points is shown as individual restaurants at any zoom.
+    """
+    rng = np.random.default_rng(0)
+    restaurants = pd.DataFrame({
+        "name": [f"Restaurant_{i}" for i in range(55)],
+        "latitude": rng.uniform(48.858, 48.864, 55),
+        "longitude": rng.uniform(2.332, 2.340, 55),
+        "distance": np.zeros(55),
+    })
+    bounds = viewport_bounds(48.8606, 2.3376, 12, 700, 500)
+    viewport, clustered = ViewportLoader(restaurants).load(bounds, 12)
+
+    assert not clustered
+    assert list(viewport["name"].sort_values()) == list(restaurants["name"].sort_values())